@@ -7,6 +7,7 @@ from flask_limiter.util import get_remote_address
 from flask_socketio import SocketIO
 # from flask_wtf.csrf import CSRFProtect  # Temporarily commented out due to Flask 3.0 compatibility
 from config import Config
+import click
 import os
 from dotenv import load_dotenv
 
@@ -26,12 +27,31 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    # orjson-backed JSON (stdlib fallback) for responses, templates and Socket.IO
+    from app.services.json_provider import create_json_provider, socketio_json
+    app.json = create_json_provider(app)
+    
+    # Compiled templates are cached on disk, shared by recycled workers
+    from app.services.startup import bytecode_cache, record_first_request
+    app.jinja_options = dict(app.jinja_options, bytecode_cache=bytecode_cache(app.config))
+    app.before_request(record_first_request)
+    
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
     limiter.init_app(app)
-    socketio.init_app(app, cors_allowed_origins="*")
+    
+    # Import Socket.IO events before init_app so every app's server gets the
+    # handlers (decorators only queue them while no server exists yet)
+    from app import socketio_events
+    
+    # Fan Socket.IO emits out through a message queue when one is configured
+    from app.services.socketio_queue import create_client_manager
+    socketio.init_app(app, cors_allowed_origins="*",
+                      async_mode=app.config.get('SOCKETIO_ASYNC_MODE'),
+                      client_manager=create_client_manager(app.config),
+                      json=socketio_json(app.config))
     
     # Set JWT secret key explicitly
     app.config['JWT_SECRET_KEY'] = app.config['JWT_SECRET_KEY']
@@ -52,6 +72,17 @@ def create_app(config_class=Config):
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    # gzip/Brotli for text responses, streamed ones included
+    from app.services.compression import init_compression
+    init_compression(app)
+    
+    # avatar_url(user, size) picks the smallest rendered variant in templates
+    from app.services.avatar_service import avatar_url
+    app.add_template_global(avatar_url)
+    # base.html embeds bootstrap_payload() so pages skip their initial API calls
+    from app.services.bootstrap import bootstrap_payload
+    app.add_template_global(bootstrap_payload)
+    
     # JWT error handlers
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
@@ -65,9 +96,6 @@ def create_app(config_class=Config):
     def missing_token_callback(error):
         return {'message': 'Missing token'}, 401
     
-    # Import Socket.IO events
-    from app import socketio_events
-    
     # Register CLI commands
     @app.cli.command("init-db")
     def init_db_command():
@@ -75,6 +103,14 @@ def create_app(config_class=Config):
         db.create_all()
         print("Database initialized!")
     
+    @app.cli.command("upgrade-db")
+    def upgrade_db_command():
+        """Add missing tables, columns and indexes to an existing database."""
+        from app.services.schema_service import upgrade_schema
+        
+        added = upgrade_schema()
+        print(f"Added: {', '.join(added)}" if added else "Database schema is up to date!")
+    
     @app.cli.command("create-admin")
     def create_admin_command():
         """Create an admin user."""
@@ -94,4 +130,72 @@ def create_app(config_class=Config):
         print(f"Email: {admin.email}")
         print(f"Password: AdminPass123!")
     
+    @app.cli.command("repair-feedback-stats")
+    def repair_feedback_stats_command():
+        """Recompute per-user feedback counters."""
+        from app.models import User
+        from app.services.schema_service import add_missing_columns
+        
+        added = add_missing_columns(User)
+        if added:
+            print(f"Added columns: {', '.join(added)}")
+        
+        updated = User.repair_feedback_stats()
+        print(f"Feedback stats repaired for {updated} users!")
+    
+    @app.cli.command("backfill-feedback-daily-stats")
+    def backfill_feedback_daily_stats_command():
+        """Rebuild the daily feedback rollup from history."""
+        from app.models import FeedbackDailyStats
+        from app.services.schema_service import add_missing_columns
+        from app.services.feedback_rollup import backfill_daily_stats
+        
+        add_missing_columns(FeedbackDailyStats)
+        print(f"Daily feedback stats rebuilt for {backfill_daily_stats()} days!")
+    
+    @app.cli.command("backfill-final-sentiment")
+    def backfill_final_sentiment_command():
+        """Store the effective sentiment of existing feedback."""
+        from app.models import Feedback
+        from app.services.schema_service import add_missing_columns, add_missing_indexes
+        
+        added = add_missing_columns(Feedback) + add_missing_indexes(Feedback)
+        if added:
+            print(f"Added: {', '.join(added)}")
+        
+        print(f"Final sentiment stored for {Feedback.backfill_final_sentiment()} feedback entries!")
+    
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index_command():
+        """Create and fill the feedback and user search indexes."""
+        from app.services.feedback_search import rebuild_search_index
+        from app.services.user_typeahead import create_typeahead_indexes
+        
+        indexed = rebuild_search_index()
+        if indexed is None:
+            print("Full-text search is not supported on this database; search uses ILIKE.")
+        else:
+            print(f"Search index rebuilt for {indexed} feedback entries!")
+        if create_typeahead_indexes():
+            print("Trigram indexes for the user typeahead are in place!")
+    
+    @app.cli.command("expire-exports")
+    def expire_exports_command():
+        """Delete expired export artifacts and fail stalled export jobs."""
+        from app.services.export_jobs import expire_export_jobs
+        
+        print(f"Expired {expire_export_jobs()} exports!")
+    
+    @app.cli.command("gc-avatars")
+    @click.option('--grace', default=3600, show_default=True,
+                  help='Keep unreferenced files younger than this many seconds.')
+    def gc_avatars_command(grace):
+        """Reconcile avatar storage with users and delete unused files."""
+        from app.services.avatar_service import collect_garbage
+        
+        result = collect_garbage(grace)
+        print(f"Avatars: moved {result['moved']} legacy files, deleted {result['deleted']} unused avatars "
+              f"and {result['stale_uploads']} stale uploads, fixed {result['counts_fixed']} counts, "
+              f"cleared {result['users_cleared']} users with missing files")
+    
     return app
@@ -1,10 +1,17 @@
-from flask import render_template, request, jsonify, current_app, send_file
+from flask import render_template, request, jsonify, current_app, Response, stream_with_context, send_file
+from flask_jwt_extended import get_jwt_identity
 from app.admin import bp
-from app.models import User, Feedback, Notification
+from app.models import User, Feedback, Notification, NotificationReadState, ExportJob
+from app.services import notification_service
+from app.services import admin_lists
+from app.services import feedback_export
+from app.services import export_jobs
+from app.services import user_typeahead
+from app.services.stats_service import get_stats_snapshot
+from app.services.bootstrap import add_page_data
+from app.services.conditional import conditional_json
 from app import db
-from datetime import datetime
-import csv
-import io
+from datetime import datetime, timedelta
 from functools import wraps
 
 
@@ -50,54 +57,38 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def _current_admin():
+    """Get the admin user verified by admin_required"""
+    return User.query.get(get_jwt_identity())
+
 @bp.route('/dashboard')
 @admin_required
 def admin_dashboard():
     """Admin dashboard"""
     try:
-        # Get statistics
-        total_users = User.query.count()
-        total_feedback = Feedback.query.count()
-        active_users = User.query.filter_by(is_active=True).count()
-        feedback_submitted = User.query.filter_by(has_submitted_feedback=True).count()
-        pending_feedback = total_users - feedback_submitted
-        feedback_rate = (feedback_submitted / total_users * 100) if total_users > 0 else 0
-        
-        # Get average rating
-        avg_rating = db.session.query(db.func.avg(Feedback.rating)).scalar() or 0
-        
-        # Get sentiment distribution
-        sentiment_stats = db.session.query(
-            Feedback.sentiment_label,
-            db.func.count(Feedback.id)
-        ).group_by(Feedback.sentiment_label).all()
-        
-        # Get recent feedback
-        recent_feedback = Feedback.query.order_by(Feedback.created_at.desc()).limit(10).all()
-        
-        feedback_data = []
-        for feedback in recent_feedback:
-            user = User.query.get(feedback.user_id)
-            feedback_data.append({
-                'id': feedback.id,
-                'user_name': user.name if user else 'Unknown',
-                'user_email': user.email if user else 'Unknown',
-                'text': feedback.text[:100] + '...' if len(feedback.text) > 100 else feedback.text,
-                'rating': feedback.rating,
-                'sentiment': feedback.get_final_sentiment()[0],
-                'created_at': feedback.created_at.strftime('%Y-%m-%d %H:%M'),
-                'is_corrected': feedback.is_corrected
-            })
+        # Get statistics (cached snapshot, two aggregate queries when stale)
+        stats = get_stats_snapshot()
+        
+        # Get recent feedback (one joined query, text preview only)
+        feedback_data = admin_lists.recent_feedback(10)
+        
+        # Initial lists for the page scripts, rendered into the page
+        admin = _current_admin()
+        add_page_data(
+            recent_users=admin_lists.users_page(1, 5, total=stats['total_users']).items,
+            recent_feedback=feedback_data[:5],
+            notifications=_notifications_payload(admin, 1, 10)
+        )
         
         return render_template('admin/dashboard.html',
-                             total_users=total_users,
-                             total_feedback=total_feedback,
-                             active_users=active_users,
-                             feedback_submitted=feedback_submitted,
-                             pending_feedback=pending_feedback,
-                             feedback_rate=feedback_rate,
-                             avg_rating=avg_rating,
-                             sentiment_distribution=dict(sentiment_stats),
+                             total_users=stats['total_users'],
+                             total_feedback=stats['total_feedback'],
+                             active_users=stats['active_users'],
+                             feedback_submitted=stats['feedback_submitted'],
+                             pending_feedback=stats['pending_feedback'],
+                             feedback_rate=stats['feedback_rate'],
+                             avg_rating=stats['average_rating'],
+                             sentiment_distribution=stats['sentiment_distribution'],
                              recent_feedback=feedback_data)
         
     except Exception as e:
@@ -119,34 +110,11 @@ def manage_users():
         per_page = request.args.get('per_page', 20, type=int)
         search = request.args.get('search', '').strip()
         
-        # Build query with search
-        query = User.query
-        if search:
-            search_filter = f"%{search}%"
-            query = query.filter(
-                db.or_(
-                    User.name.ilike(search_filter),
-                    User.email.ilike(search_filter)
-                )
-            )
-        
-        users_pagination = query.order_by(User.created_at.desc())\
-            .paginate(page=page, per_page=per_page, error_out=False)
-        
-        users_list = []
-        for user in users_pagination.items:
-            users_list.append({
-                'id': user.id,
-                'email': user.email,
-                'name': user.name,
-                'role': user.role,
-                'is_active': user.is_active,
-                'created_at': user.created_at.strftime('%Y-%m-%d'),
-                'feedback_count': user.feedback.count()
-            })
+        # Users and their feedback counts in one query
+        users_pagination = admin_lists.users_page(page, per_page, search)
         
         return jsonify({
-            'users': users_list,
+            'users': users_pagination.items,
             'total': users_pagination.total,
             'pages': users_pagination.pages,
             'current_page': page,
@@ -157,6 +125,20 @@ def manage_users():
         current_app.logger.error(f"User management error: {e}")
         return jsonify({'error': 'Failed to load users'}), 500
 
+@bp.route('/api/users/typeahead')
+@admin_required
+def user_typeahead_suggestions():
+    """Top user matches for the search box, most similar first"""
+    try:
+        query = request.args.get('q', '')
+        limit = request.args.get('limit', user_typeahead.DEFAULT_LIMIT, type=int)
+        
+        return jsonify({'users': user_typeahead.suggest_users(query, limit)})
+        
+    except Exception as e:
+        current_app.logger.error(f"User typeahead error: {e}")
+        return jsonify({'error': 'Failed to load suggestions'}), 500
+
 @bp.route('/users/<int:user_id>/toggle-status', methods=['POST'])
 @admin_required
 def toggle_user_status(user_id):
@@ -237,54 +219,17 @@ def manage_feedback():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
-        sentiment_filter = request.args.get('sentiment', '').strip()
-        search = request.args.get('search', '').strip()
+        try:
+            filters = admin_lists.FeedbackFilters.from_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Build query with filters
-        query = Feedback.query
-        
-        # Apply sentiment filter
-        if sentiment_filter:
-            # Check both original and corrected sentiment
-            query = query.filter(
-                db.or_(
-                    Feedback.sentiment_label == sentiment_filter,
-                    Feedback.admin_corrected_label == sentiment_filter
-                )
-            )
-        
-        # Apply search filter
-        if search:
-            search_filter = f"%{search}%"
-            query = query.filter(
-                db.or_(
-                    Feedback.text.ilike(search_filter),
-                    User.name.ilike(search_filter),
-                    User.email.ilike(search_filter)
-                )
-            ).join(User)  # Join with User table for name/email search
-        
-        feedback_pagination = query.order_by(Feedback.created_at.desc())\
-            .paginate(page=page, per_page=per_page, error_out=False)
-        
-        feedback_list = []
-        for feedback in feedback_pagination.items:
-            user = User.query.get(feedback.user_id)
-            feedback_list.append({
-                'id': feedback.id,
-                'user_name': user.name if user else 'Unknown',
-                'user_email': user.email if user else 'Unknown',
-                'text': feedback.text,
-                'rating': feedback.rating,
-                'sentiment': feedback.get_final_sentiment()[0],
-                'confidence': feedback.get_final_sentiment()[1],
-                'created_at': feedback.created_at.strftime('%Y-%m-%d %H:%M'),
-                'is_corrected': feedback.is_corrected,
-                'admin_corrected_label': feedback.admin_corrected_label
-            })
+        # Feedback with author details in one joined query, facet counts in one grouped query
+        feedback_pagination = admin_lists.feedback_page(page, per_page, filters)
         
         return jsonify({
-            'feedback': feedback_list,
+            'feedback': feedback_pagination.items,
+            'facets': feedback_pagination.facets,
             'total': feedback_pagination.total,
             'pages': feedback_pagination.pages,
             'current_page': page,
@@ -341,59 +286,165 @@ def correct_feedback_sentiment(feedback_id):
 @bp.route('/export/feedback.csv')
 @admin_required
 def export_feedback_csv():
-    """Export feedback data to CSV"""
+    """Export feedback data to CSV, streamed (add ?gzip=1 for a .csv.gz)"""
     try:
-        # Get all feedback
-        feedback_list = Feedback.query.order_by(Feedback.created_at.desc()).all()
-        
-        # Create CSV in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow([
-            'ID', 'User Email', 'User Name', 'Text', 'Rating', 
-            'Original Sentiment', 'Original Score', 'Corrected Sentiment', 
-            'Corrected Score', 'Is Corrected', 'Created At'
-        ])
-        
-        # Write data
-        for feedback in feedback_list:
-            user = User.query.get(feedback.user_id)
-            writer.writerow([
-                feedback.id,
-                user.email if user else 'Unknown',
-                user.name if user else 'Unknown',
-                feedback.text,
-                feedback.rating,
-                feedback.sentiment_label,
-                feedback.sentiment_score,
-                feedback.admin_corrected_label or '',
-                feedback.admin_corrected_score or '',
-                feedback.is_corrected,
-                feedback.created_at.strftime('%Y-%m-%d %H:%M')
-            ])
-        
-        # Prepare response
-        output.seek(0)
-        
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'feedback_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        compress = request.args.get('gzip', '').lower() in ('1', 'true')
+        filename = f'feedback_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        if compress:
+            filename += '.gz'
+        
+        # Rows are streamed from a server-side cursor (COPY on PostgreSQL),
+        # so the file is never held in memory
+        return Response(
+            stream_with_context(feedback_export.export_chunks(compress)),
+            mimetype='application/gzip' if compress else 'text/csv',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
         
     except Exception as e:
         current_app.logger.error(f"CSV export error: {e}")
         return jsonify({'error': 'Failed to export CSV'}), 500
 
+@bp.route('/exports', methods=['POST'])
+@admin_required
+def start_export():
+    """Start a background export of feedback, users or notifications"""
+    try:
+        data = request.get_json() or {}
+        job = export_jobs.start_export(
+            _current_admin(),
+            dataset=data.get('dataset', 'feedback'),
+            format=data.get('format', 'csv'),
+            incremental=bool(data.get('incremental', False))
+        )
+        
+        return jsonify({'job': job.to_dict()}), 202
+        
+    except export_jobs.ExportError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Export start error: {e}")
+        return jsonify({'error': 'Failed to start export'}), 500
+
+@bp.route('/exports')
+@admin_required
+def list_exports():
+    """List recent export jobs"""
+    try:
+        export_jobs.expire_export_jobs()
+        jobs = ExportJob.query.order_by(ExportJob.id.desc()).limit(20).all()
+        return jsonify({'jobs': [job.to_dict() for job in jobs]}), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Export list error: {e}")
+        return jsonify({'error': 'Failed to load exports'}), 500
+
+@bp.route('/exports/<int:job_id>')
+@admin_required
+def export_status(job_id):
+    """Get the progress of an export job"""
+    export_jobs.expire_export_jobs()  # a job whose worker died is reported failed
+    job = ExportJob.query.get_or_404(job_id)
+    return jsonify({'job': job.to_dict()}), 200
+
+@bp.route('/exports/<int:job_id>/download')
+@admin_required
+def download_export(job_id):
+    """Download a finished export (sendfile, or X-Sendfile when USE_X_SENDFILE is set)"""
+    job = ExportJob.query.get_or_404(job_id)
+    
+    if job.status == 'expired':
+        return jsonify({'error': 'Export has expired'}), 410
+    if job.status != 'completed' or not job.file_path:
+        return jsonify({'error': 'Export is not ready'}), 409
+    
+    return send_file(
+        job.file_path,
+        mimetype=export_jobs.MIMETYPES[job.format],
+        as_attachment=True,
+        download_name=job.download_name,
+        max_age=0
+    )
+
 @bp.route('/notifications')
 @admin_required
 def manage_notifications_page():
     """Manage notifications page - HTML view"""
+    admin = _current_admin()
+    add_page_data(
+        notification_stats=_notification_stats(admin),
+        notifications=_notifications_payload(admin, 1, 20)
+    )
     return render_template('admin/notifications.html')
 
+def _notifications_payload(admin, page, per_page, unread_only=False):
+    """A page of notifications as returned by /admin/api/notifications"""
+    read_state = NotificationReadState.for_user(admin.id)
+    
+    # Notifications with the triggering user in one joined query
+    notifications_pagination = admin_lists.notifications_page(
+        page, per_page,
+        unread_filter=(admin.role, read_state) if unread_only else None
+    )
+    
+    notifications_list = []
+    for notification in notifications_pagination.items:
+        notifications_list.append({
+            'id': notification.id,
+            'type': notification.type,
+            'message': notification.message,
+            'user_name': notification.user_name or 'System',
+            'user_email': notification.user_email or 'N/A',
+            'event_data': notification.event_data,
+            'is_read': read_state.is_read(notification.id),
+            'created_at': notification.timestamp.strftime('%Y-%m-%d %H:%M'),
+            'created_at_relative': _get_relative_time(notification.timestamp)
+        })
+    
+    return {
+        'notifications': notifications_list,
+        'total': notifications_pagination.total,
+        'pages': notifications_pagination.pages,
+        'current_page': page,
+        'per_page': per_page,
+        'unread_count': Notification.get_unread_count_for_user(admin)
+    }
+
+def _notification_stats(admin):
+    """Notification statistics as returned by /admin/api/notifications/stats"""
+    total_notifications = Notification.query.count()
+    unread_count = Notification.get_unread_count_for_user(admin)
+    
+    # Get notification type distribution
+    event_stats = db.session.query(
+        Notification.type,
+        db.func.count(Notification.id)
+    ).group_by(Notification.type).all()
+    
+    # Get recent activity (last 24 hours)
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    recent_count = Notification.query.filter(Notification.timestamp >= yesterday).count()
+    
+    return {
+        'total_notifications': total_notifications,
+        'unread_count': unread_count,
+        'recent_count': recent_count,
+        'event_distribution': dict(event_stats)
+    }
+
+def _notification_stats_version(admin):
+    """Version stamp of _notification_stats: two index lookups instead of four table scans"""
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    newest_id, recent_count = db.session.query(
+        # Primary key and timestamp index, neither reads the table
+        db.session.query(db.func.max(Notification.id)).scalar_subquery(),
+        db.session.query(db.func.count()).select_from(Notification)
+            .filter(Notification.timestamp >= yesterday).scalar_subquery()
+    ).one()
+    # Notifications are only appended; the recent count moves as they age
+    return (admin.id, admin.role, newest_id, recent_count, NotificationReadState.for_user(admin.id).version())
+
 @bp.route('/api/notifications')
 @admin_required
 def manage_notifications():
@@ -403,37 +454,7 @@ def manage_notifications():
         per_page = request.args.get('per_page', 20, type=int)
         unread_only = request.args.get('unread_only', 'false').lower() == 'true'
         
-        query = Notification.query
-        
-        if unread_only:
-            query = query.filter_by(read=False)
-        
-        notifications_pagination = query.order_by(Notification.timestamp.desc())\
-            .paginate(page=page, per_page=per_page, error_out=False)
-        
-        notifications_list = []
-        for notification in notifications_pagination.items:
-            user = User.query.get(notification.user_id) if notification.user_id else None
-            notifications_list.append({
-                'id': notification.id,
-                'type': notification.type,
-                'message': notification.message,
-                'user_name': user.name if user else 'System',
-                'user_email': user.email if user else 'N/A',
-                'event_data': notification.event_data,
-                'is_read': notification.read,
-                'created_at': notification.timestamp.strftime('%Y-%m-%d %H:%M'),
-                'created_at_relative': _get_relative_time(notification.timestamp)
-            })
-        
-        return jsonify({
-            'notifications': notifications_list,
-            'total': notifications_pagination.total,
-            'pages': notifications_pagination.pages,
-            'current_page': page,
-            'per_page': per_page,
-            'unread_count': Notification.get_unread_count_for_role('admin')
-        })
+        return jsonify(_notifications_payload(_current_admin(), page, per_page, unread_only))
         
     except Exception as e:
         current_app.logger.error(f"Notification management error: {e}")
@@ -442,15 +463,15 @@ def manage_notifications():
 @bp.route('/api/notifications/<int:notification_id>/mark-read', methods=['POST'])
 @admin_required
 def mark_notification_read(notification_id):
-    """Mark a notification as read"""
+    """Mark a notification as read for the current admin"""
     try:
-        notification = Notification.query.get_or_404(notification_id)
-        notification.read = True
-        db.session.commit()
+        unread_count = notification_service.mark_notification_read(notification_id, _current_admin())
+        if unread_count is None:
+            return jsonify({'error': 'Notification not found'}), 404
         
         return jsonify({
             'message': 'Notification marked as read',
-            'unread_count': Notification.get_unread_count_for_role('admin')
+            'unread_count': unread_count
         }), 200
         
     except Exception as e:
@@ -461,10 +482,10 @@ def mark_notification_read(notification_id):
 @bp.route('/api/notifications/mark-all-read', methods=['POST'])
 @admin_required
 def mark_all_notifications_read():
-    """Mark all notifications as read"""
+    """Mark all notifications as read for the current admin"""
     try:
-        Notification.query.filter_by(read=False).update({'read': True})
-        db.session.commit()
+        # Moves the admin's read cursor, a single row update
+        notification_service.mark_all_notifications_read(_current_admin())
         
         return jsonify({
             'message': 'All notifications marked as read',
@@ -481,26 +502,8 @@ def mark_all_notifications_read():
 def notification_stats():
     """Get notification statistics"""
     try:
-        total_notifications = Notification.query.count()
-        unread_count = Notification.get_unread_count_for_role('admin')
-        
-        # Get notification type distribution
-        event_stats = db.session.query(
-            Notification.type,
-            db.func.count(Notification.id)
-        ).group_by(Notification.type).all()
-        
-        # Get recent activity (last 24 hours)
-        from datetime import timedelta
-        yesterday = datetime.utcnow() - timedelta(days=1)
-        recent_count = Notification.query.filter(Notification.timestamp >= yesterday).count()
-        
-        return jsonify({
-            'total_notifications': total_notifications,
-            'unread_count': unread_count,
-            'recent_count': recent_count,
-            'event_distribution': dict(event_stats)
-        }), 200
+        admin = _current_admin()
+        return conditional_json(_notification_stats_version(admin), lambda: _notification_stats(admin))
         
     except Exception as e:
         current_app.logger.error(f"Notification stats error: {e}")
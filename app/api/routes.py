@@ -1,9 +1,14 @@
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.api import bp
 from app.models import User, Feedback, Notification
 from app.services.sentiment_service import get_sentiment_service
-from app.services.notification_service import get_notification_count_for_role, get_notifications_for_role, mark_notification_read
+from app.services.notification_service import get_unread_count_for_user, unread_count_version, get_notifications_for_role, get_read_state, mark_notification_read, mark_all_notifications_read
+from app.services.notification_stream import stream_notifications, parse_last_event_id
+from app.services.stats_service import get_stats_snapshot
+from app.services.conditional import conditional_json
+from app.services.startup import startup_report
+from app.services.feedback_rollup import daily_series, default_range
 from app import db, limiter
 from sqlalchemy import text
 from datetime import datetime
@@ -64,44 +69,51 @@ def feedback_stats():
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        # Get user's feedback statistics
-        total_feedback = Feedback.query.filter_by(user_id=current_user_id).count()
-        
-        # Sentiment distribution
-        sentiment_counts = db.session.query(
-            Feedback.sentiment_label,
-            db.func.count(Feedback.id)
-        ).filter_by(user_id=current_user_id).group_by(Feedback.sentiment_label).all()
-        
-        sentiment_stats = {}
-        for label, count in sentiment_counts:
-            sentiment_stats[label] = count
-        
-        # Rating distribution
-        rating_counts = db.session.query(
-            Feedback.rating,
-            db.func.count(Feedback.id)
-        ).filter_by(user_id=current_user_id).group_by(Feedback.rating).all()
-        
-        rating_stats = {}
-        for rating, count in rating_counts:
-            rating_stats[str(rating)] = count
-        
-        # Average rating
-        avg_rating = db.session.query(db.func.avg(Feedback.rating))\
-            .filter_by(user_id=current_user_id).scalar() or 0
-        
-        return jsonify({
-            'total_feedback': total_feedback,
-            'sentiment_distribution': sentiment_stats,
-            'rating_distribution': rating_stats,
-            'average_rating': round(float(avg_rating), 2)
-        }), 200
+        # Adding or deleting feedback moves the author's updated_at (aggregate
+        # columns), admin corrections move the feedback's own updated_at
+        last_change = db.session.query(db.func.max(Feedback.updated_at))\
+            .filter_by(user_id=user.id).scalar()
+        return conditional_json((user.id, user.updated_at, last_change), lambda: _feedback_stats(user.id))
         
     except Exception as e:
         current_app.logger.error(f"Feedback stats error: {e}")
         return jsonify({'error': 'Failed to get feedback statistics'}), 500
 
+def _feedback_stats(current_user_id):
+    """Feedback statistics of one user as returned by /api/feedback/stats"""
+    total_feedback = Feedback.query.filter_by(user_id=current_user_id).count()
+    
+    # Sentiment distribution (admin corrected if available)
+    sentiment_counts = db.session.query(
+        Feedback.final_sentiment_label,
+        db.func.count(Feedback.id)
+    ).filter_by(user_id=current_user_id).group_by(Feedback.final_sentiment_label).all()
+    
+    sentiment_stats = {}
+    for label, count in sentiment_counts:
+        sentiment_stats[label] = count
+    
+    # Rating distribution
+    rating_counts = db.session.query(
+        Feedback.rating,
+        db.func.count(Feedback.id)
+    ).filter_by(user_id=current_user_id).group_by(Feedback.rating).all()
+    
+    rating_stats = {}
+    for rating, count in rating_counts:
+        rating_stats[str(rating)] = count
+    
+    # Average rating
+    avg_rating = db.session.query(db.func.avg(Feedback.rating))\
+        .filter_by(user_id=current_user_id).scalar() or 0
+    
+    return {
+        'total_feedback': total_feedback,
+        'sentiment_distribution': sentiment_stats,
+        'rating_distribution': rating_stats,
+        'average_rating': round(float(avg_rating), 2)
+    }
+
 @bp.route('/admin/stats', methods=['GET'])
 @jwt_required()
 def admin_stats():
@@ -113,55 +125,58 @@ def admin_stats():
         if not user or not user.is_admin():
             return jsonify({'error': 'Admin access required'}), 403
         
-        # Overall statistics
-        total_users = User.query.count()
-        total_feedback = Feedback.query.count()
-        active_users = User.query.filter_by(is_active=True).count()
-        
-        # Sentiment distribution across all feedback
-        sentiment_counts = db.session.query(
-            Feedback.sentiment_label,
-            db.func.count(Feedback.id)
-        ).group_by(Feedback.sentiment_label).all()
+        # Cached snapshot shared with the admin dashboard
+        stats = get_stats_snapshot()
         
-        sentiment_stats = {}
-        for label, count in sentiment_counts:
-            sentiment_stats[label] = count
-        
-        # Rating distribution
-        rating_counts = db.session.query(
-            Feedback.rating,
-            db.func.count(Feedback.id)
-        ).group_by(Feedback.rating).all()
+        return jsonify({
+            'total_users': stats['total_users'],
+            'total_feedback': stats['total_feedback'],
+            'active_users': stats['active_users'],
+            'sentiment_distribution': stats['sentiment_distribution'],
+            'rating_distribution': stats['rating_distribution'],
+            'average_rating': stats['average_rating'],
+            'recent_users': stats['recent_users'],
+            'recent_feedback': stats['recent_feedback']
+        }), 200
         
-        rating_stats = {}
-        for rating, count in rating_counts:
-            rating_stats[str(rating)] = count
+    except Exception as e:
+        current_app.logger.error(f"Admin stats error: {e}")
+        return jsonify({'error': 'Failed to get admin statistics'}), 500
+
+@bp.route('/admin/stats/daily', methods=['GET'])
+@jwt_required()
+def admin_daily_stats():
+    """Get per-day feedback figures from the daily rollup (admin only)"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
         
-        # Average rating
-        avg_rating = db.session.query(db.func.avg(Feedback.rating)).scalar() or 0
+        if not user or not user.is_admin():
+            return jsonify({'error': 'Admin access required'}), 403
         
-        # Recent activity (last 7 days)
-        from datetime import datetime, timedelta
-        week_ago = datetime.utcnow() - timedelta(days=7)
+        start, end = default_range()
+        try:
+            if request.args.get('start'):
+                start = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+            if request.args.get('end'):
+                end = datetime.strptime(request.args['end'], '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
         
-        recent_users = User.query.filter(User.created_at >= week_ago).count()
-        recent_feedback = Feedback.query.filter(Feedback.created_at >= week_ago).count()
+        if start > end:
+            return jsonify({'error': 'start must not be after end'}), 400
+        if (end - start).days > 731:
+            return jsonify({'error': 'Range is limited to two years'}), 400
         
         return jsonify({
-            'total_users': total_users,
-            'total_feedback': total_feedback,
-            'active_users': active_users,
-            'sentiment_distribution': sentiment_stats,
-            'rating_distribution': rating_stats,
-            'average_rating': round(float(avg_rating), 2),
-            'recent_users': recent_users,
-            'recent_feedback': recent_feedback
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'days': daily_series(start, end)
         }), 200
         
     except Exception as e:
-        current_app.logger.error(f"Admin stats error: {e}")
-        return jsonify({'error': 'Failed to get admin statistics'}), 500
+        current_app.logger.error(f"Daily stats error: {e}")
+        return jsonify({'error': 'Failed to get daily statistics'}), 500
 
 @bp.route('/notifications/count', methods=['GET'])
 @jwt_required()
@@ -174,13 +189,11 @@ def get_notification_count():
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        # Get notification count for user's role
-        unread_count = get_notification_count_for_role(user.role)
-        
-        return jsonify({
+        # Get unread notification count for this user
+        return conditional_json(unread_count_version(user), lambda: {
             'is_admin': user.is_admin(),
-            'unread_count': unread_count
-        }), 200
+            'unread_count': get_unread_count_for_user(user)
+        })
         
     except Exception as e:
         current_app.logger.error(f"Error getting notification count: {e}")
@@ -204,24 +217,29 @@ def get_notifications():
         
         # Get notifications for user's role
         notifications = get_notifications_for_role(user.role, limit)
-        
-        # Format notifications
-        notification_list = []
-        for notification in notifications:
-            notification_list.append({
-                'id': notification.id,
-                'message': notification.message,
-                'type': notification.type,
-                'timestamp': notification.timestamp.isoformat(),
-                'read': notification.read,
-                'user_id': notification.user_id,
-                'event_data': notification.event_data
-            })
-        
-        return jsonify({
-            'notifications': notification_list,
-            'total': len(notification_list)
-        }), 200
+        read_state = get_read_state(user.id)
+        
+        def build():
+            # Format notifications
+            notification_list = []
+            for notification in notifications:
+                notification_data = notification.to_dict()
+                notification_data['read'] = read_state.is_read(notification.id)
+                notification_list.append(notification_data)
+            
+            return {
+                'notifications': notification_list,
+                'total': len(notification_list)
+            }
+        
+        # Notifications are only appended: the newest one and the read state
+        # version the list
+        newest = notifications[0] if notifications else None
+        last_modified = max(filter(None, (newest and newest.timestamp, read_state.updated_at)), default=None)
+        return conditional_json(
+            (user.id, user.role, limit, newest and newest.id, read_state.version()),
+            build, last_modified=last_modified
+        )
         
     except Exception as e:
         current_app.logger.error(f"Error getting notifications: {e}")
@@ -238,11 +256,14 @@ def mark_notification_read_api(notification_id):
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        # Mark notification as read
-        success = mark_notification_read(notification_id)
+        # Mark notification as read for this user only
+        unread_count = mark_notification_read(notification_id, user)
         
-        if success:
-            return jsonify({'message': 'Notification marked as read'}), 200
+        if unread_count is not None:
+            return jsonify({
+                'message': 'Notification marked as read',
+                'unread_count': unread_count
+            }), 200
         else:
             return jsonify({'error': 'Notification not found'}), 404
         
@@ -250,7 +271,71 @@ def mark_notification_read_api(notification_id):
         current_app.logger.error(f"Error marking notification as read: {e}")
         return jsonify({'error': 'Failed to mark notification as read'}), 500
 
+@bp.route('/notifications/read-all', methods=['POST'])
+@jwt_required()
+def mark_all_notifications_read_api():
+    """Mark all notifications for the current user's role as read"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        mark_all_notifications_read(user)
+        
+        return jsonify({
+            'message': 'All notifications marked as read',
+            'unread_count': 0
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error marking all notifications as read: {e}")
+        return jsonify({'error': 'Failed to mark notifications as read'}), 500
+
+@bp.route('/notifications/stream', methods=['GET'])
+@jwt_required()
+def notification_stream():
+    """Server-Sent Events stream of notifications, resumable with Last-Event-ID"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        # EventSource sends Last-Event-ID on reconnect; the query parameter
+        # lets a fresh page resume from the newest notification it rendered
+        last_id = parse_last_event_id(
+            request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        )
+        
+        config = current_app.config
+        if not config['NOTIFICATION_STREAM_ENABLED']:
+            # EventSource gives up on a non-200 response; the page polls instead
+            return jsonify({'error': 'Notification stream is not available, poll /api/notifications/count'}), 503
+        
+        events = stream_notifications(
+            user.role,
+            last_id,
+            replay_limit=config['NOTIFICATION_STREAM_REPLAY_LIMIT'],
+            poll_interval=config['NOTIFICATION_STREAM_POLL_INTERVAL'],
+            heartbeat_interval=config['NOTIFICATION_STREAM_HEARTBEAT'],
+            max_duration=config['NOTIFICATION_STREAM_MAX_DURATION']
+        )
+        
+        response = Response(stream_with_context(events), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # disable nginx buffering
+        return response
+        
+    except Exception as e:
+        current_app.logger.error(f"Error opening notification stream: {e}")
+        return jsonify({'error': 'Failed to open notification stream'}), 500
+
 @bp.route('/health', methods=['GET'])
+@limiter.exempt
 def health_check():
     """Health check endpoint"""
     try:
@@ -260,7 +345,8 @@ def health_check():
         return jsonify({
             'status': 'healthy',
             'timestamp': datetime.utcnow().isoformat(),
-            'database': 'connected'
+            'database': 'connected',
+            'startup': startup_report(current_app)
         }), 200
         
     except Exception as e:
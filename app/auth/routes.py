@@ -3,6 +3,8 @@ from flask_jwt_extended import create_access_token, create_refresh_token, jwt_re
 from app.auth import bp
 from app.models import User, TokenBlocklist, RecoveryCode, RecoveryAttempt
 from app import db, limiter
+from app.services.bootstrap import user_payload
+from app.services.conditional import conditional_json
 from app.forms import LoginForm, RegistrationForm
 from datetime import datetime, timedelta
 import re
@@ -268,16 +270,12 @@ def get_current_user():
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        return jsonify({
-            'user': {
-                'id': user.id,
-                'email': user.email,
-                'name': user.name,
-                'role': user.role,
-                'avatar_filename': user.avatar_filename,
-                'has_submitted_feedback': user.has_submitted_feedback
-            }
-        }), 200
+        # Every user column change moves updated_at
+        return conditional_json(
+            (user.id, user.updated_at),
+            lambda: {'user': user_payload(user)},
+            last_modified=user.updated_at
+        )
         
     except Exception as e:
         return jsonify({'error': 'Failed to get user info'}), 500
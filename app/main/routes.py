@@ -3,6 +3,8 @@ from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, verify_j
 from app.main import bp
 from app.models import User, Feedback, Notification
 from app import db
+from app.services.conditional import conditional_json
+from app.services.notification_service import unread_count_version
 
 @bp.route('/')
 def index():
@@ -157,9 +159,8 @@ def notification_count():
                     if user:
                         # Only admin users can see notification count
                         if user.role == 'admin':
-                            unread_count = Notification.query.filter_by(read=False).count()
-                            return jsonify({
-                                'unread_count': unread_count,
+                            return conditional_json(unread_count_version(user), lambda: {
+                                'unread_count': Notification.get_unread_count_for_user(user),
                                 'authenticated': True,
                                 'is_admin': True
                             })
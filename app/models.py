@@ -3,6 +3,9 @@ from app import db
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.hybrid import hybrid_property
 import re
 
 class User(db.Model):
@@ -15,10 +18,17 @@ class User(db.Model):
     name = db.Column(db.String(50), nullable=False)
     role = db.Column(db.String(20), default='user')  # 'user' or 'admin'
     avatar_filename = db.Column(db.String(255))
+    # Rendered avatar files by variant ('32'...'500' WebP, 'jpeg' fallback), see avatar_service
+    avatar_variants = db.Column(db.JSON)
+    avatar_pending = db.Column(db.String(64))  # Token of an upload still being processed
     is_active = db.Column(db.Boolean, default=True)
     has_submitted_feedback = db.Column(db.Boolean, default=False)  # Track if user has submitted feedback
+    # Feedback aggregates maintained on write (see _feedback_inserted/_feedback_deleted)
+    feedback_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    feedback_rating_total = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_feedback_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     feedback = db.relationship('Feedback', backref='user', lazy='dynamic', cascade='all, delete-orphan')
@@ -38,6 +48,44 @@ class User(db.Model):
         """Check if user has admin role"""
         return self.role == 'admin'
     
+    @hybrid_property
+    def average_rating(self):
+        """Average feedback rating, None without feedback"""
+        if not self.feedback_count:
+            return None
+        return self.feedback_rating_total / self.feedback_count
+    
+    @average_rating.expression
+    def average_rating(cls):
+        return db.case(
+            (cls.feedback_count > 0, db.cast(cls.feedback_rating_total, db.Float) / cls.feedback_count),
+            else_=None
+        )
+    
+    @staticmethod
+    def repair_feedback_stats(user_ids=None):
+        """Recompute the feedback aggregates from the feedback table in one UPDATE
+        
+        Needed after writes that bypass the ORM (bulk deletes, raw SQL, imports).
+        
+        Returns:
+            int: Number of users updated
+        """
+        def per_user(column):
+            return db.select(column).where(Feedback.user_id == User.id).scalar_subquery()
+        
+        statement = db.update(User).values(
+            feedback_count=per_user(db.func.count(Feedback.id)),
+            feedback_rating_total=per_user(db.func.coalesce(db.func.sum(Feedback.rating), 0)),
+            last_feedback_at=per_user(db.func.max(Feedback.created_at))
+        )
+        if user_ids is not None:
+            statement = statement.where(User.id.in_(user_ids))
+        
+        result = db.session.execute(statement.execution_options(synchronize_session=False))
+        db.session.commit()
+        return result.rowcount
+    
     @staticmethod
     def validate_email(email):
         """Validate email format"""
@@ -75,6 +123,71 @@ class User(db.Model):
         
         return True, "Name is valid"
 
+class AvatarBlob(db.Model):
+    """Reference count of one stored avatar, shared by users with identical images
+    
+    Stored avatar files are named after their content digest (see
+    avatar_storage); the count of users whose avatar_filename has that digest
+    is maintained by _count_avatar_* below. Files are deleted once it drops
+    to zero; the gc-avatars command recomputes the counts from users.
+    """
+    __tablename__ = 'avatar_blobs'
+    
+    digest = db.Column(db.String(64), primary_key=True)
+    ref_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<AvatarBlob {self.digest}: {self.ref_count}>'
+    
+    @staticmethod
+    def digest_of(filename):
+        """Digest shared by every stored file of one avatar ('<digest>-64.webp', '<digest>.jpg')"""
+        return filename.split('.', 1)[0].split('-', 1)[0]
+    
+    @staticmethod
+    def add_reference(connection, filename, amount):
+        """Add amount to the count of the avatar a filename belongs to, with one upsert"""
+        if not filename:
+            return
+        
+        table = AvatarBlob.__table__
+        digest = AvatarBlob.digest_of(filename)
+        dialect_insert = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}.get(connection.dialect.name)
+        if dialect_insert is not None:
+            statement = dialect_insert(table).values(digest=digest, ref_count=amount, created_at=datetime.utcnow())
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=[table.c.digest],
+                set_={'ref_count': table.c.ref_count + amount}
+            ))
+            return
+        
+        result = connection.execute(
+            table.update().where(table.c.digest == digest).values(ref_count=table.c.ref_count + amount)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(digest=digest, ref_count=amount, created_at=datetime.utcnow()))
+
+@event.listens_for(User, 'after_insert')
+def _count_avatar_inserted(mapper, connection, target):
+    """Count the avatar of a new user"""
+    AvatarBlob.add_reference(connection, target.avatar_filename, 1)
+
+@event.listens_for(User, 'after_update')
+def _count_avatar_updated(mapper, connection, target):
+    """Move the reference from the old avatar to the new one"""
+    history = inspect(target).attrs.avatar_filename.history
+    if not history.has_changes():
+        return
+    for old_filename in history.deleted:
+        AvatarBlob.add_reference(connection, old_filename, -1)
+    AvatarBlob.add_reference(connection, target.avatar_filename, 1)
+
+@event.listens_for(User, 'after_delete')
+def _count_avatar_deleted(mapper, connection, target):
+    """Drop the reference of a deleted user's avatar"""
+    AvatarBlob.add_reference(connection, target.avatar_filename, -1)
+
 class Feedback(db.Model):
     """Feedback model for user submissions"""
     __tablename__ = 'feedback'
@@ -88,9 +201,19 @@ class Feedback(db.Model):
     admin_corrected_label = db.Column(db.String(20))  # Admin override
     admin_corrected_score = db.Column(db.Float)
     is_corrected = db.Column(db.Boolean, default=False)
+    # Effective sentiment (admin correction if any), kept in sync by _sync_final_sentiment
+    final_sentiment_label = db.Column(db.String(20))
+    final_sentiment_score = db.Column(db.Float)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Sentiment filter with newest-first ordering
+        db.Index('ix_feedback_final_sentiment_created_at', 'final_sentiment_label', 'created_at'),
+        # Newest-first list and covering scan for the facet counts of a date range
+        db.Index('ix_feedback_created_at_facets', 'created_at', 'final_sentiment_label', 'rating', 'is_corrected'),
+    )
+    
     def __repr__(self):
         return f'<Feedback {self.id} by User {self.user_id}>'
     
@@ -118,6 +241,180 @@ class Feedback(db.Model):
         if self.is_corrected and self.admin_corrected_label:
             return self.admin_corrected_label, self.admin_corrected_score
         return self.sentiment_label, self.sentiment_score
+    
+    @staticmethod
+    def backfill_final_sentiment():
+        """Recompute the stored final sentiment of every feedback in one UPDATE
+        
+        Needed once after adding the columns, and after writes that bypass the ORM.
+        
+        Returns:
+            int: Number of feedback rows updated
+        """
+        is_corrected = db.and_(Feedback.is_corrected.is_(True), Feedback.admin_corrected_label.isnot(None))
+        result = db.session.execute(
+            db.update(Feedback).values(
+                final_sentiment_label=db.case((is_corrected, Feedback.admin_corrected_label),
+                                              else_=Feedback.sentiment_label),
+                final_sentiment_score=db.case((is_corrected, Feedback.admin_corrected_score),
+                                              else_=Feedback.sentiment_score),
+                # Not a content change: keep incremental exports from picking up every row
+                updated_at=Feedback.updated_at
+            ).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount
+
+@event.listens_for(Feedback, 'before_insert')
+@event.listens_for(Feedback, 'before_update')
+def _sync_final_sentiment(mapper, connection, target):
+    """Store the effective sentiment with every feedback write"""
+    target.final_sentiment_label, target.final_sentiment_score = target.get_final_sentiment()
+
+@event.listens_for(Feedback, 'after_insert')
+def _feedback_inserted(mapper, connection, target):
+    """Add new feedback to its author's aggregates in the same transaction"""
+    users = User.__table__
+    connection.execute(
+        users.update().where(users.c.id == target.user_id).values(
+            feedback_count=users.c.feedback_count + 1,
+            feedback_rating_total=users.c.feedback_rating_total + target.rating,
+            last_feedback_at=db.case(
+                (users.c.last_feedback_at > target.created_at, users.c.last_feedback_at),
+                else_=target.created_at
+            )
+        )
+    )
+
+@event.listens_for(Feedback, 'after_delete')
+def _feedback_deleted(mapper, connection, target):
+    """Remove deleted feedback from its author's aggregates in the same transaction"""
+    users = User.__table__
+    feedback = Feedback.__table__
+    connection.execute(
+        users.update().where(users.c.id == target.user_id).values(
+            feedback_count=users.c.feedback_count - 1,
+            feedback_rating_total=users.c.feedback_rating_total - target.rating,
+            last_feedback_at=db.select(db.func.max(feedback.c.created_at))
+                .where(feedback.c.user_id == target.user_id).scalar_subquery()
+        )
+    )
+
+class FeedbackDailyStats(db.Model):
+    """Per-day feedback rollup, maintained incrementally on every feedback write
+    
+    Sentiment counts use the final (admin corrected if available) label.
+    Rebuild from history with the backfill-feedback-daily-stats command.
+    """
+    __tablename__ = 'feedback_daily_stats'
+    
+    SENTIMENT_LABELS = ('positive', 'neutral', 'negative')
+    
+    day = db.Column(db.Date, primary_key=True)
+    feedback_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_1_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_2_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_3_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_4_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_5_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    positive_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    neutral_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    negative_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    corrected_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    def __repr__(self):
+        return f'<FeedbackDailyStats {self.day}: {self.feedback_count}>'
+    
+    @staticmethod
+    def contribution(rating, sentiment_label, admin_corrected_label, is_corrected):
+        """Column increments one feedback row adds to its day"""
+        final_label = admin_corrected_label if is_corrected and admin_corrected_label else sentiment_label
+        delta = {'feedback_count': 1, 'rating_sum': rating or 0}
+        if rating in (1, 2, 3, 4, 5):
+            delta[f'rating_{rating}_count'] = 1
+        if final_label in FeedbackDailyStats.SENTIMENT_LABELS:
+            delta[f'{final_label}_count'] = 1
+        if is_corrected:
+            delta['corrected_count'] = 1
+        return delta
+    
+    @staticmethod
+    def apply(connection, day, delta):
+        """Add delta to a day's row (creating it) with one upsert"""
+        delta = {column: amount for column, amount in delta.items() if amount}
+        if not delta:
+            return
+        
+        table = FeedbackDailyStats.__table__
+        dialect_insert = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}.get(connection.dialect.name)
+        if dialect_insert is not None:
+            statement = dialect_insert(table).values(day=day, **delta)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=[table.c.day],
+                set_={column: table.c[column] + statement.excluded[column] for column in delta}
+            ))
+            return
+        
+        result = connection.execute(
+            table.update().where(table.c.day == day)
+            .values({column: table.c[column] + amount for column, amount in delta.items()})
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(day=day, **delta))
+
+def _track_previous_value(target, value, oldvalue, initiator):
+    """No-op set listener; registering it with active_history loads the old value"""
+    return value
+
+# The rollup needs the previous value of these columns even when they are
+# assigned on an expired instance
+for _attribute in (Feedback.rating, Feedback.sentiment_label, Feedback.admin_corrected_label,
+                   Feedback.is_corrected, Feedback.created_at):
+    event.listen(_attribute, 'set', _track_previous_value, active_history=True, retval=True)
+# Avatar reference counts move from the previous avatar to the new one
+event.listen(User.avatar_filename, 'set', _track_previous_value, active_history=True, retval=True)
+
+def _feedback_state(target, old=False):
+    """(day, contribution) of a feedback row, before the pending change if old"""
+    state = inspect(target)
+    
+    def value(name):
+        history = state.attrs[name].history
+        if old and history.deleted:
+            return history.deleted[0]
+        return getattr(target, name)
+    
+    created_at = value('created_at')
+    contribution = FeedbackDailyStats.contribution(
+        value('rating'), value('sentiment_label'), value('admin_corrected_label'), value('is_corrected')
+    )
+    return created_at.date(), contribution
+
+@event.listens_for(Feedback, 'after_insert')
+def _rollup_feedback_inserted(mapper, connection, target):
+    """Add new feedback to its day's rollup"""
+    day, contribution = _feedback_state(target)
+    FeedbackDailyStats.apply(connection, day, contribution)
+
+@event.listens_for(Feedback, 'after_update')
+def _rollup_feedback_updated(mapper, connection, target):
+    """Move an edited or corrected feedback's contribution in the rollup"""
+    old_day, old_contribution = _feedback_state(target, old=True)
+    new_day, new_contribution = _feedback_state(target)
+    if old_day == new_day:
+        delta = {column: new_contribution.get(column, 0) - old_contribution.get(column, 0)
+                 for column in set(old_contribution) | set(new_contribution)}
+        FeedbackDailyStats.apply(connection, new_day, delta)
+    else:
+        FeedbackDailyStats.apply(connection, old_day, {column: -amount for column, amount in old_contribution.items()})
+        FeedbackDailyStats.apply(connection, new_day, new_contribution)
+
+@event.listens_for(Feedback, 'after_delete')
+def _rollup_feedback_deleted(mapper, connection, target):
+    """Remove deleted feedback from its day's rollup"""
+    day, contribution = _feedback_state(target, old=True)
+    FeedbackDailyStats.apply(connection, day, {column: -amount for column, amount in contribution.items()})
 
 class TokenBlocklist(db.Model):
     """Model for tracking revoked JWT tokens"""
@@ -134,12 +431,16 @@ class TokenBlocklist(db.Model):
 class Notification(db.Model):
     """Model for tracking system notifications and key events"""
     __tablename__ = 'notifications'
+    __table_args__ = (
+        # Unread counts are a range count over (recipient_role, id > cursor)
+        db.Index('ix_notifications_role_id', 'recipient_role', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     message = db.Column(db.Text, nullable=False)
     type = db.Column(db.String(20), nullable=False)  # 'success', 'info', 'warning', 'error'
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-    read = db.Column(db.Boolean, default=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Range counts (last 24 hours)
+    read = db.Column(db.Boolean, default=False)  # Legacy global flag, read state is per user (NotificationReadState)
     recipient_role = db.Column(db.String(20), default='admin')  # 'admin' or 'user'
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # User who triggered the event
     event_data = db.Column(db.JSON)  # Additional event data
@@ -164,9 +465,18 @@ class Notification(db.Model):
         return notification
     
     @staticmethod
-    def get_unread_count_for_role(role='admin'):
-        """Get count of unread notifications for a specific role"""
-        return Notification.query.filter_by(read=False, recipient_role=role).count()
+    def get_unread_count_for_user(user):
+        """Get count of notifications for the user's role the user has not read"""
+        state = NotificationReadState.query.get(user.id)
+        
+        query = Notification.query.filter(
+            Notification.recipient_role == user.role,
+            Notification.id > (state.last_read_id if state else 0)
+        )
+        if state and state.read_ids:
+            # Ids read under a previous role are not in this role's range
+            query = query.filter(Notification.id.notin_(state.read_ids))
+        return query.count()
     
     @staticmethod
     def get_recent_notifications_for_role(role='admin', limit=50):
@@ -174,14 +484,100 @@ class Notification(db.Model):
         return Notification.query.filter_by(recipient_role=role).order_by(Notification.timestamp.desc()).limit(limit).all()
     
     @staticmethod
-    def mark_as_read(notification_id):
-        """Mark a notification as read"""
+    def mark_as_read(notification_id, user):
+        """Mark a notification as read for one user"""
         notification = Notification.query.get(notification_id)
-        if notification:
-            notification.read = True
-            db.session.commit()
-            return True
-        return False
+        if not notification:
+            return False
+        
+        state = NotificationReadState.get_or_create(user.id)
+        if notification.recipient_role == user.role and not state.is_read(notification.id):
+            # Reassign so the JSON column change is detected
+            state.read_ids = sorted((state.read_ids or []) + [notification.id])
+            state.updated_at = datetime.utcnow()
+            state.compact(user.role)
+        db.session.commit()
+        return True
+    
+    @staticmethod
+    def mark_all_as_read(user):
+        """Mark every notification for the user's role as read (one row update)"""
+        latest_id = db.session.query(db.func.max(Notification.id))\
+            .filter(Notification.recipient_role == user.role).scalar() or 0
+        
+        state = NotificationReadState.get_or_create(user.id)
+        state.advance(latest_id)
+        db.session.commit()
+        return state
+
+class NotificationReadState(db.Model):
+    """Per-user notification read state
+    
+    Everything up to ``last_read_id`` is read. Notifications above the cursor
+    that were opened one by one are kept in the sparse ``read_ids`` set, which
+    is emptied whenever the cursor moves past them.
+    """
+    __tablename__ = 'notification_read_state'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    last_read_id = db.Column(db.Integer, nullable=False, default=0)
+    read_ids = db.Column(db.JSON, default=list)  # Read notification ids above last_read_id
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<NotificationReadState user={self.user_id} cursor={self.last_read_id}>'
+    
+    @staticmethod
+    def for_user(user_id):
+        """Get the read state for a user, or an unsaved empty one"""
+        return NotificationReadState.query.get(user_id) or \
+            NotificationReadState(user_id=user_id, last_read_id=0, read_ids=[])
+    
+    @staticmethod
+    def get_or_create(user_id):
+        """Get the read state for a user, adding an empty one if needed"""
+        state = NotificationReadState.query.get(user_id)
+        if not state:
+            state = NotificationReadState(user_id=user_id, last_read_id=0, read_ids=[])
+            db.session.add(state)
+        return state
+    
+    def is_read(self, notification_id):
+        """Check if a notification is read"""
+        return notification_id <= (self.last_read_id or 0) or notification_id in (self.read_ids or [])
+    
+    def version(self):
+        """Stamp that changes whenever the read state does (for ETags)"""
+        return (self.last_read_id or 0, len(self.read_ids or []), self.updated_at)
+    
+    def advance(self, notification_id):
+        """Move the cursor forward (never backwards) and drop covered exceptions"""
+        if notification_id > (self.last_read_id or 0):
+            self.last_read_id = notification_id
+            self.read_ids = [read_id for read_id in (self.read_ids or []) if read_id > notification_id]
+            self.updated_at = datetime.utcnow()
+    
+    def compact(self, role):
+        """Advance the cursor over the role's notifications read one by one right above it
+        
+        Keeps ``read_ids`` down to the gaps: reading in order leaves it empty.
+        """
+        read_ids = set(self.read_ids or [])
+        if not read_ids:
+            return
+        following = db.session.query(Notification.id).filter(
+            Notification.recipient_role == role,
+            Notification.id > (self.last_read_id or 0),
+            Notification.id <= max(read_ids)
+        ).order_by(Notification.id).limit(len(read_ids) + 1)
+        
+        cursor = None
+        for (notification_id,) in following:
+            if notification_id not in read_ids:
+                break
+            cursor = notification_id
+        if cursor is not None:
+            self.advance(cursor)
 
 class RecoveryCode(db.Model):
     """Model for storing user recovery codes"""
@@ -283,3 +679,70 @@ class RecoveryAttempt(db.Model):
         )
         db.session.add(attempt)
         return attempt
+
+class ExportJob(db.Model):
+    """Background data export requested by an admin
+    
+    The artifact is written to EXPORT_DIR by a background task; progress is
+    kept on the row so any worker can report it.
+    """
+    __tablename__ = 'export_jobs'
+    
+    DATASETS = ('feedback', 'users', 'notifications')
+    FORMATS = ('csv', 'ndjson', 'parquet')
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    dataset = db.Column(db.String(20), nullable=False)  # 'feedback', 'users' or 'notifications'
+    format = db.Column(db.String(10), nullable=False)  # 'csv', 'ndjson' or 'parquet'
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'running', 'completed', 'failed', 'expired'
+    since = db.Column(db.DateTime, nullable=True)  # Incremental: only rows changed after this
+    rows_total = db.Column(db.Integer)
+    rows_written = db.Column(db.Integer, nullable=False, default=0)
+    file_path = db.Column(db.String(500))
+    file_size = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Heartbeat: every progress commit
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<ExportJob {self.id}: {self.dataset}.{self.format} {self.status}>'
+    
+    @property
+    def progress(self):
+        """Fraction of rows written, between 0 and 1"""
+        if self.status == 'completed':
+            return 1.0
+        if not self.rows_total:
+            return 0.0
+        return min(1.0, self.rows_written / self.rows_total)
+    
+    @property
+    def download_name(self):
+        """File name offered to the browser"""
+        extension = {'csv': 'csv', 'ndjson': 'ndjson', 'parquet': 'parquet'}[self.format]
+        stamp = (self.started_at or self.created_at).strftime('%Y%m%d_%H%M%S')
+        return f'{self.dataset}_export_{stamp}.{extension}'
+    
+    def to_dict(self):
+        """Serialize for the export API"""
+        return {
+            'id': self.id,
+            'dataset': self.dataset,
+            'format': self.format,
+            'status': self.status,
+            'incremental': self.since is not None,
+            'since': self.since.isoformat() if self.since else None,
+            'rows_total': self.rows_total,
+            'rows_written': self.rows_written,
+            'progress': round(self.progress, 4),
+            'file_size': self.file_size,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
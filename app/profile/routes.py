@@ -3,52 +3,12 @@ from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from app.profile import bp
 from app.models import User
 from app.forms import ProfileUpdateForm
+from app.services import avatar_service
 from app import db
-import os
+from werkzeug.exceptions import NotFound
 from werkzeug.utils import secure_filename
-from PIL import Image
-import uuid
 
 
-def allowed_file(filename):
-    """Check if file extension is allowed"""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
-
-def save_avatar(file):
-    """Save avatar file with proper naming and validation"""
-    if file and allowed_file(file.filename):
-        # Generate unique filename
-        ext = file.filename.rsplit('.', 1)[1].lower()
-        filename = f"{uuid.uuid4().hex}.{ext}"
-        
-        # Ensure upload directory exists
-        upload_path = current_app.config['UPLOAD_FOLDER']
-        os.makedirs(upload_path, exist_ok=True)
-        
-        filepath = os.path.join(upload_path, filename)
-        
-        # Open and validate image
-        try:
-            with Image.open(file.stream) as img:
-                # Convert to RGB if necessary
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
-                
-                # Resize if too large (max 500x500)
-                if img.width > 500 or img.height > 500:
-                    img.thumbnail((500, 500), Image.Resampling.LANCZOS)
-                
-                # Save optimized image
-                img.save(filepath, 'JPEG', quality=85, optimize=True)
-                
-                return filename
-        except Exception as e:
-            current_app.logger.error(f"Error processing avatar: {e}")
-            return None
-    
-    return None
-
 @bp.route('/', methods=['GET'])
 def profile():
     """User profile page"""
@@ -113,41 +73,43 @@ def update_profile():
         if not is_valid:
             return jsonify({'error': name_msg}), 400
         
-        # Handle avatar upload
-        avatar_filename = None
+        # Handle avatar upload: only checked and staged here, rendered in the background
+        avatar_token = None
         if 'avatar' in request.files:
             file = request.files['avatar']
             if file.filename:  # Only process if file was selected
-                avatar_filename = save_avatar(file)
-                if not avatar_filename:
-                    return jsonify({'error': 'Invalid avatar file'}), 400
+                try:
+                    avatar_token = avatar_service.stage_upload(file)
+                except avatar_service.AvatarError as e:
+                    return jsonify({'error': str(e)}), 400
         
         # Update user
         user.name = name
-        if avatar_filename:
-            # Remove old avatar if exists
-            if user.avatar_filename:
-                old_avatar_path = os.path.join(current_app.config['UPLOAD_FOLDER'], user.avatar_filename)
-                if os.path.exists(old_avatar_path):
-                    os.remove(old_avatar_path)
-            user.avatar_filename = avatar_filename
+        if avatar_token:
+            user.avatar_pending = avatar_token
         
         db.session.commit()
         
+        if avatar_token:
+            # Variants replace the current avatar once rendered ('avatar_ready' event)
+            avatar_service.start_processing(user, avatar_token)
+        
         # Create notification for profile update
         from app.services.notification_service import send_admin_notification
         send_admin_notification(
             message=f'User {user.name} ({user.email}) has updated their profile.',
             type='info',
             user_id=user.id,
-            event_data={'name': user.name, 'avatar_updated': bool(avatar_filename)}
+            event_data={'name': user.name, 'avatar_updated': bool(avatar_token)}
         )
         
         return jsonify({
             'message': 'Profile updated successfully',
             'user': {
                 'name': user.name,
-                'avatar_filename': user.avatar_filename
+                'avatar_filename': user.avatar_filename,
+                'avatar_url': avatar_service.avatar_url(user),
+                'avatar_processing': user.avatar_pending is not None
             }
         }), 200
         
@@ -158,21 +120,26 @@ def update_profile():
 
 @bp.route('/avatar/<filename>')
 def get_avatar(filename):
-    """Serve avatar files"""
-    try:
-        from flask import send_from_directory
-        # Get the absolute path to the upload folder
-        upload_folder = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'uploads')
-        print(f"DEBUG: Serving avatar {filename} from folder {upload_folder}")
-        print(f"DEBUG: Full path: {os.path.join(upload_folder, filename)}")
-        print(f"DEBUG: File exists: {os.path.exists(os.path.join(upload_folder, filename))}")
-        
-        if not os.path.exists(os.path.join(upload_folder, filename)):
-            print(f"DEBUG: File not found: {filename}")
-            return jsonify({'error': 'Avatar file not found'}), 404
-            
-        return send_from_directory(upload_folder, filename)
-    except Exception as e:
-        print(f"DEBUG: Avatar serve error: {e}")
-        current_app.logger.error(f"Avatar serve error: {e}")
+    """
+    Serve avatar files
+
+    Stored names are content hashes and never rewritten, so responses are
+    cacheable forever. A matching If-None-Match is answered without touching
+    storage, and with AVATAR_ACCEL_REDIRECT set nginx sends the file.
+    """
+    if filename != secure_filename(filename):
         return jsonify({'error': 'Avatar not found'}), 404
+
+    if request.if_none_match.contains_weak(filename):
+        response = current_app.response_class(status=304)
+    else:
+        try:
+            response = avatar_service.get_storage().serve(filename)
+        except (FileNotFoundError, NotFound):
+            return jsonify({'error': 'Avatar file not found'}), 404
+
+    response.set_etag(filename)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['AVATAR_CACHE_MAX_AGE']
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,430 @@
+"""
+Column projections for the admin list views
+
+Each list page is fetched as one joined SELECT of only the columns the view
+renders (plus a COUNT for pagination), instead of loading full ORM objects
+and then querying the author of every row. Rows are plain tuples, so
+serializing them can never trigger a lazy load; with ``RAISE_ON_LAZY_LOAD``
+enabled (as in testing) any lazy or deferred load inside a list view raises
+``LazyLoadError`` so regressions fail loudly.
+"""
+import contextvars
+import math
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from flask import current_app
+from sqlalchemy import event, select, func, case
+from sqlalchemy.orm import Session
+from app import db
+from app.models import User, Feedback, Notification
+from app.services import feedback_search
+
+# Preview length of feedback text on the dashboard
+TEXT_PREVIEW_LENGTH = 100
+
+# Facet values of the admin feedback list
+SENTIMENT_LABELS = ('positive', 'neutral', 'negative')
+RATINGS = (1, 2, 3, 4, 5)
+CORRECTED_STATES = ('corrected', 'uncorrected')
+
+
+class LazyLoadError(RuntimeError):
+    """Raised when a guarded list view lazy-loads a relationship or column"""
+
+
+_guarded = contextvars.ContextVar('admin_list_guarded', default=False)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _raise_on_lazy_load(orm_execute_state):
+    """Reject lazy loads while a list view guard is active"""
+    if _guarded.get() and (orm_execute_state.is_relationship_load or orm_execute_state.is_column_load):
+        raise LazyLoadError(f'Lazy load in admin list view: {orm_execute_state.statement}')
+
+
+@contextmanager
+def list_view_guard():
+    """Raise on lazy loads inside the block when RAISE_ON_LAZY_LOAD is set"""
+    if not current_app.config.get('RAISE_ON_LAZY_LOAD'):
+        yield
+        return
+    token = _guarded.set(True)
+    try:
+        yield
+    finally:
+        _guarded.reset(token)
+
+
+class RowPage:
+    """One page of projected rows"""
+
+    def __init__(self, items, total, page, per_page):
+        self.items = items
+        self.total = total
+        self.page = page
+        self.per_page = per_page
+
+    @property
+    def pages(self):
+        """Total number of pages"""
+        return math.ceil(self.total / self.per_page) if self.total else 0
+
+
+def paginate_rows(stmt, page, per_page, total=None):
+    """Fetch one page of a select statement (a COUNT plus the page query)
+
+    A total that is already known skips the COUNT.
+    """
+    page = max(page, 1)
+    per_page = max(per_page, 1)
+    if total is None:
+        total = db.session.execute(
+            select(func.count()).select_from(stmt.order_by(None).subquery())
+        ).scalar()
+    items = db.session.execute(
+        stmt.limit(per_page).offset((page - 1) * per_page)
+    ).all()
+    return RowPage(items, total, page, per_page)
+
+
+def recent_feedback(limit=10):
+    """Newest feedback for the dashboard, with a text preview instead of the full text"""
+    stmt = select(
+        Feedback.id,
+        User.name.label('user_name'),
+        User.email.label('user_email'),
+        func.substr(Feedback.text, 1, TEXT_PREVIEW_LENGTH + 1).label('text_preview'),
+        Feedback.rating,
+        Feedback.final_sentiment_label.label('sentiment'),
+        Feedback.created_at,
+        Feedback.is_corrected
+    ).outerjoin(User, Feedback.user_id == User.id)\
+        .order_by(Feedback.created_at.desc()).limit(limit)
+
+    with list_view_guard():
+        return [{
+            'id': row.id,
+            'user_name': row.user_name or 'Unknown',
+            'user_email': row.user_email or 'Unknown',
+            'text': row.text_preview[:TEXT_PREVIEW_LENGTH] + '...'
+                if len(row.text_preview) > TEXT_PREVIEW_LENGTH else row.text_preview,
+            'rating': row.rating,
+            'sentiment': row.sentiment,
+            'created_at': row.created_at.strftime('%Y-%m-%d %H:%M'),
+            'is_corrected': row.is_corrected
+        } for row in db.session.execute(stmt)]
+
+
+def users_page(page, per_page, search='', total=None):
+    """A page of users with their (denormalized) feedback aggregates"""
+    stmt = select(
+        User.id,
+        User.email,
+        User.name,
+        User.role,
+        User.is_active,
+        User.created_at,
+        User.feedback_count,
+        User.average_rating.label('average_rating'),
+        User.last_feedback_at
+    )
+    if search:
+        search_filter = f"%{search}%"
+        stmt = stmt.where(db.or_(User.name.ilike(search_filter), User.email.ilike(search_filter)))
+    stmt = stmt.order_by(User.created_at.desc())
+
+    with list_view_guard():
+        result = paginate_rows(stmt, page, per_page, total)
+        result.items = [{
+            'id': row.id,
+            'email': row.email,
+            'name': row.name,
+            'role': row.role,
+            'is_active': row.is_active,
+            'created_at': row.created_at.strftime('%Y-%m-%d'),
+            'feedback_count': row.feedback_count,
+            'average_rating': round(row.average_rating, 2) if row.average_rating is not None else None,
+            'last_feedback_at': row.last_feedback_at.strftime('%Y-%m-%d %H:%M') if row.last_feedback_at else None
+        } for row in result.items]
+        return result
+
+
+class FeedbackFilters:
+    """
+    Filters of the admin feedback list
+
+    sentiments, ratings and corrected (``'corrected'``/``'uncorrected'``)
+    are facets: sets of selected values, empty meaning all. The date range
+    (inclusive days, UTC) and the search narrow every facet count.
+    """
+
+    FACETS = ('sentiment', 'rating', 'corrected')
+
+    def __init__(self, sentiments=(), ratings=(), corrected=(), date_from=None, date_to=None, search=''):
+        self.sentiments = frozenset(sentiments)
+        self.ratings = frozenset(ratings)
+        self.corrected = frozenset(corrected)
+        self.date_from = date_from
+        self.date_to = date_to
+        self.search = search
+
+    @classmethod
+    def from_args(cls, args):
+        """Filters from query string arguments (comma separated facet values)
+
+        Raises:
+            ValueError: On unknown facet values or invalid dates
+        """
+        def values(name, allowed, convert=str):
+            selected = set()
+            for value in args.get(name, '').split(','):
+                value = value.strip()
+                if not value:
+                    continue
+                try:
+                    value = convert(value)
+                except ValueError:
+                    value = None
+                if value not in allowed:
+                    raise ValueError(f'Invalid {name} filter')
+                selected.add(value)
+            return selected
+
+        def day(name):
+            value = args.get(name, '').strip()
+            try:
+                return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+            except ValueError:
+                raise ValueError(f'{name} must be YYYY-MM-DD')
+
+        filters = cls(
+            sentiments=values('sentiment', SENTIMENT_LABELS),
+            ratings=values('rating', RATINGS, int),
+            corrected=values('corrected', CORRECTED_STATES),
+            date_from=day('date_from'),
+            date_to=day('date_to'),
+            search=args.get('search', '').strip()
+        )
+        if filters.date_from and filters.date_to and filters.date_from > filters.date_to:
+            raise ValueError('date_from must not be after date_to')
+        return filters
+
+    def conditions(self, exclude=()):
+        """SQL conditions of the date range and of every facet not in exclude"""
+        conditions = []
+        if self.date_from:
+            conditions.append(Feedback.created_at >= datetime.combine(self.date_from, time.min))
+        if self.date_to:
+            conditions.append(Feedback.created_at < datetime.combine(self.date_to + timedelta(days=1), time.min))
+        if self.sentiments and 'sentiment' not in exclude:
+            conditions.append(Feedback.final_sentiment_label.in_(sorted(self.sentiments)))
+        if self.ratings and 'rating' not in exclude:
+            conditions.append(Feedback.rating.in_(sorted(self.ratings)))
+        if len(self.corrected) == 1 and 'corrected' not in exclude:
+            conditions.append(Feedback.is_corrected.is_(True) if 'corrected' in self.corrected
+                              else Feedback.is_corrected.isnot(True))
+        return conditions
+
+    def selects(self, sentiment, rating, corrected, exclude=None):
+        """Whether a (sentiment, rating, corrected state) group passes every facet but exclude"""
+        return all((
+            exclude == 'sentiment' or not self.sentiments or sentiment in self.sentiments,
+            exclude == 'rating' or not self.ratings or rating in self.ratings,
+            exclude == 'corrected' or not self.corrected or corrected in self.corrected
+        ))
+
+
+def _search_feedback(stmt, search, ranked=False, join_users=False):
+    """
+    Restrict a select from feedback to search matches
+
+    Uses the full-text index when there is one (ranked adds its rank and
+    snippet columns), else ILIKE over text and author name/email (joining
+    users first if join_users).
+
+    Returns:
+        tuple: (statement, whether the full-text index was used)
+    """
+    searched = (feedback_search.apply_search if ranked else feedback_search.filter_matches)(stmt, search)
+    if searched is not None:
+        return searched, True
+
+    if join_users:
+        stmt = stmt.outerjoin(User, Feedback.user_id == User.id)
+    search_filter = f"%{search}%"
+    return stmt.where(db.or_(
+        Feedback.text.ilike(search_filter),
+        User.name.ilike(search_filter),
+        User.email.ilike(search_filter)
+    )), False
+
+
+def feedback_facets(filters):
+    """
+    Per-facet counts and the filtered total, from one grouped query
+
+    Each facet is counted with every other filter applied but not its own,
+    so the counts show what selecting another value would return.
+
+    Returns:
+        tuple: (facets dict, total rows matching every filter)
+    """
+    corrected = case((Feedback.is_corrected.is_(True), 'corrected'), else_='uncorrected')
+    stmt = select(Feedback.final_sentiment_label, Feedback.rating, corrected, func.count())\
+        .select_from(Feedback)\
+        .where(*filters.conditions(exclude=FeedbackFilters.FACETS))\
+        .group_by(Feedback.final_sentiment_label, Feedback.rating, corrected)
+    if filters.search:
+        stmt = _search_feedback(stmt, filters.search, join_users=True)[0]
+
+    facets = {
+        'sentiment': dict.fromkeys(SENTIMENT_LABELS, 0),
+        'rating': {str(rating): 0 for rating in RATINGS},
+        'corrected': dict.fromkeys(CORRECTED_STATES, 0)
+    }
+    total = 0
+    for label, rating, state, count in db.session.execute(stmt):
+        for facet, value in (('sentiment', label), ('rating', str(rating)), ('corrected', state)):
+            if value in facets[facet] and filters.selects(label, rating, state, exclude=facet):
+                facets[facet][value] += count
+        if filters.selects(label, rating, state):
+            total += count
+    return facets, total
+
+
+def feedback_page(page, per_page, filters=None):
+    """A page of feedback with author name and email, plus facet counts
+
+    With a search, matches come from the full-text index ranked by
+    relevance, each with a highlighted ``snippet``; databases without the
+    index fall back to ILIKE. The page's ``facets`` and ``total`` come from
+    ``feedback_facets``, so no separate COUNT query runs.
+    """
+    filters = filters or FeedbackFilters()
+    stmt = select(
+        Feedback.id,
+        User.name.label('user_name'),
+        User.email.label('user_email'),
+        Feedback.text,
+        Feedback.rating,
+        Feedback.final_sentiment_label.label('sentiment'),
+        Feedback.final_sentiment_score.label('confidence'),
+        Feedback.created_at,
+        Feedback.is_corrected,
+        Feedback.admin_corrected_label
+    ).outerjoin(User, Feedback.user_id == User.id)\
+        .where(*filters.conditions())\
+        .order_by(Feedback.created_at.desc())
+    searched = False
+    if filters.search:
+        stmt, searched = _search_feedback(stmt, filters.search, ranked=True)
+
+    with list_view_guard():
+        facets, total = feedback_facets(filters)
+        result = paginate_rows(stmt, page, per_page, total=total)
+        result.facets = facets
+        result.items = [{
+            'id': row.id,
+            'user_name': row.user_name or 'Unknown',
+            'user_email': row.user_email or 'Unknown',
+            'text': row.text,
+            'rating': row.rating,
+            'sentiment': row.sentiment,
+            'confidence': row.confidence,
+            'created_at': row.created_at.strftime('%Y-%m-%d %H:%M'),
+            'is_corrected': row.is_corrected,
+            'admin_corrected_label': row.admin_corrected_label,
+            'snippet': feedback_search.highlight(row.snippet) if searched else None
+        } for row in result.items]
+        return result
+
+
+def feedback_export_statement():
+    """Select of every export column, feedback joined with its author, newest first"""
+    return select(
+        Feedback.id,
+        User.email.label('user_email'),
+        User.name.label('user_name'),
+        Feedback.text,
+        Feedback.rating,
+        Feedback.sentiment_label,
+        Feedback.sentiment_score,
+        Feedback.admin_corrected_label,
+        Feedback.admin_corrected_score,
+        Feedback.is_corrected,
+        Feedback.created_at
+    ).outerjoin(User, Feedback.user_id == User.id)\
+        .order_by(Feedback.created_at.desc())
+
+
+def _export_row(row):
+    """One feedback export row as CSV values"""
+    return [
+        row.id,
+        row.user_email or 'Unknown',
+        row.user_name or 'Unknown',
+        row.text,
+        row.rating,
+        row.sentiment_label,
+        row.sentiment_score,
+        row.admin_corrected_label or '',
+        row.admin_corrected_score or '',
+        row.is_corrected,
+        row.created_at.strftime('%Y-%m-%d %H:%M')
+    ]
+
+
+def feedback_export_rows(batch_size=1000):
+    """All feedback as export rows, newest first, in one server-side cursor
+
+    Rows are fetched batch_size at a time, so memory use does not grow
+    with the size of the table. The lazy-load guard covers the query and
+    each batch as it is materialized, never a ``yield``: the caller's code
+    runs between yields, possibly in another context.
+    """
+    stmt = feedback_export_statement().execution_options(yield_per=batch_size)
+
+    with list_view_guard():
+        result = db.session.execute(stmt)
+    try:
+        partitions = result.partitions()
+        while True:
+            with list_view_guard():
+                batch = [_export_row(row) for row in next(partitions, ())]
+            if not batch:
+                return
+            yield from batch
+    finally:
+        result.close()
+
+
+def notifications_page(page, per_page, unread_filter=None):
+    """
+    A page of notifications with the triggering user's name and email
+
+    Args:
+        unread_filter: Optional (role, read_state) limiting the page to
+            notifications for role that read_state has not read
+    """
+    stmt = select(
+        Notification.id,
+        Notification.type,
+        Notification.message,
+        Notification.event_data,
+        Notification.timestamp,
+        User.name.label('user_name'),
+        User.email.label('user_email')
+    ).outerjoin(User, Notification.user_id == User.id)
+
+    if unread_filter:
+        role, read_state = unread_filter
+        stmt = stmt.where(
+            Notification.recipient_role == role,
+            Notification.id > read_state.last_read_id
+        )
+        if read_state.read_ids:
+            stmt = stmt.where(Notification.id.notin_(read_state.read_ids))
+    stmt = stmt.order_by(Notification.timestamp.desc())
+
+    with list_view_guard():
+        return paginate_rows(stmt, page, per_page)
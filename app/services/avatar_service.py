@@ -0,0 +1,442 @@
+"""
+Off-request avatar processing
+
+An upload is only checked (image header, no decoding) and staged in
+``UPLOAD_FOLDER/incoming`` before the request returns. A background task
+(``socketio.start_background_task``) then renders square WebP variants in
+AVATAR_SIZES plus a JPEG fallback at the largest size, on a real OS thread
+(``concurrency.run_blocking``) so cooperative workers keep serving, at most
+AVATAR_MAX_CONCURRENT at a time per worker.
+
+Decoding memory is bounded before any pixel is decoded: JPEGs are decoded
+in draft mode straight at the smallest 1/2-1/8 scale still covering the
+largest variant, and uploads whose decoded size would exceed
+AVATAR_MAX_PIXELS are rejected from their header. Decode time and peak
+pixel memory are logged per upload.
+
+Files go to the configured storage backend (see avatar_storage) named after
+the SHA-256 of the avatar's JPEG, so a name always refers to the same bytes
+and can be cached by browsers forever. The user row is switched to the new
+files only if no newer upload replaced this one, and ``avatar_ready`` (or
+``avatar_failed``) is emitted to the user's ``user_<id>`` room. Identical
+avatars share files; AvatarBlob counts the users of each, and the files of
+an avatar are deleted in the background once its count drops to zero. An
+upload takes a reference before writing its files and hands it to the user
+when it switches the avatar, so a concurrent release of identical files
+never deletes them under it. collect_garbage (``flask gc-avatars``)
+reconciles storage with the users table for anything a crash or failed
+commit left behind.
+
+Pillow is imported where images are handled, not at startup.
+"""
+import hashlib
+import io
+import os
+import secrets
+import threading
+import time
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+from flask import current_app, url_for
+from sqlalchemy import delete, select
+from app import db, socketio
+from app.models import AvatarBlob, User
+from app.services.avatar_storage import LocalStorage, ObjectStorage
+from concurrency import run_blocking
+
+# Formats accepted from uploads (detected from the file header, not its name)
+UPLOAD_FORMATS = {'JPEG', 'PNG'}
+
+DecodeStats = namedtuple('DecodeStats', 'source_size decoded_size peak_bytes seconds')
+
+_render_slots = {}
+_render_slots_lock = threading.Lock()
+
+
+class AvatarError(ValueError):
+    """Raised for uploads that are not a usable image"""
+
+
+def upload_folder(app=None):
+    """Absolute UPLOAD_FOLDER (relative paths are relative to the project root)"""
+    app = app or current_app
+    return os.path.abspath(os.path.join(os.path.dirname(app.root_path), app.config['UPLOAD_FOLDER']))
+
+
+def get_storage(app=None):
+    """Storage backend of the app (AVATAR_STORAGE: 'local' or 's3')"""
+    app = app or current_app
+    storage = app.extensions.get('avatar_storage')
+    if storage is None:
+        if app.config.get('AVATAR_STORAGE') == 's3':
+            import boto3
+            client = boto3.client('s3', endpoint_url=app.config.get('AVATAR_S3_ENDPOINT_URL'))
+            storage = ObjectStorage(client, app.config['AVATAR_S3_BUCKET'], app.config['AVATAR_S3_PREFIX'],
+                                    app.config.get('AVATAR_PUBLIC_URL'))
+        else:
+            storage = LocalStorage(upload_folder(app), app.config.get('AVATAR_ACCEL_REDIRECT'))
+        app.extensions['avatar_storage'] = storage
+    return storage
+
+
+def _staged_path(app, token):
+    return os.path.join(upload_folder(app), 'incoming', token)
+
+
+def _slots(app):
+    """Semaphore bounding concurrent renders in this worker"""
+    with _render_slots_lock:
+        slots = _render_slots.get(app)
+        if slots is None:
+            slots = threading.BoundedSemaphore(app.config.get('AVATAR_MAX_CONCURRENT', 2))
+            _render_slots[app] = slots
+        return slots
+
+
+def _pixel_bytes(image):
+    """Bytes Pillow allocates for an image's pixels"""
+    if image.mode in ('I', 'F') or len(image.getbands()) > 1:
+        per_pixel = 4
+    elif image.mode.startswith('I;16'):
+        per_pixel = 2
+    else:
+        per_pixel = 1
+    return image.width * image.height * per_pixel
+
+
+def _plan_decode(image, target, max_pixels):
+    """
+    Prepare a header-only image to decode at the smallest scale covering target
+
+    JPEGs switch to draft mode, which makes libjpeg decode straight at 1/2,
+    1/4 or 1/8 scale while both sides stay at least target px; other formats
+    decode at full size.
+
+    Raises:
+        AvatarError: If more than max_pixels would be decoded
+    """
+    if image.format == 'JPEG':
+        image.draft('RGB', (target, target))
+    if image.width * image.height > max_pixels:
+        raise AvatarError('Image dimensions are too large')
+
+
+def decode_avatar(path, target, max_pixels):
+    """
+    Decode the image at path for variants up to target px, within a pixel budget
+
+    Returns:
+        tuple: (RGB image, DecodeStats)
+    """
+    from PIL import ExifTags, Image, ImageOps
+
+    started = time.perf_counter()
+    image = Image.open(path)
+    try:
+        source_size = image.size
+        orientation = image.getexif().get(ExifTags.Base.Orientation, 1)
+        _plan_decode(image, target, max_pixels)
+        image.load()  # Also closes the file
+    except Exception:
+        image.close()
+        raise
+    decoded_size = image.size
+    peak = _pixel_bytes(image)
+
+    if orientation != 1:
+        # The transposed copy is filled while the decoded buffer is still held
+        peak *= 2
+        ImageOps.exif_transpose(image, in_place=True)
+    if image.mode != 'RGB':
+        converted = image.convert('RGB')
+        peak = max(peak, _pixel_bytes(image) + _pixel_bytes(converted))
+        image = converted
+
+    return image, DecodeStats(source_size, decoded_size, peak, time.perf_counter() - started)
+
+
+def stage_upload(file):
+    """
+    Check an uploaded file's image header and stage it for processing
+
+    Returns:
+        str: Token identifying the staged upload
+
+    Raises:
+        AvatarError: If the extension or image format is not allowed, or the
+            image would decode to more than AVATAR_MAX_PIXELS
+    """
+    extension = file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else ''
+    if extension not in current_app.config['ALLOWED_EXTENSIONS']:
+        raise AvatarError('Invalid avatar file')
+
+    from PIL import Image
+
+    data = file.stream.read()
+    try:
+        # Image.open only parses the header; pixels are decoded later, off-request
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format not in UPLOAD_FORMATS:
+                raise AvatarError('Invalid avatar file')
+            _plan_decode(image, max(current_app.config['AVATAR_SIZES']), current_app.config['AVATAR_MAX_PIXELS'])
+    except (OSError, Image.DecompressionBombError):
+        raise AvatarError('Invalid avatar file')
+
+    token = secrets.token_hex(16)
+    path = _staged_path(current_app, token)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as staged:
+        staged.write(data)
+    return token
+
+
+def render_variants(path, sizes, webp_quality=80, max_pixels=16_000_000):
+    """
+    Render square avatar variants of the image at path
+
+    Returns:
+        tuple: (encoded bytes by variant: each size as WebP and 'jpeg' at the
+        largest, DecodeStats)
+
+    Raises:
+        AvatarError: If the image would decode to more than max_pixels
+    """
+    from PIL import Image, ImageOps
+
+    image, stats = decode_avatar(path, max(sizes), max_pixels)
+
+    variants = {}
+    # Largest first, each smaller variant resized from the previous one
+    for size in sorted(sizes, reverse=True):
+        side = min(size, image.width, image.height)
+        image = ImageOps.fit(image, (side, side), Image.Resampling.LANCZOS)
+        encoded = io.BytesIO()
+        image.save(encoded, 'WEBP', quality=webp_quality, method=4)
+        variants[str(size)] = encoded.getvalue()
+        if 'jpeg' not in variants:
+            encoded = io.BytesIO()
+            image.save(encoded, 'JPEG', quality=85, optimize=True, progressive=True)
+            variants['jpeg'] = encoded.getvalue()
+    return variants, stats
+
+
+def _digest(rendered):
+    """Content digest naming every file of a rendered avatar"""
+    return hashlib.sha256(rendered['jpeg']).hexdigest()[:32]
+
+
+def _store_variants(storage, digest, rendered):
+    """Store rendered variants under content-hashed names; returns filenames by variant"""
+    filenames = {}
+    for variant, data in rendered.items():
+        filename = f'{digest}.jpg' if variant == 'jpeg' else f'{digest}-{variant}.webp'
+        storage.put(filename, data)
+        filenames[variant] = filename
+    return filenames
+
+
+def delete_files(folder, filenames):
+    """Delete files, ignoring ones that are already gone"""
+    for filename in filenames:
+        try:
+            os.remove(os.path.join(folder, filename))
+        except FileNotFoundError:
+            pass
+
+
+def _hold(digest, amount):
+    """Take (1) or drop (-1) an upload's reference to an avatar, committed at once"""
+    AvatarBlob.add_reference(db.session.connection(), digest, amount)
+    db.session.commit()
+
+
+def release_avatar(app, digest):
+    """Delete the files of an avatar once no user or upload references it"""
+    with app.app_context():
+        # The deleted row stays locked until the commit, so an upload of the
+        # same image taking its reference (_hold) waits and then writes its
+        # files after these are gone. No row: another release handled it.
+        released = db.session.execute(
+            delete(AvatarBlob).where(AvatarBlob.digest == digest, AvatarBlob.ref_count <= 0)
+        ).rowcount
+        try:
+            if released:
+                get_storage(app).delete(digest)
+        finally:
+            db.session.commit()
+
+
+def _run(app, func, *args):
+    """Run func in the background, or inline when AVATAR_PROCESSING_ASYNC is off"""
+    if app.config.get('AVATAR_PROCESSING_ASYNC', True):
+        socketio.start_background_task(func, *args)
+    else:
+        func(*args)
+
+
+def start_processing(user, token):
+    """Render a staged upload in the background (call after committing avatar_pending)"""
+    app = current_app._get_current_object()
+    _run(app, process_avatar, app, user.id, token)
+
+
+def process_avatar(app, user_id, token):
+    """Render a staged upload and make it the user's avatar if it is still the latest"""
+    with app.app_context():
+        staged_path = _staged_path(app, token)
+        digest = None
+        try:
+            with _slots(app):
+                rendered, stats = run_blocking(
+                    render_variants, staged_path, app.config['AVATAR_SIZES'],
+                    app.config.get('AVATAR_WEBP_QUALITY', 80), app.config['AVATAR_MAX_PIXELS']
+                )
+            app.logger.info(
+                f"Avatar for user {user_id}: decoded {stats.decoded_size[0]}x{stats.decoded_size[1]} "
+                f"from {stats.source_size[0]}x{stats.source_size[1]} in {stats.seconds * 1000:.0f} ms, "
+                f"peak pixel memory {stats.peak_bytes / 1024 / 1024:.1f} MB"
+            )
+            digest = _digest(rendered)
+            # Referenced before the files are written: releases and garbage
+            # collection of identical files keep them from here on
+            _hold(digest, 1)
+            filenames = _store_variants(get_storage(app), digest, rendered)
+        except Exception as e:
+            app.logger.error(f"Avatar processing failed for user {user_id}: {e}")
+            db.session.rollback()
+            User.query.filter_by(id=user_id, avatar_pending=token).update({'avatar_pending': None})
+            db.session.commit()
+            if digest is not None:
+                _hold(digest, -1)
+                release_avatar(app, digest)
+            socketio.emit('avatar_failed', {'error': 'Could not process the image'}, room=f'user_{user_id}')
+            return
+        finally:
+            delete_files(os.path.dirname(staged_path), [token])
+
+        user = db.session.get(User, user_id)
+        if user is None or user.avatar_pending != token:
+            # A newer upload superseded this one while it was rendering
+            _hold(digest, -1)
+            release_avatar(app, digest)
+            return
+
+        old_filename = user.avatar_filename
+        user.avatar_filename = filenames['jpeg']
+        user.avatar_variants = filenames
+        user.avatar_pending = None
+        # The user's reference (counted on flush, see AvatarBlob) replaces the upload's
+        AvatarBlob.add_reference(db.session.connection(), digest, -1)
+        db.session.commit()
+
+        if old_filename and old_filename != user.avatar_filename:
+            _run(app, release_avatar, app, AvatarBlob.digest_of(old_filename))
+        socketio.emit('avatar_ready', {
+            'urls': {variant: avatar_file_url(filename) for variant, filename in filenames.items()}
+        }, room=f'user_{user_id}')
+
+
+def avatar_file_url(filename):
+    """URL of a stored avatar file (the storage's own public URL if it has one)"""
+    return get_storage().url(filename) or url_for('profile.get_avatar', filename=filename)
+
+
+def avatar_url(user, size=128):
+    """
+    URL of the smallest avatar variant at least size px wide
+
+    Avatars uploaded before variants existed fall back to the single file.
+    Returns None if the user has no avatar.
+    """
+    variants = user.avatar_variants or {}
+    sizes = sorted(int(variant) for variant in variants if variant.isdigit())
+    if sizes:
+        fitting = next((candidate for candidate in sizes if candidate >= size), sizes[-1])
+        return avatar_file_url(variants[str(fitting)])
+    if user.avatar_filename:
+        return avatar_file_url(user.avatar_filename)
+    return None
+
+
+def collect_garbage(grace_seconds=3600):
+    """
+    Reconcile avatar storage with users.avatar_filename
+
+    Moves files stored before sharding into their shard, recomputes the
+    AvatarBlob counts from the users table, deletes stored avatars no user
+    references (and staged uploads) older than grace_seconds, and clears
+    the avatar of users whose files are missing. Avatars stored or counted
+    within grace_seconds may carry the reference of an upload in progress:
+    their counts are only raised and their files kept.
+
+    Returns:
+        dict: Number of legacy files moved, avatars and stale uploads
+        deleted, counts fixed and users cleared
+    """
+    app = current_app._get_current_object()
+    storage = get_storage(app)
+    moved = storage.unshard_legacy() if isinstance(storage, LocalStorage) else 0
+    cutoff = time.time() - grace_seconds
+
+    # Users before storage: files written after the scan are recent and kept
+    avatars = db.session.execute(
+        select(User.id, User.avatar_filename).where(User.avatar_filename.isnot(None))
+    ).all()
+    stored = {}
+    for name, modified in storage.list():
+        digest = AvatarBlob.digest_of(name)
+        stored[digest] = max(stored.get(digest, 0), modified)
+
+    references = Counter()
+    missing = []
+    for user_id, filename in avatars:
+        digest = AvatarBlob.digest_of(filename)
+        if digest in stored:
+            references[digest] += 1
+        else:
+            missing.append((user_id, filename))
+
+    counts_fixed = 0
+    held = set()
+    recent_blobs = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    for blob in AvatarBlob.query.all():
+        count = references.get(blob.digest, 0)
+        if stored.get(blob.digest, 0) >= cutoff or (blob.created_at and blob.created_at >= recent_blobs):
+            count = max(count, blob.ref_count)
+            if count:
+                held.add(blob.digest)
+        if blob.ref_count != count:
+            counts_fixed += 1
+        if count:
+            blob.ref_count = count
+        else:
+            db.session.delete(blob)
+    known = {digest for digest, in db.session.execute(select(AvatarBlob.digest))}
+    for digest, count in references.items():
+        if digest not in known:
+            counts_fixed += 1
+            db.session.add(AvatarBlob(digest=digest, ref_count=count))
+
+    users_cleared = 0
+    for user_id, filename in missing:
+        # Plain UPDATE, only if the avatar was not replaced meanwhile: the
+        # files are gone, so there is no reference to move
+        users_cleared += db.session.execute(
+            User.__table__.update().where(User.id == user_id, User.avatar_filename == filename)
+            .values(avatar_filename=None, avatar_variants=None)
+        ).rowcount
+    db.session.commit()
+
+    deleted = 0
+    for digest, modified in stored.items():
+        if digest not in references and digest not in held and modified < cutoff:
+            storage.delete(digest)
+            deleted += 1
+
+    incoming = os.path.join(upload_folder(app), 'incoming')
+    stale = [entry.name for entry in os.scandir(incoming) if entry.stat().st_mtime < cutoff] \
+        if os.path.isdir(incoming) else []
+    delete_files(incoming, stale)
+
+    return {'moved': moved, 'deleted': deleted, 'stale_uploads': len(stale),
+            'counts_fixed': counts_fixed, 'users_cleared': users_cleared}
@@ -0,0 +1,170 @@
+"""
+Avatar storage backends
+
+Files are addressed by name ('<digest>.jpg', '<digest>-64.webp'); every file
+of one avatar shares the digest, which also picks the shard
+('ab/cd/<name>'), so no directory or key prefix grows with the number of
+users and all variants of an avatar sit together. Both backends offer:
+
+    put(name, data)  store a file (identical content may already be there)
+    delete(digest)   delete every file of one avatar
+    list()           (name, modified timestamp) of every stored file
+    url(name)        public URL to link to, or None to serve through the app
+    serve(name)      Flask response for the file (FileNotFoundError if missing)
+
+LocalStorage keeps files under UPLOAD_FOLDER (avatars stored before sharding
+are still found at the top level); ObjectStorage uses any client with the
+boto3 S3 interface, e.g. boto3 itself against S3 or MinIO.
+"""
+import os
+import re
+import secrets
+import mimetypes
+from flask import current_app, redirect, send_from_directory
+from app.models import AvatarBlob
+
+_SHARD = re.compile(r'^[0-9a-f]{2}$')
+LEGACY_EXTENSIONS = ('jpg', 'jpeg', 'png')
+
+
+def shard_key(name):
+    """Relative key of a stored file: '<d[:2]>/<d[2:4]>/<name>' for digest d"""
+    digest = AvatarBlob.digest_of(name)
+    return f'{digest[:2]}/{digest[2:4]}/{name}'
+
+
+class LocalStorage:
+    """Avatar files in a sharded directory tree"""
+
+    def __init__(self, root, accel_prefix=None):
+        self.root = root
+        self.accel_prefix = accel_prefix
+
+    def locate(self, name):
+        """Key of a stored file relative to root, sharded or (before sharding) flat"""
+        for key in (shard_key(name), name):
+            if os.path.isfile(os.path.join(self.root, key)):
+                return key
+        raise FileNotFoundError(name)
+
+    def put(self, name, data):
+        path = os.path.join(self.root, shard_key(name))
+        if os.path.exists(path):
+            os.utime(path)  # stored again: recent for collect_garbage's grace period
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial_path = f'{path}.{secrets.token_hex(4)}.part'
+        with open(partial_path, 'wb') as output:
+            output.write(data)
+        os.replace(partial_path, path)
+
+    def delete(self, digest):
+        folder = os.path.dirname(os.path.join(self.root, shard_key(digest)))
+        try:
+            names = [name for name in os.listdir(folder) if AvatarBlob.digest_of(name) == digest]
+        except FileNotFoundError:
+            names = []
+        paths = [os.path.join(folder, name) for name in names]
+        # Avatars stored before sharding: a single '<digest>.<extension>' file
+        paths += [os.path.join(self.root, f'{digest}.{extension}') for extension in LEGACY_EXTENSIONS]
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def list(self):
+        for top in self._shards(self.root):
+            for second in self._shards(os.path.join(self.root, top)):
+                folder = os.path.join(self.root, top, second)
+                for entry in os.scandir(folder):
+                    if entry.is_file() and not entry.name.endswith('.part'):
+                        yield entry.name, entry.stat().st_mtime
+        for entry in os.scandir(self.root) if os.path.isdir(self.root) else ():
+            if entry.is_file() and not entry.name.startswith('.'):
+                yield entry.name, entry.stat().st_mtime
+
+    def unshard_legacy(self):
+        """Move files stored before sharding into their shard; returns how many"""
+        moved = 0
+        for entry in list(os.scandir(self.root)) if os.path.isdir(self.root) else ():
+            if entry.is_file() and not entry.name.startswith('.'):
+                path = os.path.join(self.root, shard_key(entry.name))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(entry.path, path)
+                moved += 1
+        return moved
+
+    def url(self, name):
+        return None
+
+    def serve(self, name):
+        key = self.locate(name)
+        if self.accel_prefix:
+            # nginx sends the file from its internal location (see nginx.conf)
+            response = current_app.response_class(mimetype=mimetypes.guess_type(name)[0])
+            response.headers['X-Accel-Redirect'] = self.accel_prefix.rstrip('/') + '/' + key
+            return response
+        # send_file adds X-Sendfile itself when USE_X_SENDFILE is set
+        return send_from_directory(self.root, key, etag=False)
+
+    @staticmethod
+    def _shards(folder):
+        try:
+            return sorted(name for name in os.listdir(folder)
+                          if _SHARD.match(name) and os.path.isdir(os.path.join(folder, name)))
+        except FileNotFoundError:
+            return []
+
+
+class ObjectStorage:
+    """Avatar files in an S3-compatible bucket"""
+
+    def __init__(self, client, bucket, prefix='avatars/', public_url=None):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.public_url = public_url.rstrip('/') if public_url else None
+
+    def key(self, name):
+        return self.prefix + shard_key(name)
+
+    def put(self, name, data):
+        self.client.put_object(
+            Bucket=self.bucket, Key=self.key(name), Body=data,
+            ContentType=mimetypes.guess_type(name)[0] or 'application/octet-stream',
+            CacheControl='public, max-age=31536000, immutable'
+        )
+
+    def delete(self, digest):
+        keys = [obj['Key'] for obj in self._objects(self.prefix + shard_key(digest))]
+        for key in keys:
+            self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def list(self):
+        for obj in self._objects(self.prefix):
+            yield obj['Key'].rsplit('/', 1)[-1], obj['LastModified'].timestamp()
+
+    def url(self, name):
+        if self.public_url:
+            return f'{self.public_url}/{self.key(name)}'
+        return None
+
+    def serve(self, name):
+        if self.public_url:
+            return redirect(self.url(name))
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=self.key(name))
+        except self.client.exceptions.NoSuchKey:
+            raise FileNotFoundError(name)
+        return current_app.response_class(obj['Body'].read(), mimetype=obj.get('ContentType'))
+
+    def _objects(self, prefix):
+        """Every object under prefix, following list_objects_v2 pagination"""
+        arguments = {'Bucket': self.bucket, 'Prefix': prefix}
+        while True:
+            page = self.client.list_objects_v2(**arguments)
+            yield from page.get('Contents', [])
+            if not page.get('IsTruncated'):
+                return
+            arguments['ContinuationToken'] = page['NextContinuationToken']
@@ -0,0 +1,60 @@
+"""
+Initial page data rendered into the HTML
+
+``base.html`` embeds ``bootstrap_payload()`` as a JSON script element, so
+page scripts start with the current user, the admin unread count and any
+data the view added with ``add_page_data`` instead of requesting
+``/auth/me``, ``/api/notifications/count`` and the page's first lists
+after load. The user is the one the view already loaded (identity map), the
+unread count comes from the per-worker notification ring buffer.
+"""
+from flask import g
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from app import db
+from app.models import User
+from app.services.avatar_service import avatar_url
+from app.services.notification_service import cached_unread_count
+
+
+def user_payload(user):
+    """Current-user fields shared by /auth/me and the bootstrap payload"""
+    return {
+        'id': user.id,
+        'email': user.email,
+        'name': user.name,
+        'role': user.role,
+        'avatar_filename': user.avatar_filename,
+        'avatar_url': avatar_url(user, 64),
+        'avatar_processing': user.avatar_pending is not None,
+        'has_submitted_feedback': user.has_submitted_feedback
+    }
+
+
+def current_user():
+    """User of the access token cookie, resolved once per request (None for guests)"""
+    if 'bootstrap_user' not in g:
+        user = None
+        try:
+            if verify_jwt_in_request(optional=True):
+                user = db.session.get(User, get_jwt_identity())
+        except Exception:
+            pass  # Expired or invalid token: the page scripts refresh or log out
+        g.bootstrap_user = user
+    return g.bootstrap_user
+
+
+def add_page_data(**data):
+    """Add page-specific initial data to the bootstrap payload of this request"""
+    g.setdefault('bootstrap_page', {}).update(data)
+
+
+def bootstrap_payload():
+    """Initial data for the page scripts"""
+    user = current_user()
+    payload = {
+        'user': user_payload(user) if user else None,
+        'page': g.get('bootstrap_page', {})
+    }
+    if user is not None and user.is_admin():
+        payload['notifications'] = {'unread_count': cached_unread_count(user)}
+    return payload
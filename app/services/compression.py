@@ -0,0 +1,182 @@
+"""
+Response compression
+
+JSON, CSV, HTML and other text responses are compressed with the best
+encoding the client accepts: Brotli when the optional ``brotli`` package is
+installed, else gzip. Buffered responses below COMPRESS_MIN_SIZE are sent as
+they are. Streamed responses (generators such as the CSV export) are
+compressed chunk by chunk as they are produced, so memory stays constant.
+
+Responses with an ETag (polled JSON with a version stamp, static files) are
+the same bytes every time, so their compressed form is kept in a per-worker
+LRU cache bounded by COMPRESS_CACHE_BYTES and reused until the ETag changes.
+
+File downloads other than static assets (export artifacts) are sent as they
+are, through sendfile or X-Sendfile, and so are bodies above
+COMPRESS_MAX_SIZE: compressing them would mean reading them into memory.
+"""
+import threading
+import zlib
+from collections import OrderedDict
+from flask import current_app, request
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+    'text/csv', 'text/css', 'text/html', 'text/javascript', 'text/plain', 'text/xml'
+}
+
+
+def _brotli():
+    """The brotli module, or None when it is not installed"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+class _BrotliStream:
+    """brotli.Compressor with the compress()/flush() interface of zlib"""
+
+    def __init__(self, quality):
+        self.compressor = _brotli().Compressor(quality=quality)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.finish()
+
+
+def compressor(encoding, config):
+    """Streaming compressor for 'br' or 'gzip'"""
+    if encoding == 'br':
+        return _BrotliStream(config['COMPRESS_BROTLI_QUALITY'])
+    return zlib.compressobj(config['COMPRESS_GZIP_LEVEL'], zlib.DEFLATED, 31)  # 31: gzip container
+
+
+def compress(data, encoding, config):
+    """Compress a complete body"""
+    stream = compressor(encoding, config)
+    return stream.compress(data) + stream.flush()
+
+
+def compress_chunks(chunks, encoding, config):
+    """Compress a stream of chunks on the fly"""
+    stream = compressor(encoding, config)
+    for chunk in chunks:
+        data = stream.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield stream.flush()
+
+
+def negotiate(accept_encodings):
+    """Best supported encoding the client accepts, or None"""
+    offered = ['br', 'gzip'] if _brotli() is not None else ['gzip']
+    return accept_encodings.best_match(offered)
+
+
+class CompressedCache:
+    """LRU of compressed bodies keyed by (path, ETag, encoding), bounded in bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.max_entry = max_bytes // 16  # one body never evicts most of the cache
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+            return data
+
+    def set(self, key, data):
+        if len(data) > self.max_entry:
+            return
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+def get_compressed_cache(app=None):
+    """Get the compressed body cache of the (current) app, creating it if needed"""
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get('compressed_cache')
+    if cache is None:
+        cache = CompressedCache(app.config.get('COMPRESS_CACHE_BYTES', 16 * 1024 * 1024))
+        app.extensions['compressed_cache'] = cache
+    return cache
+
+
+def _static_asset():
+    """Whether the request is for the app's or a blueprint's static files"""
+    endpoint = request.endpoint or ''
+    return endpoint == 'static' or endpoint.endswith('.static')
+
+
+def compress_response(response):
+    """after_request hook compressing the response if worthwhile"""
+    config = current_app.config
+    if (not config.get('COMPRESS_ENABLED', True)
+            or response.mimetype not in COMPRESSIBLE_TYPES
+            or request.method == 'HEAD'
+            or response.status_code != 200  # 206 ranges, 304s, errors are left alone
+            or 'Content-Encoding' in response.headers
+            or 'X-Accel-Redirect' in response.headers
+            or 'X-Sendfile' in response.headers
+            or (response.direct_passthrough and not _static_asset())  # zero-copy downloads
+            or (response.content_length or 0) > config.get('COMPRESS_MAX_SIZE', 4 * 1024 * 1024)):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    etag, weak = response.get_etag()
+    source = response.response
+    if response.is_streamed and not (response.direct_passthrough and etag):
+        # Length unknown: compress as it is produced. The source may be a
+        # stream_with_context generator, which must be closed even if the
+        # client goes away before it is iterated.
+        if hasattr(source, 'close'):
+            response.call_on_close(source.close)
+        response.response = compress_chunks(source, encoding, config)
+        response.headers.pop('Content-Length', None)
+    else:
+        response.direct_passthrough = False  # static files are read or replaced from the cache
+        cache = get_compressed_cache()
+        key = (request.path, etag, encoding) if etag else None
+        data = cache.get(key) if key else None
+        if data is None:
+            body = response.get_data()
+            if len(body) < config['COMPRESS_MIN_SIZE']:
+                return response
+            data = compress(body, encoding, config)
+            if len(data) >= len(body):
+                return response
+            if key:
+                cache.set(key, data)
+        elif response.is_streamed and hasattr(source, 'close'):
+            response.call_on_close(source.close)
+        response.set_data(data)
+
+    response.headers['Content-Encoding'] = encoding
+    if etag and not weak:
+        # Same entity, different bytes: a strong validator would be wrong
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """Compress the app's responses"""
+    app.after_request(compress_response)
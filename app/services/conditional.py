@@ -0,0 +1,44 @@
+"""
+Conditional GET for frequently polled JSON endpoints
+
+An endpoint describes what its response depends on with a cheap version
+stamp (a max id, an ``updated_at``, a read cursor) and hands the expensive
+part to ``conditional_json`` as a callable. The stamp is hashed into a weak
+ETag; when the client's If-None-Match (or If-Modified-Since, if the endpoint
+has an exact last-modified time) still matches, the callable never runs and
+an empty 304 is returned. Responses are ``private, no-cache``: browsers keep
+them but revalidate on every use, shared caches don't store them.
+"""
+import hashlib
+from flask import current_app, jsonify, request
+from werkzeug.http import is_resource_modified
+
+
+def version_etag(*parts):
+    """ETag value for a version stamp"""
+    return hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+
+
+def _with_validators(response, etag, last_modified):
+    response.set_etag(etag, weak=True)  # weak: equal content whatever the Content-Encoding
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def conditional_json(version, build, last_modified=None):
+    """
+    JSON response of build(), or 304 if the client has the current version
+
+    Args:
+        version: Tuple of values that changes whenever build() would return
+            something else (include the user and any query arguments)
+        build: Callable returning the JSON-serializable payload
+        last_modified: Exact (naive UTC) time of the last change, if known
+    """
+    etag = version_etag(request.path, *version)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return _with_validators(current_app.response_class(status=304), etag, last_modified)
+    return _with_validators(jsonify(build()), etag, last_modified)
@@ -0,0 +1,366 @@
+"""
+Background export jobs
+
+An admin starts an export of feedback, users or notifications with
+``start_export``; the rows are written to an artifact in EXPORT_DIR by a
+background task (``socketio.start_background_task``, so it is a greenlet
+under gevent/eventlet workers) instead of tying up a request worker.
+Progress is committed to the ``export_jobs`` row after every batch, so any
+worker can report it, and the finished file is served with ``send_file``
+(sendfile / X-Sendfile). Each progress commit also bumps ``updated_at``; a
+job without progress for EXPORT_STALE_MINUTES lost its worker (recycled or
+crashed) and is failed by ``expire_export_jobs``.
+
+Rows are read in keyset-paginated batches (``id > last_id``), so memory is
+bounded and no cursor stays open across the progress commits. Incremental
+exports only include rows changed since the last completed export of the
+same dataset.
+"""
+import csv
+import glob
+import io
+import json
+import os
+import secrets
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, func
+from app import db, socketio
+from app.models import User, Feedback, Notification, ExportJob
+from app.services.admin_lists import feedback_export_statement
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+class ExportError(ValueError):
+    """Raised for export requests that cannot be started"""
+
+
+def _dataset(name):
+    """Return (select statement, id column, changed-at column) for a dataset"""
+    if name == 'feedback':
+        return feedback_export_statement().order_by(None).add_columns(Feedback.updated_at), \
+            Feedback.id, Feedback.updated_at
+    if name == 'users':
+        stmt = select(
+            User.id,
+            User.email,
+            User.name,
+            User.role,
+            User.is_active,
+            User.has_submitted_feedback,
+            User.feedback_count,
+            User.average_rating.label('average_rating'),
+            User.last_feedback_at,
+            User.created_at,
+            User.updated_at
+        )
+        return stmt, User.id, User.updated_at
+    if name == 'notifications':
+        stmt = select(
+            Notification.id,
+            Notification.type,
+            Notification.message,
+            Notification.recipient_role,
+            Notification.user_id,
+            Notification.event_data,
+            Notification.timestamp
+        )
+        return stmt, Notification.id, Notification.timestamp
+    raise ExportError(f'Unknown dataset: {name}')
+
+
+# Parquet column types of each dataset, in _dataset's column order. Declared
+# rather than inferred from the first batch, where a column that happens to
+# be all NULL (corrections, dates) would get pyarrow's null type.
+PARQUET_SCHEMAS = {
+    'feedback': (
+        ('id', 'int64'),
+        ('user_email', 'string'),
+        ('user_name', 'string'),
+        ('text', 'string'),
+        ('rating', 'int64'),
+        ('sentiment_label', 'string'),
+        ('sentiment_score', 'float64'),
+        ('admin_corrected_label', 'string'),
+        ('admin_corrected_score', 'float64'),
+        ('is_corrected', 'bool'),
+        ('created_at', 'timestamp'),
+        ('updated_at', 'timestamp')
+    ),
+    'users': (
+        ('id', 'int64'),
+        ('email', 'string'),
+        ('name', 'string'),
+        ('role', 'string'),
+        ('is_active', 'bool'),
+        ('has_submitted_feedback', 'bool'),
+        ('feedback_count', 'int64'),
+        ('average_rating', 'float64'),
+        ('last_feedback_at', 'timestamp'),
+        ('created_at', 'timestamp'),
+        ('updated_at', 'timestamp')
+    ),
+    'notifications': (
+        ('id', 'int64'),
+        ('type', 'string'),
+        ('message', 'string'),
+        ('recipient_role', 'string'),
+        ('user_id', 'int64'),
+        ('event_data', 'string'),  # JSON text
+        ('timestamp', 'timestamp')
+    )
+}
+
+
+def _plain(value):
+    """Convert a value for text formats"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class CsvExportWriter:
+    """Write rows as CSV"""
+
+    def __init__(self, file, columns, dataset):
+        self.file = file
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.writer.writerow(columns)
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.writer.writerow([
+                json.dumps(value) if isinstance(value, (dict, list)) else _plain(value)
+                for value in row
+            ])
+        self.file.write(self.buffer.getvalue().encode('utf-8'))
+        self.buffer.seek(0)
+        self.buffer.truncate()
+
+    def close(self):
+        pass
+
+
+class NdjsonExportWriter:
+    """Write rows as newline-delimited JSON objects"""
+
+    def __init__(self, file, columns, dataset):
+        self.file = file
+        self.columns = columns
+
+    def write_rows(self, rows):
+        lines = [
+            json.dumps(dict(zip(self.columns, row)), default=_plain) + '\n'
+            for row in rows
+        ]
+        self.file.write(''.join(lines).encode('utf-8'))
+
+    def close(self):
+        pass
+
+
+class ParquetExportWriter:
+    """Write rows as Parquet row groups in the dataset's schema (requires pyarrow)"""
+
+    def __init__(self, file, columns, dataset):
+        import pyarrow
+        import pyarrow.parquet
+        types = {
+            'int64': pyarrow.int64(),
+            'float64': pyarrow.float64(),
+            'bool': pyarrow.bool_(),
+            'string': pyarrow.string(),
+            'timestamp': pyarrow.timestamp('us')
+        }
+        spec = PARQUET_SCHEMAS[dataset]
+        if [name for name, _ in spec] != list(columns):
+            raise ExportError(f'Parquet schema of {dataset} does not match its columns')
+        self.pyarrow = pyarrow
+        self.columns = columns
+        self.schema = pyarrow.schema([(name, types[type_name]) for name, type_name in spec])
+        self.writer = pyarrow.parquet.ParquetWriter(file, self.schema)
+
+    def write_rows(self, rows):
+        records = [
+            {column: json.dumps(value) if isinstance(value, (dict, list)) else value
+             for column, value in zip(self.columns, row)}
+            for row in rows
+        ]
+        self.writer.write_table(self.pyarrow.Table.from_pylist(records, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {
+    'csv': CsvExportWriter,
+    'ndjson': NdjsonExportWriter,
+    'parquet': ParquetExportWriter
+}
+
+
+def parquet_available():
+    """Check whether the optional pyarrow dependency is installed"""
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def start_export(user, dataset, format='csv', incremental=False):
+    """
+    Create an export job and run it in the background
+
+    Args:
+        user (User): Admin requesting the export
+        dataset (str): 'feedback', 'users' or 'notifications'
+        format (str): 'csv', 'ndjson' or 'parquet'
+        incremental (bool): Only export rows changed since the last completed
+            export of this dataset
+
+    Returns:
+        ExportJob: The pending (or, when jobs run inline, finished) job
+    """
+    if dataset not in ExportJob.DATASETS:
+        raise ExportError(f"Dataset must be one of: {', '.join(ExportJob.DATASETS)}")
+    if format not in ExportJob.FORMATS:
+        raise ExportError(f"Format must be one of: {', '.join(ExportJob.FORMATS)}")
+    if format == 'parquet' and not parquet_available():
+        raise ExportError('Parquet exports require pyarrow to be installed')
+
+    expire_export_jobs()
+
+    since = None
+    if incremental:
+        previous = ExportJob.query.filter(
+            ExportJob.dataset == dataset,
+            ExportJob.status.in_(('completed', 'expired'))
+        ).order_by(ExportJob.started_at.desc()).first()
+        # Rows changed while the previous job ran are exported again, never lost
+        since = previous.started_at if previous else None
+
+    job = ExportJob(user_id=user.id, dataset=dataset, format=format, since=since, status='pending')
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    if app.config.get('EXPORT_JOBS_ASYNC', True):
+        socketio.start_background_task(run_export_job, app, job.id)
+    else:
+        run_export_job(app, job.id)
+        db.session.refresh(job)
+    return job
+
+
+def run_export_job(app, job_id):
+    """Write the artifact for an export job, recording progress as it goes"""
+    with app.app_context():
+        job = db.session.get(ExportJob, job_id)
+        if job is None or job.status != 'pending':
+            return
+
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+
+        export_dir = app.config['EXPORT_DIR']
+        os.makedirs(export_dir, exist_ok=True)
+        path = os.path.join(export_dir, f'{job.id}-{secrets.token_hex(8)}.{job.format}')
+        partial_path = path + '.part'
+
+        try:
+            stmt, id_column, changed_column = _dataset(job.dataset)
+            if job.since is not None:
+                stmt = stmt.where(changed_column > job.since)
+
+            job.rows_total = db.session.execute(
+                select(func.count()).select_from(stmt.subquery())
+            ).scalar()
+            db.session.commit()
+
+            batch_size = app.config.get('EXPORT_BATCH_SIZE', 1000)
+            columns = list(stmt.selected_columns.keys())
+            id_index = columns.index('id')
+            last_id = 0
+
+            with open(partial_path, 'wb') as file:
+                writer = WRITERS[job.format](file, columns, job.dataset)
+                while True:
+                    rows = db.session.execute(
+                        stmt.where(id_column > last_id).order_by(id_column).limit(batch_size)
+                    ).all()
+                    if not rows:
+                        break
+                    writer.write_rows(rows)
+                    last_id = rows[-1][id_index]
+
+                    job.rows_written += len(rows)
+                    db.session.commit()
+                writer.close()
+
+            os.replace(partial_path, path)
+            job.status = 'completed'
+            job.file_path = path
+            job.file_size = os.path.getsize(path)
+            job.finished_at = datetime.utcnow()
+            job.expires_at = job.finished_at + timedelta(hours=app.config.get('EXPORT_TTL_HOURS', 24))
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Export job {job_id} failed: {e}")
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            job = db.session.get(ExportJob, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+
+        finally:
+            db.session.remove()
+
+
+def expire_export_jobs(now=None):
+    """
+    Delete artifacts past their expiry and mark their jobs expired
+
+    Pending or running jobs without progress for EXPORT_STALE_MINUTES are
+    marked failed and their partial files removed.
+
+    Returns:
+        int: Number of jobs expired or failed as stale
+    """
+    now = now or datetime.utcnow()
+    jobs = ExportJob.query.filter(
+        ExportJob.status == 'completed',
+        ExportJob.expires_at <= now
+    ).all()
+    for job in jobs:
+        if job.file_path and os.path.exists(job.file_path):
+            os.remove(job.file_path)
+        job.status = 'expired'
+        job.file_path = None
+
+    stale_before = now - timedelta(minutes=current_app.config.get('EXPORT_STALE_MINUTES', 15))
+    stale = ExportJob.query.filter(
+        ExportJob.status.in_(('pending', 'running')),
+        func.coalesce(ExportJob.updated_at, ExportJob.created_at) <= stale_before
+    ).all()
+    for job in stale:
+        for partial_path in glob.glob(os.path.join(current_app.config['EXPORT_DIR'], f'{job.id}-*.part')):
+            os.remove(partial_path)
+        job.status = 'failed'
+        job.error = 'Export stopped making progress (its worker was restarted)'
+        job.finished_at = now
+
+    if jobs or stale:
+        db.session.commit()
+    return len(jobs) + len(stale)
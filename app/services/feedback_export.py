@@ -0,0 +1,156 @@
+"""
+Streaming feedback CSV export
+
+The export is produced as a stream of byte chunks so memory stays constant
+however many rows there are: rows are read through a server-side cursor
+(``yield_per``) and written to a small CSV buffer that is flushed every few
+hundred rows. On PostgreSQL the rows are instead produced by
+``COPY (...) TO STDOUT``, which formats the CSV inside the database. Either
+stream can be gzip-compressed on the fly.
+"""
+import csv
+import io
+import queue
+import threading
+import zlib
+from flask import current_app
+from sqlalchemy import select, func, case, cast, Text
+from sqlalchemy.dialects import postgresql
+from app import db
+from app.models import User, Feedback
+from app.services.admin_lists import feedback_export_rows
+
+EXPORT_HEADER = [
+    'ID', 'User Email', 'User Name', 'Text', 'Rating',
+    'Original Sentiment', 'Original Score', 'Corrected Sentiment',
+    'Corrected Score', 'Is Corrected', 'Created At'
+]
+
+
+def _header_line():
+    """The CSV header row as bytes"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_HEADER)
+    return buffer.getvalue().encode('utf-8')
+
+
+def csv_chunks(rows, rows_per_chunk=500):
+    """Encode rows as CSV, yielding one bytes chunk per rows_per_chunk rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    yield _header_line()
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip-compress a stream of bytes chunks on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def copy_sql():
+    """COPY statement producing the export rows formatted like csv_chunks"""
+    stmt = select(
+        Feedback.id,
+        func.coalesce(User.email, 'Unknown'),
+        func.coalesce(User.name, 'Unknown'),
+        Feedback.text,
+        Feedback.rating,
+        Feedback.sentiment_label,
+        Feedback.sentiment_score,
+        func.coalesce(Feedback.admin_corrected_label, ''),
+        func.coalesce(cast(Feedback.admin_corrected_score, Text), ''),
+        case((Feedback.is_corrected.is_(True), 'True'), else_='False'),
+        func.to_char(Feedback.created_at, 'YYYY-MM-DD HH24:MI')
+    ).outerjoin(User, Feedback.user_id == User.id)\
+        .order_by(Feedback.created_at.desc())
+
+    query = stmt.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True})
+    return f'COPY ({query}) TO STDOUT WITH (FORMAT csv)'
+
+
+class _QueueWriter:
+    """File-like object handing COPY output to the consuming generator"""
+
+    def __init__(self, chunks, cancelled):
+        self.chunks = chunks
+        self.cancelled = cancelled
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        # Bounded queue: COPY waits for the client instead of buffering
+        while True:
+            if self.cancelled.is_set():
+                raise IOError('Export cancelled')
+            try:
+                self.chunks.put(data, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+
+def copy_chunks(engine, sql, max_pending=16):
+    """Stream the output of a COPY ... TO STDOUT statement as bytes chunks"""
+    chunks = queue.Queue(maxsize=max_pending)
+    cancelled = threading.Event()
+    done = object()
+
+    def produce():
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.copy_expert(sql, _QueueWriter(chunks, cancelled))
+            cursor.close()
+            connection.rollback()
+        except Exception as e:
+            if not cancelled.is_set():
+                chunks.put(e)
+        finally:
+            connection.close()
+            if not cancelled.is_set():
+                chunks.put(done)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        # Client went away (or finished): stop COPY and unblock the producer
+        cancelled.set()
+        while not chunks.empty():
+            chunks.get_nowait()
+
+
+def export_chunks(compress=False):
+    """Stream the feedback export as CSV (gzip-compressed if compress)"""
+    config = current_app.config
+    if db.engine.dialect.name == 'postgresql' and config.get('EXPORT_USE_COPY', True):
+        def chunks():
+            yield _header_line()
+            yield from copy_chunks(db.engine, copy_sql())
+        stream = chunks()
+    else:
+        stream = csv_chunks(feedback_export_rows(config.get('EXPORT_BATCH_SIZE', 1000)))
+
+    if compress:
+        stream = gzip_chunks(stream)
+    return stream
@@ -0,0 +1,82 @@
+"""
+Daily feedback analytics from the feedback_daily_stats rollup
+
+Time series are read from one rollup row per day (kept current by the
+Feedback mapper events in app.models), so a range of months touches a few
+hundred rows instead of scanning feedback. ``backfill_daily_stats`` rebuilds
+the rollup from history with a single INSERT ... SELECT.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, case, delete, insert
+from app import db
+from app.models import Feedback, FeedbackDailyStats
+
+
+def _count_where(condition):
+    """COUNT of rows matching condition inside a GROUP BY"""
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def backfill_daily_stats():
+    """
+    Rebuild feedback_daily_stats from the feedback table
+
+    Returns:
+        int: Number of days written
+    """
+    day = func.date(Feedback.created_at)
+
+    rows = select(
+        day,
+        func.count(Feedback.id),
+        func.coalesce(func.sum(Feedback.rating), 0),
+        *[_count_where(Feedback.rating == rating) for rating in (1, 2, 3, 4, 5)],
+        *[_count_where(Feedback.final_sentiment_label == label) for label in FeedbackDailyStats.SENTIMENT_LABELS],
+        _count_where(Feedback.is_corrected.is_(True))
+    ).group_by(day)
+
+    table = FeedbackDailyStats.__table__
+    db.session.execute(delete(table))
+    result = db.session.execute(insert(table).from_select([
+        'day', 'feedback_count', 'rating_sum',
+        'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+        'positive_count', 'neutral_count', 'negative_count', 'corrected_count'
+    ], rows))
+    db.session.commit()
+    return result.rowcount
+
+
+def daily_series(start, end):
+    """
+    Per-day feedback figures between start and end (inclusive), oldest first
+
+    Days without feedback are included with zero counts.
+    """
+    rows = {
+        row.day: row for row in FeedbackDailyStats.query.filter(
+            FeedbackDailyStats.day >= start,
+            FeedbackDailyStats.day <= end
+        )
+    }
+
+    series = []
+    day = start
+    while day <= end:
+        row = rows.get(day)
+        count = row.feedback_count if row else 0
+        series.append({
+            'day': day.isoformat(),
+            'feedback_count': count,
+            'average_rating': round(row.rating_sum / count, 2) if count else None,
+            'ratings': {str(rating): getattr(row, f'rating_{rating}_count') if row else 0 for rating in (1, 2, 3, 4, 5)},
+            'sentiment': {label: getattr(row, f'{label}_count') if row else 0 for label in FeedbackDailyStats.SENTIMENT_LABELS},
+            'corrected_count': row.corrected_count if row else 0
+        })
+        day += timedelta(days=1)
+    return series
+
+
+def default_range(days=30, today=None):
+    """(start, end) of the last days days, ending today (UTC, like created_at)"""
+    end = today or datetime.utcnow().date()
+    return end - timedelta(days=days - 1), end
@@ -0,0 +1,256 @@
+"""
+Full-text search over feedback text and author name/email
+
+PostgreSQL keeps a weighted ``feedback.search_vector`` tsvector column (text
+weighted above author name and email) behind a GIN index; SQLite keeps an
+FTS5 shadow table ``feedback_fts`` keyed by feedback id. Both are written by
+the Feedback and User mapper events below, in the same transaction as the
+change, and created together with the feedback table by ``db.create_all()``.
+Existing databases get them with the ``rebuild-search-index`` command
+(restart the workers afterwards: whether the index exists is checked once
+per engine).
+
+Searches are ranked (``ts_rank_cd`` / ``bm25``) and return highlighted
+snippets. Every search term is matched as a prefix, so results update while
+an admin is still typing. PostgreSQL's english configuration drops stopwords
+("the", "not"), so a search made only of them has no lexeme left; it falls
+back to ILIKE, like a database without an index, instead of matching nothing.
+"""
+import html
+import re
+import weakref
+from sqlalchemy import event, inspect, text, table, column, literal_column, func, select
+from app import db
+from app.models import User, Feedback
+
+# Longest search honoured; extra terms are ignored
+MAX_TERMS = 8
+
+# Highlight markers used inside the database, replaced after HTML escaping
+_START_MARK = '\x02'
+_STOP_MARK = '\x03'
+
+_TERM_PATTERN = re.compile(r'[\w@.+-]*\w[\w@.+-]*')
+
+# tsvector document: feedback text (weight A) and author name/email (weight B)
+_PG_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(feedback.text, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce((SELECT coalesce(users.name, '') || ' ' || "
+    "coalesce(users.email, '') FROM users WHERE users.id = feedback.user_id), '')), 'B')"
+)
+
+_PG_SETUP = (
+    "ALTER TABLE feedback ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS ix_feedback_search_vector ON feedback USING GIN (search_vector)"
+)
+
+_SQLITE_SETUP = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS feedback_fts "
+    "USING fts5(text, user_name, user_email, tokenize='porter unicode61')",
+)
+
+_INDEX_ROWS = {
+    'postgresql': f"UPDATE feedback SET search_vector = {_PG_DOCUMENT} WHERE {{where}}",
+    'sqlite': (
+        "INSERT OR REPLACE INTO feedback_fts (rowid, text, user_name, user_email) "
+        "SELECT feedback.id, coalesce(feedback.text, ''), coalesce(users.name, ''), coalesce(users.email, '') "
+        "FROM feedback LEFT JOIN users ON users.id = feedback.user_id WHERE {where}"
+    )
+}
+
+feedback_fts = table('feedback_fts', column('rowid'))
+_search_vector = literal_column('feedback.search_vector')
+
+# Engine -> dialect name with a search index ('' when there is none)
+_backends = weakref.WeakKeyDictionary()
+
+
+def _detect_backend(connection):
+    """Dialect name if this database has the search index, else ''"""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        found = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'feedback_fts'"
+        )).first()
+        return dialect if found else ''
+    if dialect == 'postgresql':
+        columns = inspect(connection).get_columns('feedback')
+        return dialect if any(column['name'] == 'search_vector' for column in columns) else ''
+    return ''
+
+
+def search_backend(connection=None):
+    """Name of the full-text search backend in use, or '' to fall back to ILIKE"""
+    connection = connection or db.session.connection()
+    engine = connection.engine
+    backend = _backends.get(engine)
+    if backend is None:
+        backend = _detect_backend(connection)
+        _backends[engine] = backend
+    return backend
+
+
+def _index_rows(connection, where, **params):
+    """(Re)index the feedback rows matching a WHERE clause"""
+    backend = search_backend(connection)
+    if backend:
+        return connection.execute(text(_INDEX_ROWS[backend].format(where=where)), params).rowcount
+    return 0
+
+
+def _create_index(connection):
+    """Create the search column/table for this dialect; returns the backend name"""
+    dialect = connection.dialect.name
+    setup = {'postgresql': _PG_SETUP, 'sqlite': _SQLITE_SETUP}.get(dialect, ())
+    for statement in setup:
+        connection.execute(text(statement))
+    _backends[connection.engine] = dialect if setup else ''
+    return _backends[connection.engine]
+
+
+def rebuild_search_index():
+    """
+    Create the search index if needed and reindex every feedback row
+
+    Returns:
+        int: Number of rows indexed, or None if the database has no
+            full-text search support
+    """
+    with db.engine.begin() as connection:
+        if not _create_index(connection):
+            return None
+        if connection.dialect.name == 'sqlite':
+            connection.execute(text("DELETE FROM feedback_fts"))
+        return _index_rows(connection, '1 = 1')
+
+
+@event.listens_for(Feedback.__table__, 'after_create')
+def _feedback_table_created(target, connection, **kw):
+    """Create the search index together with the feedback table"""
+    _create_index(connection)
+
+
+@event.listens_for(Feedback.__table__, 'before_drop')
+def _feedback_table_dropped(target, connection, **kw):
+    """Drop the SQLite shadow table with the feedback table (PostgreSQL drops the column itself)"""
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text("DROP TABLE IF EXISTS feedback_fts"))
+    _backends.pop(connection.engine, None)
+
+
+@event.listens_for(Feedback, 'after_insert')
+def _index_inserted_feedback(mapper, connection, target):
+    """Index new feedback"""
+    _index_rows(connection, 'feedback.id = :id', id=target.id)
+
+
+@event.listens_for(Feedback, 'after_update')
+def _index_updated_feedback(mapper, connection, target):
+    """Reindex feedback whose text or author changed"""
+    state = inspect(target)
+    if state.attrs.text.history.has_changes() or state.attrs.user_id.history.has_changes():
+        _index_rows(connection, 'feedback.id = :id', id=target.id)
+
+
+@event.listens_for(Feedback, 'after_delete')
+def _unindex_deleted_feedback(mapper, connection, target):
+    """Remove deleted feedback from the SQLite shadow table"""
+    if search_backend(connection) == 'sqlite':
+        connection.execute(text("DELETE FROM feedback_fts WHERE rowid = :id"), {'id': target.id})
+
+
+@event.listens_for(User, 'after_update')
+def _index_renamed_author(mapper, connection, target):
+    """Reindex a user's feedback when their name or email changes"""
+    state = inspect(target)
+    if state.attrs.name.history.has_changes() or state.attrs.email.history.has_changes():
+        _index_rows(connection, 'feedback.user_id = :id', id=target.id)
+
+
+def search_terms(search):
+    """Words of a search string, lowercased, at most MAX_TERMS"""
+    return _TERM_PATTERN.findall(search.lower())[:MAX_TERMS]
+
+
+def _tsquery(terms):
+    """PostgreSQL tsquery matching every term as a prefix"""
+    return func.to_tsquery('english', ' & '.join(f'{term}:*' for term in terms))
+
+
+def lexeme_count(terms):
+    """Number of lexemes PostgreSQL keeps from terms (0 when all are stopwords)"""
+    return db.session.scalar(select(func.numnode(_tsquery(terms))))
+
+
+def _searchable(terms, backend):
+    """Whether the index can answer a search for terms"""
+    if not backend or not terms:
+        return False
+    return backend != 'postgresql' or lexeme_count(terms) > 0
+
+
+def _match(stmt, terms, backend):
+    """(stmt restricted to matches of terms, the backend's full-text query)"""
+    if backend == 'postgresql':
+        query = _tsquery(terms)
+        return stmt.where(_search_vector.op('@@')(query)), query
+
+    query = ' '.join('"{}"*'.format(term.replace('"', '')) for term in terms)
+    matched = stmt.join(feedback_fts, feedback_fts.c.rowid == Feedback.id)\
+        .where(literal_column('feedback_fts').op('MATCH')(query))
+    return matched, query
+
+
+def filter_matches(stmt, search, backend=None):
+    """
+    Restrict a select from feedback to full-text matches of search
+
+    Returns:
+        The restricted statement, or None if there is no search index or
+        no searchable terms
+    """
+    backend = backend if backend is not None else search_backend()
+    terms = search_terms(search)
+    if not _searchable(terms, backend):
+        return None
+    return _match(stmt, terms, backend)[0]
+
+
+def apply_search(stmt, search, backend=None):
+    """
+    Restrict a feedback select to full-text matches of search, best first
+
+    Adds ``rank`` (higher is better) and ``snippet`` (see ``highlight``)
+    columns and orders by rank, newest first among equal ranks.
+
+    Returns:
+        The ranked statement, or None if there is no search index or no
+        searchable terms
+    """
+    backend = backend if backend is not None else search_backend()
+    terms = search_terms(search)
+    if not _searchable(terms, backend):
+        return None
+
+    matched, query = _match(stmt, terms, backend)
+    if backend == 'postgresql':
+        rank = func.ts_rank_cd(_search_vector, query)
+        snippet = func.ts_headline(
+            'english', Feedback.text, query,
+            f'StartSel={_START_MARK}, StopSel={_STOP_MARK}, MaxWords=35, MinWords=15, MaxFragments=2'
+        )
+    else:
+        # bm25() is lower for better matches; text weighted above name and email
+        rank = -func.bm25(literal_column('feedback_fts'), 2.0, 1.0, 1.0)
+        snippet = func.snippet(literal_column('feedback_fts'), 0, _START_MARK, _STOP_MARK, '…', 24)
+
+    rank = rank.label('rank')
+    return matched.add_columns(rank, snippet.label('snippet'))\
+        .order_by(None).order_by(rank.desc(), Feedback.created_at.desc())
+
+
+def highlight(snippet):
+    """HTML-escape a search snippet and mark matches with <mark>"""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(_START_MARK, '<mark>').replace(_STOP_MARK, '</mark>')
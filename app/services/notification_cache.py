@@ -0,0 +1,200 @@
+"""
+Per-worker in-memory cache of recent notifications
+
+Each role gets a bounded ring buffer of compact notification records, so the
+notification dropdown and recent lists never load notification rows from
+the database. Buffers are filled on first use (or by ``warm()`` at startup),
+appended by ``send_notification`` and checked against the database at most
+every ``sync_interval`` seconds (one indexed max/count query), because other
+workers append notifications this worker never sees.
+
+Read state is not cached: callers still look up the user's
+``NotificationReadState`` row (one primary-key read) for unread counts.
+"""
+import threading
+import time
+from collections import deque
+from flask import current_app
+from app import db
+from app.models import Notification
+
+
+class NotificationRecord:
+    """Immutable, slot-based snapshot of a notification row"""
+    __slots__ = ('id', 'message', 'type', 'timestamp', 'recipient_role', 'user_id', 'event_data')
+
+    def __init__(self, id, message, type, timestamp, recipient_role, user_id, event_data):
+        self.id = id
+        self.message = message
+        self.type = type
+        self.timestamp = timestamp
+        self.recipient_role = recipient_role
+        self.user_id = user_id
+        self.event_data = event_data
+
+    @classmethod
+    def from_model(cls, notification):
+        """Build a record from a Notification model (or a row with the same columns)"""
+        return cls(
+            notification.id,
+            notification.message,
+            notification.type,
+            notification.timestamp,
+            notification.recipient_role,
+            notification.user_id,
+            notification.event_data
+        )
+
+    def to_dict(self):
+        """Serialize like the notification API (the JSON provider formats the timestamp)"""
+        return {
+            'id': self.id,
+            'message': self.message,
+            'type': self.type,
+            'timestamp': self.timestamp,
+            'user_id': self.user_id,
+            'event_data': self.event_data
+        }
+
+
+class RoleRingBuffer:
+    """Bounded buffer of the newest notifications for one role, oldest first"""
+
+    def __init__(self, capacity):
+        self.records = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.synced_at = 0.0
+
+    def replace(self, records):
+        """Replace the contents with records given newest first"""
+        with self.lock:
+            self.records.clear()
+            self.records.extend(reversed(records))
+            self.loaded = True
+            self.synced_at = time.monotonic()
+
+    def append(self, record):
+        """Add a new record, keeping id order"""
+        with self.lock:
+            if not self.loaded:
+                return  # filled from the database on first use
+            if not self.records or record.id > self.records[-1].id:
+                self.records.append(record)
+                return
+            # Concurrent commits can finish out of order
+            if any(existing.id == record.id for existing in self.records):
+                return
+            if record.id < self.records[0].id:
+                if len(self.records) < self.records.maxlen:
+                    self.records.appendleft(record)
+                return
+            records = sorted(list(self.records) + [record], key=lambda r: r.id)
+            self.records.clear()
+            self.records.extend(records)
+
+    def recent(self, limit):
+        """Newest records first"""
+        with self.lock:
+            records = list(self.records)
+        records.reverse()
+        return records[:limit]
+
+    def bounds(self):
+        """Return (oldest_id, newest_id, size)"""
+        with self.lock:
+            if not self.records:
+                return None, None, 0
+            return self.records[0].id, self.records[-1].id, len(self.records)
+
+
+class NotificationCache:
+    """Ring buffers of recent notifications, one per role"""
+
+    def __init__(self, capacity=100, sync_interval=5.0):
+        self.capacity = capacity
+        self.sync_interval = sync_interval
+        self.buffers = {}
+        self.lock = threading.Lock()
+
+    def buffer(self, role):
+        """Get the ring buffer for a role"""
+        with self.lock:
+            if role not in self.buffers:
+                self.buffers[role] = RoleRingBuffer(self.capacity)
+            return self.buffers[role]
+
+    def recent(self, role, limit=50):
+        """Get the newest notifications for a role, newest first"""
+        if limit > self.capacity:
+            return self._load(role, limit)
+
+        buffer = self.buffer(role)
+        if not buffer.loaded or time.monotonic() - buffer.synced_at >= self.sync_interval:
+            self._sync(role, buffer)
+        return buffer.recent(limit)
+
+    def unread_count(self, role, read_state):
+        """
+        Count the buffered notifications a read state has not read
+
+        Returns None when unread notifications may have dropped out of a full
+        buffer (its oldest record is above the read cursor).
+        """
+        records = self.recent(role, self.capacity)
+        if len(records) == self.capacity and records[-1].id > (read_state.last_read_id or 0):
+            return None
+        return sum(1 for record in records if not read_state.is_read(record.id))
+
+    def append(self, notification):
+        """Add a just-committed notification to its role's buffer"""
+        self.buffer(notification.recipient_role).append(NotificationRecord.from_model(notification))
+
+    def warm(self, roles=('admin', 'user')):
+        """Fill the buffers from the database"""
+        for role in roles:
+            self.buffer(role).replace(self._load(role, self.capacity))
+
+    def _sync(self, role, buffer):
+        """Reload the buffer if the database has rows this worker missed"""
+        if buffer.loaded:
+            oldest_id, newest_id, size = buffer.bounds()
+            if oldest_id is not None:
+                latest_id, count = db.session.query(
+                    db.func.max(Notification.id),
+                    db.func.count(Notification.id)
+                ).filter(
+                    Notification.recipient_role == role,
+                    Notification.id >= oldest_id
+                ).one()
+                if latest_id == newest_id and count == size:
+                    buffer.synced_at = time.monotonic()
+                    return
+        buffer.replace(self._load(role, self.capacity))
+
+    def _load(self, role, limit):
+        """Load the newest records for a role from the database"""
+        rows = db.session.query(
+            Notification.id,
+            Notification.message,
+            Notification.type,
+            Notification.timestamp,
+            Notification.recipient_role,
+            Notification.user_id,
+            Notification.event_data
+        ).filter(Notification.recipient_role == role)\
+            .order_by(Notification.id.desc()).limit(limit).all()
+        return [NotificationRecord.from_model(row) for row in rows]
+
+
+def get_notification_cache(app=None):
+    """Get the notification cache of the (current) app, creating it if needed"""
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get('notification_cache')
+    if cache is None:
+        cache = NotificationCache(
+            capacity=app.config.get('NOTIFICATION_CACHE_SIZE', 100),
+            sync_interval=app.config.get('NOTIFICATION_CACHE_SYNC_INTERVAL', 5.0)
+        )
+        app.extensions['notification_cache'] = cache
+    return cache
@@ -1,5 +1,7 @@
 from app import db, socketio
-from app.models import Notification, User
+from app.models import Notification, NotificationReadState, User
+from app.services.notification_cache import get_notification_cache
+from app.services.notification_stream import notify_stream_listeners
 from datetime import datetime
 
 def send_notification(message, type, recipient_role='admin', user_id=None, event_data=None):
@@ -26,16 +28,24 @@ def send_notification(message, type, recipient_role='admin', user_id=None, event
         # Commit to database
         db.session.commit()
         
-        # Emit WebSocket event to all users with the specified role
+        # Keep this worker's recent-notifications buffer current
+        get_notification_cache().append(notification)
+        
+        # Emit WebSocket event to all users with the specified role. The
+        # payload is compact (no event_data) and raises every recipient's
+        # unread count by one, so clients never need to poll for it
         socketio.emit('new_notification', {
             'id': notification.id,
             'message': notification.message,
             'type': notification.type,
-            'timestamp': notification.timestamp.isoformat(),
+            'timestamp': notification.timestamp,  # ISO 8601 via the JSON provider
             'user_id': notification.user_id,
-            'event_data': notification.event_data
+            'unread_delta': 1
         }, room=f'role_{recipient_role}')
         
+        # Wake this worker's SSE streams (other workers' streams poll)
+        notify_stream_listeners()
+        
         return notification
         
     except Exception as e:
@@ -55,20 +65,82 @@ def send_user_notification(message, type='info', user_id=None, event_data=None):
     """
     return send_notification(message, type, 'user', user_id, event_data)
 
-def get_notification_count_for_role(role='admin'):
+def get_unread_count_for_user(user):
+    """
+    Get unread notification count for a user (per-user read state)
+    """
+    return Notification.get_unread_count_for_user(user)
+
+def unread_count_version(user):
+    """
+    Version stamp of a user's unread count (for ETags)
+    
+    Notifications are only ever appended, so the newest id of the role and
+    the read state cover every change; max(id) is answered from the
+    (recipient_role, id) index.
+    """
+    newest_id = db.session.query(db.func.max(Notification.id))\
+        .filter(Notification.recipient_role == user.role).scalar() or 0
+    return (user.id, user.role, newest_id, get_read_state(user.id).version())
+
+def cached_unread_count(user):
     """
-    Get unread notification count for a specific role
+    Get a user's unread count from the ring buffer when it holds every
+    notification above the read cursor, else from the database
+    
+    May lag notifications of other workers by NOTIFICATION_CACHE_SYNC_INTERVAL.
     """
-    return Notification.get_unread_count_for_role(role)
+    count = get_notification_cache().unread_count(user.role, NotificationReadState.for_user(user.id))
+    if count is None:
+        count = Notification.get_unread_count_for_user(user)
+    return count
+
+def push_unread_count(user):
+    """
+    Push a user's current unread count to their sockets
+    
+    Returns:
+        int: The unread count that was pushed
+    """
+    count = Notification.get_unread_count_for_user(user)
+    socketio.emit('notification_count', {
+        'count': count,
+        'role': user.role
+    }, room=f'user_{user.id}')
+    return count
 
 def get_notifications_for_role(role='admin', limit=50):
     """
-    Get recent notifications for a specific role
+    Get recent notifications for a specific role, newest first
+    
+    Served from the per-worker ring buffer as NotificationRecord objects
+    """
+    return get_notification_cache().recent(role, limit)
+
+def get_read_state(user_id):
+    """
+    Get a user's notification read state
     """
-    return Notification.get_recent_notifications_for_role(role, limit)
+    return NotificationReadState.for_user(user_id)
+
+def mark_notification_read(notification_id, user):
+    """
+    Mark a notification as read for a user and push the new unread count
+    
+    Returns:
+        int: The user's unread count, or None if the notification does not exist
+    """
+    if not Notification.mark_as_read(notification_id, user):
+        return None
+    return push_unread_count(user)
 
-def mark_notification_read(notification_id):
+def mark_all_notifications_read(user):
     """
-    Mark a notification as read
+    Mark all notifications for the user's role as read and push the new count
     """
-    return Notification.mark_as_read(notification_id)
+    Notification.mark_all_as_read(user)
+    socketio.emit('notification_count', {
+        'count': 0,
+        'role': user.role
+    }, room=f'user_{user.id}')
+    return 0
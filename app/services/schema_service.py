@@ -0,0 +1,72 @@
+"""
+Additive schema upgrades for existing databases
+
+The app creates tables with ``db.create_all()``, which never alters tables
+that already exist. Columns added to a model later are added here with
+``ALTER TABLE ... ADD COLUMN`` so maintenance commands can upgrade a
+deployed database in place.
+"""
+from sqlalchemy import inspect, text
+from app import db
+
+
+def add_missing_columns(model):
+    """
+    Add the model's columns that are missing from its existing table
+
+    Returns:
+        list: Names of the columns that were added
+    """
+    table = model.__table__
+    inspector = inspect(db.engine)
+    if not inspector.has_table(table.name):
+        table.create(db.engine)
+        return []
+
+    existing = {column['name'] for column in inspector.get_columns(table.name)}
+    added = []
+    with db.engine.begin() as connection:
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(db.engine.dialect)}'
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            if not column.nullable and column.server_default is not None:
+                ddl += ' NOT NULL'
+            connection.execute(text(ddl))
+            added.append(column.name)
+    return added
+
+
+def add_missing_indexes(model):
+    """
+    Create the model's indexes that are missing from its existing table
+
+    Returns:
+        list: Names of the indexes that were created
+    """
+    table = model.__table__
+    existing = {index['name'] for index in inspect(db.engine).get_indexes(table.name)}
+    added = []
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(db.engine)
+            added.append(index.name)
+    return added
+
+
+def upgrade_schema():
+    """
+    Bring every model's table up to date (missing tables, columns, indexes)
+
+    Returns:
+        list: ``table.column`` / index names that were added
+    """
+    added = []
+    for mapper in sorted(db.Model.registry.mappers, key=lambda mapper: mapper.class_.__name__):
+        model = mapper.class_
+        table = model.__table__.name
+        added += [f'{table}.{column}' for column in add_missing_columns(model)]
+        added += add_missing_indexes(model)
+    return added
@@ -1,4 +1,3 @@
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 from typing import Tuple, Dict, Any
 import re
 from config import Config
@@ -7,6 +6,8 @@ class SentimentService:
     """Service for analyzing sentiment of feedback text"""
     
     def __init__(self):
+        # Imported and loaded (lexicon files) on first use, not at startup
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
         self.analyzer = SentimentIntensityAnalyzer()
         self.banned_words = set(Config.BANNED_WORDS)
     
@@ -129,6 +130,9 @@ class HuggingFaceSentimentService:
         text_lower = text.lower()
         return any(word.lower() in text_lower for word in Config.BANNED_WORDS)
 
+# Services by type, created once per process (the analyzers are read-only)
+_services = {}
+
 # Factory function to get sentiment service
 def get_sentiment_service(service_type: str = 'vader') -> SentimentService:
     """
@@ -138,9 +142,11 @@ def get_sentiment_service(service_type: str = 'vader') -> SentimentService:
         service_type: 'vader' or 'huggingface'
         
     Returns:
-        SentimentService instance
+        SentimentService instance, shared by every caller in this process
     """
-    if service_type == 'huggingface':
-        return HuggingFaceSentimentService()
-    else:
-        return SentimentService()
+    service_type = 'huggingface' if service_type == 'huggingface' else 'vader'
+    service = _services.get(service_type)
+    if service is None:
+        service = HuggingFaceSentimentService() if service_type == 'huggingface' else SentimentService()
+        _services[service_type] = service
+    return service
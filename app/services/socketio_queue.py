@@ -0,0 +1,213 @@
+"""
+Socket.IO message queue backends.
+
+Every gunicorn worker runs its own Socket.IO server, so an emit made in one
+worker only reaches the sockets connected to that worker. Attaching a pub/sub
+client manager makes each emit go through a shared channel and every worker
+re-emits it to its own rooms (``role_admin``, ``user_<id>``...).
+
+Supported ``SOCKETIO_MESSAGE_QUEUE`` URLs:
+
+* ``redis://`` / ``rediss://`` - Redis pub/sub (needs the ``redis`` package)
+* ``postgresql://`` / ``postgres://`` - Postgres LISTEN/NOTIFY
+* ``kafka://``, ``zmq+tcp://`` and anything kombu understands (``amqp://``...)
+* ``local://<name>`` - in-process stand-in broker used by tests and benchmarks
+"""
+import queue
+import select
+import threading
+import time
+
+from socketio import PubSubManager, RedisManager, KafkaManager, ZmqManager, KombuManager
+
+from app.services.json_provider import dumps
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+POSTGRES_NOTIFY_MAX_PAYLOAD = 7999
+
+
+class PostgresNotifyManager(PubSubManager):
+    """Client manager that fans out Socket.IO events over LISTEN/NOTIFY"""
+    name = 'postgres'
+
+    def __init__(self, url, channel='flask-socketio', write_only=False, logger=None):
+        import psycopg2  # noqa: F401 - fail early if the driver is missing
+
+        # SQLAlchemy style URLs carry the driver name, libpq does not accept it
+        self.url = url.replace('postgresql+psycopg2://', 'postgresql://', 1)
+        self._publish_conn = None
+        self._publish_lock = threading.Lock()
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+
+    def _connect(self):
+        import psycopg2
+
+        conn = psycopg2.connect(self.url)
+        conn.autocommit = True
+        return conn
+
+    def _publish(self, data):
+        import psycopg2
+
+        payload = dumps(data)
+        if len(payload.encode('utf-8')) > POSTGRES_NOTIFY_MAX_PAYLOAD:
+            self._get_logger().error(
+                f'Socket.IO message for channel {self.channel} exceeds the '
+                f'Postgres NOTIFY payload limit and was not published')
+            return
+
+        with self._publish_lock:
+            for retry in range(2):
+                try:
+                    if self._publish_conn is None or self._publish_conn.closed:
+                        self._publish_conn = self._connect()
+                    with self._publish_conn.cursor() as cursor:
+                        cursor.execute('SELECT pg_notify(%s, %s)', (self.channel, payload))
+                    return
+                except psycopg2.Error as e:
+                    self._publish_conn = None
+                    if retry:
+                        self._get_logger().error(f'Cannot publish to Postgres channel {self.channel}: {e}')
+                        raise
+
+    def _listen(self):
+        import psycopg2
+        from psycopg2 import sql
+
+        while True:
+            conn = None
+            try:
+                conn = self._connect()
+                with conn.cursor() as cursor:
+                    cursor.execute(sql.SQL('LISTEN {}').format(sql.Identifier(self.channel)))
+
+                while True:
+                    # Wake up periodically so a dead connection is noticed
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        yield conn.notifies.pop(0).payload
+            except psycopg2.Error as e:
+                self._get_logger().error(f'Postgres LISTEN connection lost, retrying: {e}')
+                time.sleep(1)
+            finally:
+                if conn is not None and not conn.closed:
+                    conn.close()
+
+
+class LocalBroker:
+    """In-process pub/sub broker standing in for Redis/Postgres in tests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, channel):
+        """Return a queue that receives every message published on channel"""
+        subscriber = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, channel, subscriber):
+        """Stop delivering messages to a subscriber queue"""
+        with self._lock:
+            if subscriber in self._subscribers.get(channel, []):
+                self._subscribers[channel].remove(subscriber)
+        subscriber.put(None)
+
+    def publish(self, channel, message):
+        """Deliver message to all subscribers, returning how many got it"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, []))
+        for subscriber in subscribers:
+            subscriber.put(message)
+        return len(subscribers)
+
+    def shutdown(self):
+        """Stop every listener attached to this broker"""
+        with self._lock:
+            subscribers = self._subscribers
+            self._subscribers = {}
+        for channel_subscribers in subscribers.values():
+            for subscriber in channel_subscribers:
+                subscriber.put(None)
+
+
+_local_brokers = {}
+_local_brokers_lock = threading.Lock()
+
+
+def get_local_broker(name='default'):
+    """Get (or create) the named in-process broker"""
+    with _local_brokers_lock:
+        if name not in _local_brokers:
+            _local_brokers[name] = LocalBroker()
+        return _local_brokers[name]
+
+
+class LocalBrokerManager(PubSubManager):
+    """Client manager backed by a LocalBroker
+
+    Messages are JSON encoded exactly like on the Postgres backend, so payloads
+    that would not survive a real broker fail here too.
+    """
+    name = 'local'
+
+    def __init__(self, url='local://', channel='flask-socketio', write_only=False, logger=None, broker=None):
+        self.broker = broker or get_local_broker(url.split('://', 1)[-1] or 'default')
+        self._subscriber = None
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+
+    def initialize(self):
+        # Subscribe before the listener thread starts so no message is missed
+        if not self.write_only and self._subscriber is None:
+            self._subscriber = self.broker.subscribe(self.channel)
+        super().initialize()
+
+    def close(self):
+        """Detach the listener from the broker"""
+        if self._subscriber is not None:
+            self.broker.unsubscribe(self.channel, self._subscriber)
+            self._subscriber = None
+
+    def _publish(self, data):
+        self.broker.publish(self.channel, dumps(data))
+
+    def _listen(self):
+        subscriber = self._subscriber or self.broker.subscribe(self.channel)
+        while True:
+            message = subscriber.get()
+            if message is None:
+                return
+            yield message
+
+
+def create_client_manager(config, write_only=False):
+    """
+    Build the Socket.IO client manager for the configured message queue
+
+    Args:
+        config: Flask config mapping
+        write_only (bool): Only publish events (processes without sockets)
+
+    Returns:
+        A PubSubManager instance, or None to keep the default in-process manager
+    """
+    url = config.get('SOCKETIO_MESSAGE_QUEUE')
+    if not url:
+        return None
+
+    channel = config.get('SOCKETIO_CHANNEL', 'flask-socketio')
+    if url.startswith(('redis://', 'rediss://')):
+        return RedisManager(url, channel=channel, write_only=write_only)
+    if url.startswith(('postgresql://', 'postgresql+psycopg2://', 'postgres://')):
+        return PostgresNotifyManager(url, channel=channel, write_only=write_only)
+    if url.startswith('local://'):
+        return LocalBrokerManager(url, channel=channel, write_only=write_only)
+    if url.startswith('kafka://'):
+        return KafkaManager(url, channel=channel, write_only=write_only)
+    if url.startswith('zmq'):
+        return ZmqManager(url, channel=channel, write_only=write_only)
+    return KombuManager(url, channel=channel, write_only=write_only)
@@ -0,0 +1,140 @@
+"""
+Worker startup: template precompilation, warm-up, fork safety and timing
+
+``wsgi.py`` calls ``warm_up`` before a worker serves its first request, so
+the first users don't pay for compiling templates, loading the sentiment
+lexicon, filling the notification, stats and typeahead caches or opening
+database connections. Compiled templates are also written to a Jinja bytecode cache
+(JINJA_BYTECODE_CACHE_DIR), which recycled workers load instead of parsing
+the template sources again.
+
+With gunicorn's ``preload_app`` (GUNICORN_PRELOAD=true, sync workers) this
+all happens once in the master and workers inherit it on fork; ``after_fork``
+then drops the database connections copied from the master, which must not
+be shared between processes, and opens the worker's own.
+
+Each step is timed; the step timings, the time from the first app import
+to ready and the time from ready to the first request are logged and kept
+in ``app.extensions['startup']`` (reported by /api/health).
+"""
+import os
+import time
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache
+from app import db
+
+
+def bytecode_cache(config):
+    """Jinja bytecode cache in JINJA_BYTECODE_CACHE_DIR, or None when unset"""
+    directory = config.get('JINJA_BYTECODE_CACHE_DIR')
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    return FileSystemBytecodeCache(directory)
+
+
+def compile_templates(app):
+    """Compile every template into the Jinja environment; returns how many"""
+    names = app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html'))
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def warm_pool(app):
+    """Open WARM_POOL_CONNECTIONS database connections and return them to the pool"""
+    wanted = app.config.get('WARM_POOL_CONNECTIONS', 2)
+    pool_size = getattr(db.engine.pool, 'size', lambda: 1)()
+    connections = [db.engine.connect() for _ in range(max(1, min(wanted, pool_size)))]
+    for connection in connections:
+        connection.close()
+    return len(connections)
+
+
+def _steps(app):
+    from app.services.notification_cache import get_notification_cache
+    from app.services.sentiment_service import get_sentiment_service
+    from app.services.stats_service import get_stats_snapshot
+    from app.services.user_typeahead import warm_index
+
+    return [
+        ('templates', lambda: compile_templates(app)),
+        ('sentiment', get_sentiment_service),
+        ('db_pool', lambda: warm_pool(app)),
+        ('notification_cache', lambda: get_notification_cache(app).warm()),
+        ('stats', get_stats_snapshot),
+        ('typeahead', lambda: warm_index(app)),
+    ]
+
+
+def _stats(app):
+    return app.extensions.setdefault('startup', {'pid': os.getpid(), 'steps': {}})
+
+
+def warm_up(app):
+    """
+    Fill this process' caches before it serves requests
+
+    A failing step (e.g. the database is not reachable yet) is logged and
+    skipped; the cache then fills on first use as before.
+
+    Returns:
+        dict: Seconds spent per step
+    """
+    stats = _stats(app)
+    with app.app_context():
+        for name, step in _steps(app):
+            started = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.warning(f"Warm-up step {name} skipped: {e}")
+            stats['steps'][name] = round(time.perf_counter() - started, 4)
+        db.session.remove()
+    return stats['steps']
+
+
+def after_fork(app):
+    """Make a preloaded app safe to use in a forked worker"""
+    started = time.perf_counter()
+    with app.app_context():
+        # Connections opened by the master belong to it: forget them without
+        # closing (close=False), so the master's sockets are left alone
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+        try:
+            warm_pool(app)
+        except Exception as e:
+            app.logger.warning(f"Warm-up step db_pool skipped: {e}")
+    stats = _stats(app)  # the master's copy, now private to this worker
+    stats['pid'] = os.getpid()
+    stats['after_fork_seconds'] = round(time.perf_counter() - started, 4)
+    stats['ready_at'] = time.perf_counter()
+    app.logger.info(f"Worker {stats['pid']} forked from the preloaded app, "
+                    f"ready in {stats['after_fork_seconds']:.3f}s")
+
+
+def mark_ready(app, process_started):
+    """Record and log how long this process took to import, create and warm the app"""
+    stats = _stats(app)
+    stats['ready_at'] = time.perf_counter()
+    stats['ready_seconds'] = round(stats['ready_at'] - process_started, 4)
+    app.logger.info(f"Process {stats['pid']} ready in {stats['ready_seconds']:.3f}s "
+                    f"(warm-up: {stats['steps']})")
+
+
+def startup_report(app):
+    """Startup timings of this process, JSON-serializable"""
+    stats = app.extensions.get('startup', {})
+    return {key: value for key, value in stats.items() if key != 'ready_at'}
+
+
+def record_first_request():
+    """before_request hook: log the time from ready to the first request"""
+    stats = current_app.extensions.get('startup')
+    if stats is None or 'first_request_seconds' in stats or 'ready_at' not in stats:
+        return
+    stats['first_request_seconds'] = round(time.perf_counter() - stats['ready_at'], 4)
+    current_app.logger.info(f"Worker {stats['pid']} got its first request "
+                            f"{stats['first_request_seconds']:.3f}s after it was ready")
@@ -0,0 +1,144 @@
+"""
+Cached statistics snapshot for the admin dashboards
+
+All dashboard figures come from two aggregate queries (one over users, one
+over feedback) using conditional aggregation, instead of a COUNT/AVG/GROUP BY
+query per figure. The snapshot is cached per worker for STATS_CACHE_TTL
+seconds and dropped as soon as this worker commits a change to users or
+feedback; changes made by other workers show up when the TTL runs out.
+Concurrent requests for an expired snapshot wait for a single computation.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event, select, func, case
+from sqlalchemy.orm import Session
+from app import db
+from app.models import User, Feedback
+
+SENTIMENT_LABELS = ('positive', 'neutral', 'negative')
+RATINGS = (1, 2, 3, 4, 5)
+
+
+def _count_where(condition):
+    """COUNT of rows matching condition, as one column of an aggregate query"""
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def compute_stats_snapshot(now=None):
+    """Compute every dashboard figure in two aggregate queries"""
+    week_ago = (now or datetime.utcnow()) - timedelta(days=7)
+
+    users = db.session.execute(select(
+        func.count(User.id),
+        _count_where(User.is_active.is_(True)),
+        _count_where(User.has_submitted_feedback.is_(True)),
+        _count_where(User.created_at >= week_ago)
+    )).one()
+
+    feedback = db.session.execute(select(
+        func.count(Feedback.id),
+        func.avg(Feedback.rating),
+        _count_where(Feedback.created_at >= week_ago),
+        *[_count_where(Feedback.final_sentiment_label == label) for label in SENTIMENT_LABELS],
+        *[_count_where(Feedback.rating == rating) for rating in RATINGS]
+    )).one()
+
+    total_users, active_users, feedback_submitted, recent_users = users
+    total_feedback, avg_rating, recent_feedback = feedback[:3]
+    sentiment_counts = feedback[3:3 + len(SENTIMENT_LABELS)]
+    rating_counts = feedback[3 + len(SENTIMENT_LABELS):]
+
+    return {
+        'total_users': total_users,
+        'active_users': active_users,
+        'feedback_submitted': feedback_submitted,
+        'pending_feedback': total_users - feedback_submitted,
+        'feedback_rate': (feedback_submitted / total_users * 100) if total_users > 0 else 0,
+        'recent_users': recent_users,
+        'total_feedback': total_feedback,
+        'average_rating': round(float(avg_rating or 0), 2),
+        'recent_feedback': recent_feedback,
+        'sentiment_distribution': {
+            label: count for label, count in zip(SENTIMENT_LABELS, sentiment_counts) if count
+        },
+        'rating_distribution': {
+            str(rating): count for rating, count in zip(RATINGS, rating_counts) if count
+        },
+        'computed_at': datetime.utcnow().isoformat()
+    }
+
+
+class StatsCache:
+    """One cached statistics snapshot with a TTL"""
+
+    def __init__(self, ttl=30.0):
+        self.ttl = ttl
+        self.snapshot = None
+        self.computed_at = 0.0
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Get the snapshot, computing it if missing or older than the TTL"""
+        snapshot = self.snapshot
+        if snapshot is not None and time.monotonic() - self.computed_at < self.ttl:
+            return snapshot
+
+        with self.lock:
+            # Another request may have refreshed it while we waited
+            if self.snapshot is not None and time.monotonic() - self.computed_at < self.ttl:
+                return self.snapshot
+
+            generation = self.generation
+            snapshot = compute_stats_snapshot()
+            # Don't cache a snapshot that a concurrent write already made stale
+            if generation == self.generation:
+                self.snapshot = snapshot
+                self.computed_at = time.monotonic()
+            return snapshot
+
+    def invalidate(self):
+        """Drop the cached snapshot"""
+        self.generation += 1
+        self.snapshot = None
+
+
+def get_stats_cache(app=None):
+    """Get the stats cache of the (current) app, creating it if needed"""
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get('stats_cache')
+    if cache is None:
+        cache = StatsCache(ttl=app.config.get('STATS_CACHE_TTL', 30))
+        app.extensions['stats_cache'] = cache
+    return cache
+
+
+def get_stats_snapshot():
+    """Get the (cached) admin statistics snapshot"""
+    return get_stats_cache().get()
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_stats_changes(session, flush_context):
+    """Remember that this transaction wrote users or feedback"""
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, (User, Feedback)):
+            session.info['stats_dirty'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_stats(session):
+    """Drop this worker's snapshot once user or feedback changes are committed"""
+    if session.info.pop('stats_dirty', False) and has_app_context():
+        cache = current_app.extensions.get('stats_cache')
+        if cache is not None:
+            cache.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_stats_changes(session):
+    """Rolled back changes need no invalidation"""
+    session.info.pop('stats_dirty', None)
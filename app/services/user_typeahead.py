@@ -0,0 +1,296 @@
+"""
+Typeahead suggestions for the admin user search
+
+On PostgreSQL with the ``pg_trgm`` extension, suggestions come from trigram
+GIN indexes on ``users.name`` and ``users.email`` ranked by
+``word_similarity``; queries too short for a trigram match fall back to
+prefix ILIKE. Elsewhere each worker keeps a ``UserPrefixIndex``: a sorted
+list of name/email tokens searched with bisect and ranked by trigram
+similarity. It is built at startup (``warm_index``, a warm-up step),
+refreshed from ``users.updated_at`` (indexed) at most every
+TYPEAHEAD_REFRESH_INTERVAL seconds and rebuilt every
+TYPEAHEAD_REBUILD_INTERVAL seconds, which also picks up users deleted by
+other workers. Rebuilds and refreshes read the database without holding
+the index lock, so searches keep using the current index meanwhile.
+
+Every worker holds its own copy: about 2 KB per user (eight keys each, plus
+the row), i.e. ~200 MB per worker for 100k users and ~2 GB for a million,
+twice that while a rebuild swaps in a new copy. At that scale install
+``pg_trgm``, which keeps nothing in worker memory.
+
+``create_typeahead_indexes`` adds these indexes to an existing database
+(the ``rebuild-search-index`` command runs it).
+"""
+import re
+import threading
+import time
+import weakref
+from bisect import bisect_left, insort
+from datetime import timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event, select, func, literal, or_, text
+from app import db, socketio
+from app.models import User
+
+# Suggestions returned when no limit is given, and the most allowed
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# Prefix matches ranked per query; bounds work for one- or two-letter queries
+MAX_CANDIDATES = 200
+
+# Shorter queries have too few trigrams to pass pg_trgm's similarity threshold
+MIN_TRIGRAM_QUERY = 3
+
+# Re-read users updated this long before the last one seen (clock skew between workers)
+SYNC_SLACK = timedelta(seconds=5)
+
+_WORD_SPLIT = re.compile(r'[\s@._+-]+')
+
+_PG_SETUP = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_name_trgm ON users USING GIN (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING GIN (email gin_trgm_ops)"
+)
+
+_COLUMNS = (User.id, User.name, User.email, User.role, User.is_active, User.updated_at)
+
+# Engine -> whether the pg_trgm indexes exist
+_trigram_engines = weakref.WeakKeyDictionary()
+
+
+def trigrams(value):
+    """Trigrams of each word of value, padded like pg_trgm"""
+    grams = set()
+    for word in _WORD_SPLIT.split(value.lower()):
+        if word:
+            padded = f'  {word} '
+            grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(query_grams, value):
+    """Trigram similarity (0..1) between a query's trigrams and value"""
+    value_grams = trigrams(value)
+    shared = len(query_grams & value_grams)
+    return shared / (len(query_grams) + len(value_grams) - shared) if shared else 0.0
+
+
+def _tokens(name, email):
+    """Index keys of a user: full name and email plus each of their words"""
+    name, email = (name or '').lower(), (email or '').lower()
+    words = set(_WORD_SPLIT.split(name)) | set(_WORD_SPLIT.split(email))
+    words.update((name, email, email.partition('@')[2]))
+    words.discard('')
+    return words
+
+
+def _suggestion(record, score):
+    """Typeahead JSON entry for a user row"""
+    return {
+        'id': record.id,
+        'name': record.name,
+        'email': record.email,
+        'role': record.role,
+        'is_active': record.is_active,
+        'score': round(score, 3)
+    }
+
+
+class UserPrefixIndex:
+    """Per-worker in-memory prefix index over user names and emails"""
+
+    def __init__(self, refresh_interval=1.0, rebuild_interval=3600.0):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.keys = []    # sorted (token, user id)
+        self.users = {}   # user id -> (tokens, row)
+        self.synced_to = None
+        self.checked_at = None
+        self.built_at = None
+        self.rebuilding = False
+        self.lock = threading.Lock()        # guards keys/users while searching
+        self.build_lock = threading.Lock()  # one rebuild at a time
+
+    def _add(self, row):
+        self.discard(row.id)
+        tokens = _tokens(row.name, row.email)
+        for token in tokens:
+            insort(self.keys, (token, row.id))
+        self.users[row.id] = (tokens, row)
+
+    def discard(self, user_id):
+        """Remove a user from the index"""
+        entry = self.users.pop(user_id, None)
+        if entry:
+            for token in entry[0]:
+                position = bisect_left(self.keys, (token, user_id))
+                if position < len(self.keys) and self.keys[position] == (token, user_id):
+                    del self.keys[position]
+
+    def _track(self, rows):
+        for row in rows:
+            if row.updated_at and (self.synced_to is None or row.updated_at > self.synced_to):
+                self.synced_to = row.updated_at
+
+    def rebuild(self):
+        """Load every user, then swap the new index in; searches use the old one meanwhile"""
+        with self.build_lock:
+            rows = db.session.execute(select(*_COLUMNS)).all()
+            users = {row.id: (_tokens(row.name, row.email), row) for row in rows}
+            keys = sorted((token, user_id) for user_id, (tokens, _) in users.items() for token in tokens)
+            with self.lock:
+                self.users, self.keys = users, keys
+                self.synced_to = None
+                self._track(rows)
+                self.built_at = self.checked_at = time.monotonic()
+
+    def _rebuild_in_background(self, app):
+        try:
+            with app.app_context():
+                self.rebuild()
+                db.session.remove()
+        except Exception as e:
+            app.logger.warning(f"Typeahead index rebuild failed: {e}")
+        finally:
+            self.rebuilding = False
+
+    def refresh(self):
+        """Start a background rebuild or apply changed users when the intervals have passed
+
+        The changed users are read without holding the lock, so searches in
+        this worker never wait on the database; only applying them does.
+        """
+        now = time.monotonic()
+        if now - self.built_at >= self.rebuild_interval and not self.rebuilding:
+            self.rebuilding = True
+            socketio.start_background_task(self._rebuild_in_background, current_app._get_current_object())
+        if now - self.checked_at < self.refresh_interval:
+            return
+        self.checked_at = now  # other requests keep searching meanwhile
+        stmt = select(*_COLUMNS)
+        synced_to = self.synced_to
+        if synced_to is not None:
+            stmt = stmt.where(User.updated_at >= synced_to - SYNC_SLACK)
+        rows = db.session.execute(stmt).all()
+        with self.lock:
+            for row in rows:
+                self._add(row)
+            self._track(rows)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Users with a name or email word starting with query, most similar first"""
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        if self.built_at is None:
+            self.rebuild()  # not warmed up at startup (e.g. the development server)
+        self.refresh()
+        with self.lock:
+            candidates = {}
+            position = bisect_left(self.keys, (query,))
+            while position < len(self.keys) and len(candidates) < MAX_CANDIDATES:
+                token, user_id = self.keys[position]
+                if not token.startswith(query):
+                    break
+                candidates.setdefault(user_id, self.users[user_id][1])
+                position += 1
+
+        query_grams = trigrams(query)
+        scored = [
+            (max(similarity(query_grams, row.name or ''), similarity(query_grams, row.email or '')), row)
+            for row in candidates.values()
+        ]
+        scored.sort(key=lambda item: (-item[0], item[1].name or '', item[1].id))
+        return [_suggestion(row, score) for score, row in scored[:limit]]
+
+
+def get_prefix_index(app=None):
+    """Get the prefix index of the (current) app, creating it if needed"""
+    app = app or current_app._get_current_object()
+    index = app.extensions.get('user_typeahead')
+    if index is None:
+        index = UserPrefixIndex(
+            refresh_interval=app.config.get('TYPEAHEAD_REFRESH_INTERVAL', 1),
+            rebuild_interval=app.config.get('TYPEAHEAD_REBUILD_INTERVAL', 3600)
+        )
+        app.extensions['user_typeahead'] = index
+    return index
+
+
+def warm_index(app=None):
+    """Build this worker's prefix index before it serves searches (startup warm-up)"""
+    if not has_trigram_indexes():
+        get_prefix_index(app).rebuild()
+
+
+def has_trigram_indexes(connection=None):
+    """Whether this database has the pg_trgm user indexes"""
+    connection = connection or db.session.connection()
+    found = _trigram_engines.get(connection.engine)
+    if found is None:
+        found = connection.dialect.name == 'postgresql' and connection.execute(text(
+            "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_users_name_trgm'"
+        )).first() is not None
+        _trigram_engines[connection.engine] = found
+    return found
+
+
+def create_typeahead_indexes():
+    """
+    Create the users.updated_at index and, on PostgreSQL, the pg_trgm indexes
+
+    Returns:
+        bool: Whether trigram indexes are now available
+    """
+    with db.engine.begin() as connection:
+        connection.execute(text("CREATE INDEX IF NOT EXISTS ix_users_updated_at ON users (updated_at)"))
+        if connection.dialect.name != 'postgresql':
+            return False
+        for statement in _PG_SETUP:
+            connection.execute(text(statement))
+        _trigram_engines[connection.engine] = True
+    return True
+
+
+def _trigram_statement(query, limit):
+    """Query for the top matches from the pg_trgm indexes"""
+    score = func.greatest(func.word_similarity(query, User.name), func.word_similarity(query, User.email))
+    matches = [literal(query).op('<%')(User.name), literal(query).op('<%')(User.email)]
+    if len(query) < MIN_TRIGRAM_QUERY:
+        # The first keystrokes never reach the similarity threshold: match
+        # the start of the name, of a word in it or of the email instead
+        matches += [
+            User.name.istartswith(query, autoescape=True),
+            User.name.icontains(f' {query}', autoescape=True),
+            User.email.istartswith(query, autoescape=True)
+        ]
+    return select(*_COLUMNS, score.label('score')).where(or_(*matches))\
+        .order_by(score.desc(), User.name).limit(limit)
+
+
+def _trigram_search(query, limit):
+    """Top matches from the pg_trgm indexes"""
+    stmt = _trigram_statement(query.strip(), limit)
+    return [_suggestion(row, row.score) for row in db.session.execute(stmt)]
+
+
+def suggest_users(query, limit=DEFAULT_LIMIT):
+    """Top limit users matching query for the admin search box"""
+    limit = max(1, min(limit, MAX_LIMIT))
+    if not query.strip():
+        return []
+    if has_trigram_indexes():
+        return _trigram_search(query, limit)
+    return get_prefix_index().search(query, limit)
+
+
+@event.listens_for(User, 'after_delete')
+def _forget_deleted_user(mapper, connection, target):
+    """Drop deleted users from this worker's prefix index right away"""
+    if has_app_context():
+        index = current_app.extensions.get('user_typeahead')
+        if index is not None:
+            with index.lock:
+                index.discard(target.id)
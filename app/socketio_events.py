@@ -1,4 +1,4 @@
-from flask import request
+from flask import request, session
 from flask_socketio import emit, join_room, leave_room
 from app import socketio
 from app.models import User
@@ -31,15 +31,25 @@ def handle_connect():
                     # Also join user-specific room for private messages
                     join_room(f'user_{user_id}')
                     
-                    # Store user info in session
+                    # Store user info in the socket session so later events
+                    # need no JWT decoding or user lookup
                     request.user_id = user_id
                     request.user_role = user.role
+                    session['user_id'] = user.id
+                    session['user_role'] = user.role
                     
                     emit('connection_status', {
                         'status': 'connected',
                         'user_id': user_id,
                         'role': user.role
                     })
+                    
+                    # Initial unread count; later changes are pushed as they happen
+                    from app.services.notification_service import get_unread_count_for_user
+                    emit('notification_count', {
+                        'count': get_unread_count_for_user(user),
+                        'role': user.role
+                    })
                     return
         except Exception as e:
             print(f"Error processing JWT token: {e}")
@@ -91,25 +101,47 @@ def handle_leave_admin_room():
 @socketio.on('get_notification_count')
 def handle_get_notification_count():
     """Handle request for notification count"""
-    access_token = request.cookies.get('access_token_cookie')
+    user_id = session.get('user_id')
     
-    if access_token:
+    if user_id:
         try:
-            payload = decode_token(access_token)
-            user_id = payload.get('sub')
-            
-            if user_id:
-                user = User.query.get(user_id)
-                if user:
-                    from app.services.notification_service import get_notification_count_for_role
-                    count = get_notification_count_for_role(user.role)
-                    
-                    emit('notification_count', {
-                        'count': count,
-                        'role': user.role
-                    })
-                    return
+            user = User.query.get(user_id)
+            if user:
+                from app.services.notification_service import get_unread_count_for_user
+                emit('notification_count', {
+                    'count': get_unread_count_for_user(user),
+                    'role': user.role
+                })
+                return
         except Exception as e:
             print(f"Error getting notification count: {e}")
     
     emit('notification_count', {'count': 0, 'role': 'anonymous'})
+
+@socketio.on('get_notifications')
+def handle_get_notifications(data=None):
+    """Handle request for the recent notifications list (served from the ring buffer)"""
+    user_id = session.get('user_id')
+    role = session.get('user_role')
+    
+    if not user_id:
+        emit('notifications', {'notifications': [], 'total': 0})
+        return
+    
+    try:
+        limit = min(int((data or {}).get('limit', 10)), 100)
+    except (TypeError, ValueError):
+        limit = 10
+    
+    from app.services.notification_service import get_notifications_for_role, get_read_state
+    read_state = get_read_state(user_id)
+    notification_list = []
+    for notification in get_notifications_for_role(role, limit):
+        notification_data = notification.to_dict()
+        notification_data['read'] = read_state.is_read(notification.id)
+        notification_list.append(notification_data)
+    
+    emit('notifications', {
+        'notifications': notification_list,
+        'total': len(notification_list)
+    })
@@ -246,6 +246,38 @@ const App = {
     };
   },
 
+  /**
+   * Run a background export job, poll its progress and download the file
+   */
+  runExport: async function (dataset, format = "csv", onProgress = null) {
+    const response = await fetch("/admin/exports", {
+      method: "POST",
+      credentials: "include",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ dataset: dataset, format: format }),
+    });
+    const data = await response.json();
+    if (!response.ok) {
+      throw new Error(data.error || "Failed to start export");
+    }
+
+    let job = data.job;
+    while (job.status === "pending" || job.status === "running") {
+      if (onProgress) onProgress(job.progress);
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+      const status = await fetch(`/admin/exports/${job.id}`, {
+        credentials: "include",
+      });
+      job = (await status.json()).job;
+    }
+    if (job.status !== "completed") {
+      throw new Error(job.error || "Export failed");
+    }
+
+    window.location.href = `/admin/exports/${job.id}/download`;
+    return job;
+  },
+
   /**
    * Show loading indicator
    */
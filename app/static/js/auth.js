@@ -3,6 +3,7 @@
  */
 const Auth = {
   _initialized: false, // Prevent multiple initializations
+  _currentUser: null, // Promise of the current user, see getCurrentUser
 
   /**
    * Check if user is authenticated
@@ -118,6 +119,7 @@ const Auth = {
     if (success) {
       console.log("Token refreshed successfully, updating navigation...");
       // Don't call init() again to prevent infinite loop
+      this._currentUser = null;
       const user = await this.getCurrentUser();
       if (user) {
         this.updateNavigation(user);
@@ -147,8 +149,21 @@ const Auth = {
 
   /**
    * Get current user info
+   *
+   * Uses the user rendered into the page (window.BOOTSTRAP) when there is
+   * one; otherwise fetches /auth/me once and shares the result.
    */
-  async getCurrentUser() {
+  getCurrentUser() {
+    if (!this._currentUser) {
+      const bootstrapped = window.BOOTSTRAP && window.BOOTSTRAP.user;
+      this._currentUser = bootstrapped
+        ? Promise.resolve(bootstrapped)
+        : this.fetchCurrentUser();
+    }
+    return this._currentUser;
+  },
+
+  async fetchCurrentUser() {
     try {
       const response = await fetch("/auth/me", {
         credentials: "include",
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Measure bytes on the wire and CPU time per endpoint for each response encoding
+
+Seeds a temporary SQLite database with users and feedback, then requests
+each endpoint in-process (Flask test client) with no Accept-Encoding, gzip
+and, when the brotli package is installed, br. CPU time is process time per
+request, so the difference to identity is the compression cost.
+
+Usage:
+    python benchmarks/compression.py --users 2000 --repeat 20
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ENDPOINTS = [
+    '/admin/api/users?per_page={users}',
+    '/admin/api/feedback?per_page={users}',
+    '/admin/export/feedback.csv',
+    '/api/notifications?limit=100',
+    '/static/css/style.css',
+]
+
+
+def seed(users):
+    from app import db
+    from app.models import User, Feedback
+    from app.services.notification_service import send_admin_notification
+
+    admin = User(email='admin@example.com', name='Admin User', role='admin')
+    admin.set_password('AdminPass123!')
+    db.session.add(admin)
+    for i in range(users):
+        user = User(email=f'user{i}@example.com', name=f'User {i}', password_hash=admin.password_hash)
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Feedback(
+            user_id=user.id, rating=i % 5 + 1, sentiment_label='positive', sentiment_score=0.7,
+            text=f'Feedback {i}: the service was quick and the staff were friendly, would come back again.'
+        ))
+    for i in range(100):
+        send_admin_notification(f'New user registered: user{i}@example.com', event_data={'user': i})
+    db.session.commit()
+    return admin
+
+
+def measure(client, url, accept_encoding, repeat):
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+    size = 0
+    start = time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):  # views print debug output
+        for _ in range(repeat):
+            response = client.get(url, headers=headers)
+            size = len(response.get_data())
+            response.close()
+    return size, (time.process_time() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000, help='users (one feedback each) to seed')
+    parser.add_argument('--repeat', type=int, default=20, help='requests per endpoint and encoding')
+    args = parser.parse_args()
+
+    from flask_jwt_extended import create_access_token
+    from app import create_app, db
+    from app.services.compression import _brotli
+    from config import TestingConfig
+
+    database = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    database.close()
+
+    class BenchmarkConfig(TestingConfig):
+        TESTING = False
+        JWT_COOKIE_CSRF_PROTECT = False
+        RAISE_ON_LAZY_LOAD = False
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{database.name}'
+
+    app = create_app(BenchmarkConfig)
+    encodings = [None, 'gzip'] + (['br'] if _brotli() is not None else [])
+    try:
+        with app.app_context():
+            db.create_all()
+            admin = seed(args.users)
+            client = app.test_client()
+            client.set_cookie('access_token_cookie', create_access_token(identity=str(admin.id)))
+
+            print(f'{"endpoint":<40} {"encoding":>8} {"bytes":>10} {"ratio":>6} {"cpu ms":>8} {"+cpu ms":>8}')
+            for template in ENDPOINTS:
+                url = template.format(users=args.users)
+                base_size, base_cpu = None, None
+                for encoding in encodings:
+                    size, cpu = measure(client, url, encoding, args.repeat)
+                    if encoding is None:
+                        base_size, base_cpu = size, cpu
+                    print(f'{url[:40]:<40} {encoding or "identity":>8} {size:>10} '
+                          f'{size / base_size:>6.2f} {cpu:>8.2f} {cpu - base_cpu:>+8.2f}')
+    finally:
+        os.unlink(database.name)
+
+
+if __name__ == '__main__':
+    main()
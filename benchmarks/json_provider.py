@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Compare the stdlib and orjson JSON providers on the admin list endpoints
+
+Seeds a temporary SQLite database, then for each JSON_PROVIDER requests the
+admin users, feedback and notifications lists in-process (Flask test
+client). Reports the time per request and, separately, the time spent
+serializing the already-built payload (app.json.response), which is the
+part the provider changes.
+
+Usage:
+    python benchmarks/json_provider.py --users 2000 --repeat 20
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ENDPOINTS = [
+    '/admin/api/users?per_page={users}',
+    '/admin/api/feedback?per_page={users}',
+    '/admin/api/notifications?per_page=100',
+]
+
+
+def seed(users):
+    from app import db
+    from app.models import User, Feedback
+    from app.services.notification_service import send_admin_notification
+
+    admin = User(email='admin@example.com', name='Admin User', role='admin')
+    admin.set_password('AdminPass123!')
+    db.session.add(admin)
+    for i in range(users):
+        user = User(email=f'user{i}@example.com', name=f'User {i}', password_hash=admin.password_hash)
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Feedback(
+            user_id=user.id, rating=i % 5 + 1, sentiment_label='positive', sentiment_score=0.7,
+            text=f'Feedback {i}: the service was quick and the staff were friendly, would come back again.'
+        ))
+    for i in range(100):
+        send_admin_notification(f'New user registered: user{i}@example.com',
+                                event_data={'user_id': i, 'email': f'user{i}@example.com'})
+    db.session.commit()
+    return admin
+
+
+def run(provider, database, users, repeat):
+    """Milliseconds per request and per serialization for each endpoint"""
+    from flask_jwt_extended import create_access_token
+    from app import create_app, db
+    from config import TestingConfig
+
+    class BenchmarkConfig(TestingConfig):
+        TESTING = False
+        JSON_PROVIDER = provider
+        JWT_COOKIE_CSRF_PROTECT = False
+        RAISE_ON_LAZY_LOAD = False
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{database}'
+
+    app = create_app(BenchmarkConfig)
+    results = {}
+    with app.app_context():
+        if not db.inspect(db.engine).has_table('users'):  # seeded once, shared by both runs
+            db.create_all()
+            seed(users)
+        client = app.test_client()
+        client.set_cookie('access_token_cookie', create_access_token(identity='1'))
+
+        for template in ENDPOINTS:
+            url = template.format(users=users)
+            with contextlib.redirect_stdout(io.StringIO()):  # views print debug output
+                client.get(url)  # warm up
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    response = client.get(url)
+                request_ms = (time.perf_counter() - start) / repeat * 1000
+
+            payload = response.get_json()
+            with app.test_request_context():
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    app.json.response(payload)
+                serialize_ms = (time.perf_counter() - start) / repeat * 1000
+            results[url] = (request_ms, serialize_ms, len(response.data))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000, help='users (one feedback each) to seed')
+    parser.add_argument('--repeat', type=int, default=20, help='requests per endpoint and provider')
+    args = parser.parse_args()
+
+    database = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    database.close()
+    os.unlink(database.name)
+    try:
+        before = run('stdlib', database.name, args.users, args.repeat)
+        after = run('orjson', database.name, args.users, args.repeat)
+    finally:
+        if os.path.exists(database.name):
+            os.unlink(database.name)
+
+    print(f'{"endpoint":<40} {"bytes":>9} {"request ms":>21} {"serialize ms":>21}')
+    print(f'{"":<40} {"":>9} {"stdlib":>10} {"orjson":>10} {"stdlib":>10} {"orjson":>10}')
+    for url, (request_ms, serialize_ms, size) in before.items():
+        fast_request_ms, fast_serialize_ms, _ = after[url]
+        print(f'{url[:40]:<40} {size:>9} {request_ms:>10.2f} {fast_request_ms:>10.2f} '
+              f'{serialize_ms:>10.2f} {fast_serialize_ms:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
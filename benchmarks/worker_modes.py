@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Compare how many concurrent Socket.IO connections and HTTP requests one node
+sustains under each WORKER_MODE
+
+For every mode, starts gunicorn with gunicorn.conf.py, opens N Socket.IO
+connections (WebSocket by default, or long-polling) that stay connected,
+and meanwhile hammers /api/health.
+
+Usage:
+    python benchmarks/worker_modes.py --modes sync gevent --sockets 200 --duration 10
+"""
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def http(method, url, data=None, timeout=30):
+    request = urllib.request.Request(url, data=data, method=method)
+    if data is not None:
+        request.add_header('Content-Type', 'text/plain;charset=UTF-8')
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read().decode('utf-8')
+
+
+class SocketClient(threading.Thread):
+    """A Socket.IO client that stays connected until stop is set"""
+
+    def __init__(self, base_url, transport, stop):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.transport = transport
+        self.stop = stop
+        self.connected = False
+
+    def run(self):
+        try:
+            if self.transport == 'websocket':
+                self._run_websocket()
+            else:
+                self._run_polling()
+        except Exception:
+            self.connected = False
+
+    def _run_websocket(self):
+        import simple_websocket
+
+        ws_url = self.base_url.replace('http://', 'ws://', 1)
+        ws = simple_websocket.Client(f'{ws_url}/socket.io/?EIO=4&transport=websocket')
+        try:
+            ws.receive(timeout=15)  # engine.io open packet
+            ws.send('40')
+            # the connect handler may emit events before the namespace ack
+            while True:
+                message = ws.receive(timeout=15)
+                if message is None:
+                    return
+                if message.startswith('40'):
+                    break
+            self.connected = True
+            while not self.stop.is_set():
+                if ws.receive(timeout=1) == '2':
+                    ws.send('3')  # pong
+        finally:
+            ws.close()
+
+    def _run_polling(self):
+        # Long-polling needs sticky sessions, so only meaningful with one worker
+        handshake = http('GET', f'{self.base_url}/socket.io/?EIO=4&transport=polling', timeout=15)
+        sid = handshake[handshake.index('"sid":"') + 7:].split('"', 1)[0]
+        url = f'{self.base_url}/socket.io/?EIO=4&transport=polling&sid={sid}'
+        http('POST', url, data=b'40', timeout=15)
+        self.connected = True
+        while not self.stop.is_set():
+            packets = http('GET', url, timeout=40)
+            if '2' in packets.split('\x1e'):
+                http('POST', url, data=b'3', timeout=15)  # pong
+
+
+def hammer(base_url, duration, concurrency):
+    """Issue /api/health requests for duration seconds, return latencies"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def client():
+        while time.time() < deadline:
+            start = time.perf_counter()
+            try:
+                http('GET', f'{base_url}/api/health', timeout=5)
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(duration + 10)
+    return latencies, errors[0]
+
+
+def wait_until_up(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            http('GET', f'{base_url}/api/health', timeout=2)
+            return True
+        except Exception:
+            time.sleep(0.2)
+    return False
+
+
+def run_mode(mode, port, workers, sockets, transport, duration, concurrency):
+    env = dict(os.environ,
+               WORKER_MODE=mode,
+               WEB_CONCURRENCY=str(workers),
+               GUNICORN_BIND=f'127.0.0.1:{port}',
+               DATABASE_URL=os.environ.get('DATABASE_URL') or f'sqlite:///{tempfile.gettempdir()}/bench_worker_modes.db')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True)
+    base_url = f'http://127.0.0.1:{port}'
+    stop = threading.Event()
+    try:
+        if not wait_until_up(base_url):
+            print(f'{mode}: server did not start')
+            return
+
+        clients = [SocketClient(base_url, transport, stop) for _ in range(sockets)]
+        for client in clients:
+            client.start()
+        time.sleep(min(10, 2 + sockets / 100))
+        connected = sum(client.connected for client in clients)
+
+        latencies, errors = hammer(base_url, duration, concurrency)
+        latencies.sort()
+
+        print(f'{mode:>8}: {workers} workers | sockets held {connected}/{sockets} | '
+              f'{len(latencies) / duration:8,.0f} req/s | errors {errors} | '
+              f'p50 {statistics.median(latencies) * 1000 if latencies else float("nan"):7.1f} ms | '
+              f'p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else float("nan"):7.1f} ms')
+    finally:
+        stop.set()
+        os.killpg(server.pid, signal.SIGTERM)
+        try:
+            server.wait(15)
+        except subprocess.TimeoutExpired:
+            # sync workers stuck in long-polls ignore the graceful shutdown
+            os.killpg(server.pid, signal.SIGKILL)
+            server.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', default=['sync', 'gevent'], help='worker modes to compare')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers')
+    parser.add_argument('--sockets', type=int, default=200, help='Socket.IO connections to hold open')
+    parser.add_argument('--transport', choices=['websocket', 'polling'], default='websocket')
+    parser.add_argument('--duration', type=int, default=10, help='seconds of HTTP load')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent HTTP clients')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    for i, mode in enumerate(args.modes):
+        run_mode(mode, args.port + i, args.workers, args.sockets, args.transport, args.duration, args.concurrency)
@@ -0,0 +1,174 @@
+"""
+Worker concurrency modes
+
+``sync`` runs one request per worker process (threads for Socket.IO), which
+means every open Socket.IO connection pins a whole gunicorn worker.
+``gevent`` and ``eventlet`` run thousands of cooperative greenlets per worker,
+so long-lived WebSocket connections are cheap.
+
+Select the mode with the ``WORKER_MODE`` environment variable. This module
+must not import the application: cooperative modes have to patch the
+standard library before Flask, SQLAlchemy or psycopg2 are loaded.
+"""
+import os
+
+WORKER_MODES = ('sync', 'gevent', 'eventlet')
+
+# Socket.IO async_mode for each worker mode
+SOCKETIO_ASYNC_MODES = {
+    'sync': 'threading',
+    'gevent': 'gevent',
+    'eventlet': 'eventlet'
+}
+
+# Seconds gunicorn lets a sync worker stay busy before killing it (gunicorn.conf.py)
+SYNC_WORKER_TIMEOUT = 30
+
+# gunicorn worker class for each worker mode
+GUNICORN_WORKER_CLASSES = {
+    'sync': 'sync',
+    'gevent': 'gevent',
+    'eventlet': 'eventlet'
+}
+
+
+def get_worker_mode():
+    """Get the configured worker mode"""
+    mode = (os.environ.get('WORKER_MODE') or 'sync').lower()
+    if mode not in WORKER_MODES:
+        raise ValueError(f"Invalid WORKER_MODE '{mode}', expected one of {', '.join(WORKER_MODES)}")
+    return mode
+
+
+def is_cooperative(mode=None):
+    """Check if a worker mode uses green threads"""
+    return (mode or get_worker_mode()) in ('gevent', 'eventlet')
+
+
+def apply_worker_mode(mode=None):
+    """
+    Monkey-patch the standard library and psycopg2 for cooperative modes
+
+    Safe to call more than once (gunicorn's gevent/eventlet workers already
+    patch the stdlib before loading the app).
+
+    Returns:
+        str: The worker mode in use
+    """
+    mode = mode or get_worker_mode()
+
+    if mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+        _patch_psycopg(_gevent_wait_callback)
+    elif mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+        _patch_psycopg(_eventlet_wait_callback)
+
+    return mode
+
+
+def engine_options(database_uri, mode=None):
+    """
+    SQLAlchemy engine options suited to the worker mode
+
+    A cooperative worker serves up to ``worker_connections`` requests at once
+    from a single process, so it needs a bigger pool than a sync worker, and a
+    short pool timeout so greenlets queue for a connection instead of piling
+    up new ones against Postgres' max_connections.
+    """
+    if not database_uri or database_uri.startswith('sqlite'):
+        return {}
+
+    options = {
+        'pool_pre_ping': True,
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE') or 1800)
+    }
+
+    if is_cooperative(mode):
+        options.update({
+            'pool_size': int(os.environ.get('DB_POOL_SIZE') or 20),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW') or 20),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT') or 10)
+        })
+    elif os.environ.get('DB_POOL_SIZE'):
+        options['pool_size'] = int(os.environ['DB_POOL_SIZE'])
+
+    return options
+
+
+def stream_max_duration(value=None, mode=None):
+    """
+    Seconds a streaming response (SSE) may stay open in the worker mode
+
+    A cooperative worker holds a stream as one cheap greenlet (default 300s).
+    A sync worker is blocked for the whole stream and killed by gunicorn
+    after SYNC_WORKER_TIMEOUT, so streams end well before that, whatever
+    NOTIFICATION_STREAM_MAX_DURATION says.
+    """
+    if is_cooperative(mode):
+        return float(value or 300)
+    return min(float(value or 20), SYNC_WORKER_TIMEOUT - 10)
+
+
+def run_blocking(func, *args, mode=None):
+    """
+    Run CPU-bound C code (image decoding, compression) on a real OS thread
+
+    Under gevent/eventlet every greenlet of a worker shares one OS thread, so
+    a greenlet resizing an image would stall all the others; the work is
+    handed to the hub's native thread pool and the greenlet waits
+    cooperatively. In sync mode the caller already runs on its own thread.
+    """
+    mode = mode or get_worker_mode()
+    if mode == 'gevent':
+        from gevent import get_hub
+        return get_hub().threadpool.apply(func, args)
+    if mode == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(func, *args)
+    return func(*args)
+
+
+def _patch_psycopg(wait_callback):
+    """Make psycopg2 yield to the event loop while waiting on the server"""
+    try:
+        from psycopg2 import extensions
+    except ImportError:
+        return
+    extensions.set_wait_callback(wait_callback)
+
+
+def _gevent_wait_callback(conn, timeout=None):
+    """psycopg2 wait callback for gevent"""
+    from psycopg2 import extensions, OperationalError
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f"Bad result from poll: {state!r}")
+
+
+def _eventlet_wait_callback(conn, timeout=-1):
+    """psycopg2 wait callback for eventlet"""
+    from psycopg2 import extensions, OperationalError
+    from eventlet.hubs import trampoline
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            trampoline(conn.fileno(), read=True)
+        elif state == extensions.POLL_WRITE:
+            trampoline(conn.fileno(), write=True)
+        else:
+            raise OperationalError(f"Bad result from poll: {state!r}")
@@ -0,0 +1,55 @@
+"""
+Gunicorn configuration
+
+The worker class follows WORKER_MODE (see concurrency.py):
+
+    WORKER_MODE=sync      4 sync workers, one request at a time each
+    WORKER_MODE=gevent    cooperative workers, up to WORKER_CONNECTIONS sockets each
+    WORKER_MODE=eventlet  same, using eventlet
+
+With more than one worker Socket.IO needs SOCKETIO_MESSAGE_QUEUE. The page
+connects with the WebSocket transport only: long-polling would need sticky
+sessions, which no load balancer can give between the workers of one
+gunicorn (they share its listening socket).
+
+GUNICORN_PRELOAD=true (sync mode only) imports, creates and warms the app
+once in the master; workers, including the ones replacing recycled workers,
+fork from it ready to serve. Cooperative modes always load the app in each
+worker, since the worker monkey-patches the stdlib before the app may be
+imported.
+"""
+import os
+from concurrency import get_worker_mode, GUNICORN_WORKER_CLASSES, SYNC_WORKER_TIMEOUT
+
+worker_mode = get_worker_mode()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY') or 4)
+worker_class = GUNICORN_WORKER_CLASSES[worker_mode]
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS') or 1000)
+keepalive = 2
+max_requests = 1000
+max_requests_jitter = 100
+
+if worker_mode == 'sync':
+    timeout = SYNC_WORKER_TIMEOUT
+else:
+    # Long-polling and WebSocket requests legitimately stay open; the
+    # heartbeat of a cooperative worker is not blocked by them
+    timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 120)
+
+preload_app = worker_mode == 'sync' and os.environ.get('GUNICORN_PRELOAD', 'false').lower() == 'true'
+
+
+def post_fork(server, worker):
+    """Give a worker forked from the preloaded app its own database connections"""
+    if preload_app:
+        from wsgi import app
+        from app.services.startup import after_fork
+        after_fork(app)
+
+
+def post_worker_init(worker):
+    """Report how long the worker took to get ready"""
+    from app.services.startup import startup_report
+    worker.log.info(f"Worker {worker.pid} startup: {startup_report(worker.wsgi)}")
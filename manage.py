@@ -3,6 +3,7 @@
 Flask CLI management script for database operations and other commands
 """
 import os
+import click
 from flask.cli import FlaskGroup
 from app import create_app, db
 from app.models import User, Feedback, TokenBlocklist
@@ -58,6 +59,87 @@ def drop_tables():
         db.drop_all()
         print("All database tables dropped!")
 
+@cli.command("upgrade-db")
+def upgrade_db():
+    """Add missing tables, columns and indexes to an existing database"""
+    with app.app_context():
+        from app.services.schema_service import upgrade_schema
+        
+        added = upgrade_schema()
+        print(f"Added: {', '.join(added)}" if added else "Database schema is up to date!")
+
+@cli.command("repair-feedback-stats")
+def repair_feedback_stats():
+    """Recompute per-user feedback counters (adds the columns if missing)"""
+    with app.app_context():
+        from app.services.schema_service import add_missing_columns
+        
+        added = add_missing_columns(User)
+        if added:
+            print(f"Added columns: {', '.join(added)}")
+        
+        updated = User.repair_feedback_stats()
+        print(f"Feedback stats repaired for {updated} users!")
+
+@cli.command("backfill-feedback-daily-stats")
+def backfill_feedback_daily_stats():
+    """Rebuild the daily feedback rollup from history"""
+    with app.app_context():
+        from app.models import FeedbackDailyStats
+        from app.services.schema_service import add_missing_columns
+        from app.services.feedback_rollup import backfill_daily_stats
+        
+        add_missing_columns(FeedbackDailyStats)
+        print(f"Daily feedback stats rebuilt for {backfill_daily_stats()} days!")
+
+@cli.command("backfill-final-sentiment")
+def backfill_final_sentiment():
+    """Store the effective sentiment of existing feedback (adds the columns if missing)"""
+    with app.app_context():
+        from app.services.schema_service import add_missing_columns, add_missing_indexes
+        
+        added = add_missing_columns(Feedback) + add_missing_indexes(Feedback)
+        if added:
+            print(f"Added: {', '.join(added)}")
+        
+        print(f"Final sentiment stored for {Feedback.backfill_final_sentiment()} feedback entries!")
+
+@cli.command("rebuild-search-index")
+def rebuild_search_index():
+    """Create and fill the feedback and user search indexes"""
+    with app.app_context():
+        from app.services.feedback_search import rebuild_search_index as rebuild
+        from app.services.user_typeahead import create_typeahead_indexes
+        
+        indexed = rebuild()
+        if indexed is None:
+            print("Full-text search is not supported on this database; search uses ILIKE.")
+        else:
+            print(f"Search index rebuilt for {indexed} feedback entries!")
+        if create_typeahead_indexes():
+            print("Trigram indexes for the user typeahead are in place!")
+
+@cli.command("expire-exports")
+def expire_exports():
+    """Delete expired export artifacts and fail stalled export jobs"""
+    with app.app_context():
+        from app.services.export_jobs import expire_export_jobs
+        
+        print(f"Expired {expire_export_jobs()} exports!")
+
+@cli.command("gc-avatars")
+@click.option('--grace', default=3600, show_default=True,
+              help='Keep unreferenced files younger than this many seconds.')
+def gc_avatars(grace):
+    """Reconcile avatar storage with users and delete unused files"""
+    with app.app_context():
+        from app.services.avatar_service import collect_garbage
+        
+        result = collect_garbage(grace)
+        print(f"Avatars: moved {result['moved']} legacy files, deleted {result['deleted']} unused avatars "
+              f"and {result['stale_uploads']} stale uploads, fixed {result['counts_fixed']} counts, "
+              f"cleared {result['users_cleared']} users with missing files")
+
 @cli.command("seed-db")
 def seed_db():
     """Seed database with sample data"""
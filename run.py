@@ -1,7 +1,13 @@
 #!/usr/bin/env python3
 """
 Simple run script for the Flask application with SocketIO support
+
+Set WORKER_MODE=gevent or WORKER_MODE=eventlet to serve WebSockets from
+cooperative green threads instead of OS threads.
 """
+from concurrency import apply_worker_mode
+apply_worker_mode()
+
 from app import create_app, socketio
 
 app = create_app()
@@ -0,0 +1,80 @@
+"""
+Shared test fixtures
+
+``app`` is created from the class returned by ``app_config``. A test module
+with its own settings overrides ``app_config``, subclassing the shared one:
+
+    @pytest.fixture
+    def app_config(app_config):
+        class StatsTestConfig(app_config):
+            STATS_CACHE_TTL = 3600
+        return StatsTestConfig
+"""
+import pytest
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User
+from config import TestingConfig
+
+
+class AppTestConfig(TestingConfig):
+    """Testing config with JWT cookies usable from the test client"""
+    JWT_COOKIE_CSRF_PROTECT = False
+
+
+@pytest.fixture
+def app_config():
+    """Config class the app fixture is created with"""
+    return AppTestConfig
+
+
+@pytest.fixture
+def app(app_config):
+    """Create application for testing"""
+    app = create_app(app_config)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def login(app):
+    """Create a test client authenticated as a user"""
+    def login(user):
+        client = app.test_client()
+        client.set_cookie('access_token_cookie', create_access_token(identity=str(user.id)))
+        return client
+    return login
+
+
+@pytest.fixture
+def admin(app):
+    """Admin user"""
+    admin = User(email='admin@example.com', name='Admin User', role='admin')
+    admin.set_password('AdminPass123!')
+    db.session.add(admin)
+    db.session.commit()
+    return admin
+
+
+@pytest.fixture
+def client(login, admin):
+    """Test client authenticated as the admin"""
+    return login(admin)
+
+
+@pytest.fixture
+def queries(app):
+    """Record SQL statements executed during a test"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
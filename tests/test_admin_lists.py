@@ -0,0 +1,134 @@
+import contextvars
+import pytest
+from app import db
+from app.models import User, Feedback, Notification
+from app.services.admin_lists import list_view_guard, feedback_export_rows, LazyLoadError, _guarded
+
+
+def add_users_with_feedback(count, start=0):
+    """Create count users, each with one feedback and one notification"""
+    for i in range(start, start + count):
+        user = User(email=f'user{i}@example.com', name=f'User {i}')
+        user.set_password('UserPass123!')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Feedback(
+            user_id=user.id,
+            text=f'Feedback number {i} ' + 'x' * 150,
+            rating=4,
+            sentiment_label='positive',
+            sentiment_score=0.8,
+            is_corrected=i % 2 == 0,
+            admin_corrected_label='neutral' if i % 2 == 0 else None,
+            admin_corrected_score=0.5 if i % 2 == 0 else None
+        ))
+        Notification.create_notification(f'User {i} registered', 'info', user_id=user.id, event_data={'i': i})
+    db.session.commit()
+
+
+def count_queries(client, queries, url):
+    """Number of statements one request runs"""
+    queries.clear()
+    response = client.get(url)
+    assert response.status_code == 200
+    return len(queries)
+
+
+class TestAdminListQueries:
+    """Test admin list views run a fixed number of queries per page"""
+
+    @pytest.mark.parametrize('url', [
+        '/admin/api/users',
+        '/admin/api/feedback',
+        '/admin/api/feedback?search=number',
+        '/admin/api/notifications',
+        '/admin/export/feedback.csv',
+    ])
+    def test_query_count_does_not_grow_with_rows(self, app, client, queries, url):
+        """Test a page of 3 rows and a page of 15 rows cost the same queries"""
+        add_users_with_feedback(3)
+        few = count_queries(client, queries, url)
+
+        add_users_with_feedback(12, start=3)
+        many = count_queries(client, queries, url)
+
+        assert few == many
+
+    def test_feedback_list_uses_final_sentiment(self, app, client):
+        """Test corrected labels and scores override the original ones"""
+        add_users_with_feedback(2)
+
+        items = {item['user_name']: item for item in client.get('/admin/api/feedback').get_json()['feedback']}
+
+        assert (items['User 0']['sentiment'], items['User 0']['confidence']) == ('neutral', 0.5)
+        assert (items['User 1']['sentiment'], items['User 1']['confidence']) == ('positive', 0.8)
+        assert items['User 0']['user_email'] == 'user0@example.com'
+
+    def test_users_list_feedback_counts(self, app, client):
+        """Test feedback counts come from the projection"""
+        add_users_with_feedback(2)
+
+        users = {user['email']: user for user in client.get('/admin/api/users').get_json()['users']}
+
+        assert users['user0@example.com']['feedback_count'] == 1
+        assert users['admin@example.com']['feedback_count'] == 0
+
+    def test_notification_list_user_details(self, app, client):
+        """Test notifications carry the triggering user's name and email"""
+        add_users_with_feedback(1)
+        Notification.create_notification('System event', 'info')
+        db.session.commit()
+
+        notifications = client.get('/admin/api/notifications').get_json()['notifications']
+
+        assert sorted((n['user_name'], n['user_email']) for n in notifications) == [
+            ('System', 'N/A'), ('User 0', 'user0@example.com')
+        ]
+
+
+class TestLazyLoadGuard:
+    """Test lazy loads raise inside list views"""
+
+    def test_lazy_load_raises(self, app):
+        """Test touching an unloaded relationship inside the guard raises"""
+        add_users_with_feedback(1)
+        feedback_id = Feedback.query.first().id
+        db.session.expunge_all()
+
+        feedback = db.session.get(Feedback, feedback_id)
+        with pytest.raises(LazyLoadError):
+            with list_view_guard():
+                feedback.user.name
+
+    def test_guard_disabled_by_config(self, app):
+        """Test the guard is a no-op unless RAISE_ON_LAZY_LOAD is set"""
+        add_users_with_feedback(1)
+        feedback_id = Feedback.query.first().id
+        db.session.expunge_all()
+        app.config['RAISE_ON_LAZY_LOAD'] = False
+
+        feedback = db.session.get(Feedback, feedback_id)
+        with list_view_guard():
+            assert feedback.user.name == 'User 0'
+
+    def test_export_guard_not_held_across_yields(self, app):
+        """Test the export generator only guards its own batches, not the caller between rows"""
+        add_users_with_feedback(3)
+        rows = feedback_export_rows(batch_size=2)
+
+        assert next(rows)[1].startswith('user')
+        assert not _guarded.get()
+        feedback = Feedback.query.first()
+        db.session.expire(feedback, ['user'])
+        assert feedback.user.name.startswith('User')  # the caller may lazy-load
+
+        contextvars.copy_context().run(rows.close)  # closed from another context
+        assert not _guarded.get()
+
+    def test_export_rows_complete(self, app):
+        """Test every row comes out once when batches are smaller than the table"""
+        add_users_with_feedback(5)
+
+        rows = list(feedback_export_rows(batch_size=2))
+
+        assert sorted(row[0] for row in rows) == [1, 2, 3, 4, 5]
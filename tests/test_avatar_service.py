@@ -0,0 +1,269 @@
+import io
+import os
+import pytest
+from PIL import Image
+from app import db, socketio
+from app.models import User
+from app.services.avatar_service import (
+    render_variants, decode_avatar, avatar_url, upload_folder, get_storage, AvatarError
+)
+
+
+@pytest.fixture
+def app_config(app_config, tmp_path):
+    """Render avatars inline into a temporary upload folder"""
+    class AvatarTestConfig(app_config):
+        AVATAR_PROCESSING_ASYNC = False
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+
+    return AvatarTestConfig
+
+
+@pytest.fixture
+def user(app):
+    """Regular user"""
+    user = User(email='user@example.com', name='Some User')
+    user.set_password('UserPass123!')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def client(login, user):
+    """HTTP test client authenticated as the user"""
+    return login(user)
+
+
+def image_bytes(size=(800, 600), format='JPEG', color=(200, 30, 30)):
+    """Encoded test image"""
+    output = io.BytesIO()
+    Image.new('RGB', size, color).save(output, format)
+    return output.getvalue()
+
+
+def upload(client, data, filename='me.jpg'):
+    """Post a profile update with an avatar"""
+    return client.post('/profile/update', data={
+        'name': 'Some User',
+        'avatar': (io.BytesIO(data), filename)
+    }, content_type='multipart/form-data')
+
+
+def stored_files(app):
+    """Names of every stored avatar file"""
+    return sorted(name for name, modified in get_storage(app).list())
+
+
+class TestAvatarPipeline:
+    """Test off-request avatar variant rendering"""
+
+    def test_upload_renders_variants(self, app, client, user):
+        """Test an upload produces every WebP size and a JPEG fallback"""
+        response = upload(client, image_bytes())
+
+        assert response.status_code == 200
+        db.session.refresh(user)
+        assert user.avatar_pending is None
+        assert set(user.avatar_variants) == {'32', '64', '128', '256', '500', 'jpeg'}
+        assert user.avatar_filename == user.avatar_variants['jpeg']
+        for size in ('32', '128', '500'):
+            storage = get_storage(app)
+            with Image.open(os.path.join(storage.root, storage.locate(user.avatar_variants[size]))) as variant:
+                assert (variant.format, variant.size) == ('WEBP', (int(size), int(size)))
+        assert os.listdir(os.path.join(upload_folder(app), 'incoming')) == []
+
+    def test_replacing_deletes_old_variants(self, app, client, user):
+        """Test a new avatar removes every file of the previous one"""
+        upload(client, image_bytes())
+        upload(client, image_bytes(color=(10, 10, 200)), filename='me.png')
+
+        db.session.refresh(user)
+        assert stored_files(app) == sorted(user.avatar_variants.values())
+
+    def test_invalid_upload_rejected_at_once(self, app, client, user):
+        """Test non-images are rejected by their header before staging"""
+        assert upload(client, b'not an image at all').status_code == 400
+        assert upload(client, image_bytes(format='GIF'), filename='me.png').status_code == 400
+        assert upload(client, image_bytes(), filename='me.bmp').status_code == 400
+        assert not os.path.exists(os.path.join(upload_folder(app), 'incoming')) or \
+            os.listdir(os.path.join(upload_folder(app), 'incoming')) == []
+
+    def test_superseded_upload_discarded(self, app, client, user, monkeypatch):
+        """Test a render finishing after a newer upload leaves no files behind"""
+        started = []
+        monkeypatch.setitem(app.config, 'AVATAR_PROCESSING_ASYNC', True)
+        monkeypatch.setattr(socketio, 'start_background_task', lambda func, *args: started.append((func, args)))
+        upload(client, image_bytes())
+        upload(client, image_bytes(color=(0, 0, 0)))
+        app.config['AVATAR_PROCESSING_ASYNC'] = False
+
+        # Finish the newer upload first, then the stale one
+        for func, args in reversed(started):
+            func(*args)
+
+        db.session.refresh(user)
+        assert user.avatar_variants is not None
+        assert stored_files(app) == sorted(user.avatar_variants.values())
+
+    def test_ready_event(self, app, client, user):
+        """Test the user's sockets are told when the variants are ready"""
+        socket_client = socketio.test_client(app, flask_test_client=client)
+        socket_client.get_received()
+
+        upload(client, image_bytes())
+
+        [event] = [event for event in socket_client.get_received() if event['name'] == 'avatar_ready']
+        socket_client.disconnect()
+        assert set(event['args'][0]['urls']) == {'32', '64', '128', '256', '500', 'jpeg'}
+
+    def test_regular_user_told_when_ready(self, app, client, user, monkeypatch):
+        """Test a non-admin upload reaches the user's socket and /auth/me"""
+        started = []
+        monkeypatch.setitem(app.config, 'AVATAR_PROCESSING_ASYNC', True)
+        monkeypatch.setattr(socketio, 'start_background_task', lambda func, *args: started.append((func, args)))
+        socket_client = socketio.test_client(app, flask_test_client=client)
+        socket_client.get_received()
+        assert user.role == 'user'
+
+        assert upload(client, image_bytes()).get_json()['user']['avatar_processing'] is True
+        assert client.get('/auth/me').get_json()['user']['avatar_processing'] is True
+        for func, args in started:
+            func(*args)
+
+        names = [event['name'] for event in socket_client.get_received()]
+        socket_client.disconnect()
+        assert 'avatar_ready' in names
+        db.session.expire_all()  # requests share the test's session
+        assert client.get('/auth/me').get_json()['user']['avatar_processing'] is False
+
+    def test_avatar_url_picks_smallest_fitting(self, app, user):
+        """Test templates get the smallest variant that is large enough"""
+        user.avatar_variants = {'32': 'a-32.webp', '128': 'a-128.webp', '500': 'a-500.webp', 'jpeg': 'a.jpg'}
+        user.avatar_filename = 'a.jpg'
+
+        with app.test_request_context():
+            assert avatar_url(user, 100).endswith('/a-128.webp')
+            assert avatar_url(user, 1000).endswith('/a-500.webp')
+            user.avatar_variants = None
+            assert avatar_url(user).endswith('/a.jpg')
+            user.avatar_filename = None
+            assert avatar_url(user) is None
+
+    def test_small_images_not_upscaled(self, tmp_path):
+        """Test variants never exceed the source resolution"""
+        path = tmp_path / 'small.png'
+        path.write_bytes(image_bytes(size=(100, 80), format='PNG'))
+
+        variants, stats = render_variants(str(path), (64, 500))
+
+        assert stats.decoded_size == (100, 80)
+
+        with Image.open(io.BytesIO(variants['500'])) as large:
+            assert large.size == (80, 80)
+        with Image.open(io.BytesIO(variants['64'])) as small:
+            assert small.size == (64, 64)
+
+
+class TestAvatarDecoding:
+    """Test bounded-memory avatar decoding"""
+
+    def test_jpeg_decoded_at_reduced_scale(self, tmp_path):
+        """Test draft mode decodes large JPEGs near the largest variant size"""
+        path = tmp_path / 'large.jpg'
+        path.write_bytes(image_bytes(size=(4000, 3000)))
+
+        image, stats = decode_avatar(str(path), 500, 16_000_000)
+
+        assert stats.source_size == (4000, 3000)
+        assert image.size == stats.decoded_size == (1000, 750)
+        assert stats.peak_bytes == 1000 * 750 * 4
+        assert stats.seconds > 0
+
+    def test_pixel_budget_enforced_before_decoding(self, tmp_path):
+        """Test images over the pixel budget are rejected from their header"""
+        path = tmp_path / 'large.png'
+        path.write_bytes(image_bytes(size=(1000, 1000), format='PNG'))
+
+        with pytest.raises(AvatarError):
+            decode_avatar(str(path), 500, 800_000)
+        # A far larger JPEG fits once draft mode decodes it at 1/4 scale
+        path = tmp_path / 'large.jpg'
+        path.write_bytes(image_bytes(size=(4000, 3000)))
+        assert decode_avatar(str(path), 500, 800_000)[1].decoded_size == (1000, 750)
+
+    def test_oversized_upload_rejected(self, app, client, user):
+        """Test uploads that would decode past AVATAR_MAX_PIXELS are not staged"""
+        app.config['AVATAR_MAX_PIXELS'] = 100_000
+
+        response = upload(client, image_bytes(size=(800, 600), format='PNG'), filename='me.png')
+
+        assert response.status_code == 400
+        db.session.refresh(user)
+        assert user.avatar_pending is None
+
+
+class TestAvatarServing:
+    """Test cache-friendly avatar responses"""
+
+    def test_content_hashed_names(self, app, client, user):
+        """Test stored names are the hash of the avatar's content"""
+        upload(client, image_bytes())
+        db.session.refresh(user)
+        first = dict(user.avatar_variants)
+
+        upload(client, image_bytes(color=(0, 0, 0)))
+        upload(client, image_bytes())
+
+        db.session.refresh(user)
+        assert user.avatar_variants == first
+        assert first['jpeg'][:-len('.jpg')] == first['64'].split('-')[0]
+
+    def test_shared_files_kept_until_unused(self, app, client, user, login):
+        """Test files shared by identical avatars survive one user replacing theirs"""
+        other = User(email='other@example.com', name='Other User')
+        other.set_password('UserPass123!')
+        db.session.add(other)
+        db.session.commit()
+        other_client = login(other)
+        upload(client, image_bytes())
+        upload(other_client, image_bytes())
+
+        upload(client, image_bytes(color=(0, 0, 0)))
+
+        db.session.refresh(other)
+        assert set(other.avatar_variants.values()) <= set(stored_files(app))
+
+    def test_immutable_cache_headers(self, app, client, user):
+        """Test avatars are cacheable forever and revalidate with a 304"""
+        upload(client, image_bytes())
+        db.session.refresh(user)
+        url = avatar_url(user, 64)
+
+        response = client.get(url)
+
+        assert response.status_code == 200
+        assert response.mimetype == 'image/webp'
+        assert response.cache_control.immutable
+        assert response.cache_control.max_age == app.config['AVATAR_CACHE_MAX_AGE']
+        etag = response.headers['ETag']
+        revalidated = client.get(url, headers={'If-None-Match': etag})
+        assert revalidated.status_code == 304
+        assert revalidated.data == b''
+
+    def test_accel_redirect(self, app, client, user):
+        """Test nginx is asked to send the file when AVATAR_ACCEL_REDIRECT is set"""
+        app.config['AVATAR_ACCEL_REDIRECT'] = '/_avatars/'
+        upload(client, image_bytes())
+        db.session.refresh(user)
+        digest = user.avatar_filename[:-len('.jpg')]
+
+        response = client.get(f'/profile/avatar/{user.avatar_filename}')
+
+        assert response.headers['X-Accel-Redirect'] == f'/_avatars/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+        assert response.mimetype == 'image/jpeg'
+        assert response.data == b''
+
+    def test_missing_file(self, app, client):
+        """Test unknown avatars are a 404"""
+        assert client.get('/profile/avatar/missing.jpg').status_code == 404
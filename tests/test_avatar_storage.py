@@ -0,0 +1,293 @@
+import io
+import os
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from PIL import Image
+from flask_jwt_extended import create_access_token
+from app import db
+from app.models import User, AvatarBlob
+from app.services import avatar_service
+from app.services.avatar_service import get_storage, collect_garbage, upload_folder
+from app.services.avatar_storage import LocalStorage, ObjectStorage
+
+DIGEST = 'ab' * 16
+
+
+@pytest.fixture
+def app_config(app_config, tmp_path):
+    """Render avatars inline into a temporary upload folder"""
+    class StorageTestConfig(app_config):
+        AVATAR_PROCESSING_ASYNC = False
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+
+    return StorageTestConfig
+
+
+def add_user(email):
+    """Add and commit a user without an avatar"""
+    user = User(email=email, name='Some User')
+    user.set_password('UserPass123!')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def upload(app, user, color=(200, 30, 30)):
+    """Upload a solid color avatar for a user"""
+    client = app.test_client()
+    client.set_cookie('access_token_cookie', create_access_token(identity=str(user.id)))
+    image = io.BytesIO()
+    Image.new('RGB', (300, 300), color).save(image, 'JPEG')
+    client.post('/profile/update', data={
+        'name': 'Some User',
+        'avatar': (io.BytesIO(image.getvalue()), 'me.jpg')
+    }, content_type='multipart/form-data')
+    db.session.refresh(user)
+
+
+def ref_count(filename):
+    """Stored reference count of the avatar a file belongs to"""
+    blob = db.session.get(AvatarBlob, AvatarBlob.digest_of(filename))
+    return blob.ref_count if blob else None
+
+
+class FakeS3:
+    """In-memory stand-in for the subset of the boto3 S3 client the backend uses"""
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self, page_size=2):
+        self.objects = {}
+        self.page_size = page_size
+
+    def put_object(self, Bucket, Key, Body, **extra):
+        self.objects[(Bucket, Key)] = (Body, extra, datetime.now(timezone.utc))
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        body, extra, modified = self.objects[(Bucket, Key)]
+        return {'Body': io.BytesIO(body), 'ContentType': extra.get('ContentType')}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None):
+        keys = sorted(key for bucket, key in self.objects if bucket == Bucket and key.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + self.page_size]
+        result = {'Contents': [{'Key': key, 'LastModified': self.objects[(Bucket, key)][2]} for key in page]}
+        if start + self.page_size < len(keys):
+            result.update(IsTruncated=True, NextContinuationToken=str(start + self.page_size))
+        return result
+
+
+class TestStorageBackends:
+    """Test the local and object storage backends"""
+
+    def test_local_sharded_layout(self, tmp_path):
+        """Test files are sharded by digest and an avatar is deleted as a whole"""
+        storage = LocalStorage(str(tmp_path))
+        storage.put(f'{DIGEST}.jpg', b'jpeg')
+        storage.put(f'{DIGEST}-64.webp', b'webp')
+        storage.put(f'{"cd" * 16}.jpg', b'other')
+
+        assert os.path.isfile(tmp_path / 'ab' / 'ab' / f'{DIGEST}-64.webp')
+        assert sorted(name for name, modified in storage.list()) == \
+            sorted([f'{DIGEST}.jpg', f'{DIGEST}-64.webp', f'{"cd" * 16}.jpg'])
+
+        storage.delete(DIGEST)
+
+        assert [name for name, modified in storage.list()] == [f'{"cd" * 16}.jpg']
+
+    def test_local_legacy_files(self, tmp_path):
+        """Test files stored before sharding are found, deleted and can be moved"""
+        storage = LocalStorage(str(tmp_path))
+        (tmp_path / f'{DIGEST}.png').write_bytes(b'png')
+        (tmp_path / f'{"cd" * 16}.jpg').write_bytes(b'jpg')
+
+        assert storage.locate(f'{DIGEST}.png') == f'{DIGEST}.png'
+        storage.delete(DIGEST)
+        assert storage.unshard_legacy() == 1
+        assert storage.locate(f'{"cd" * 16}.jpg') == f'cd/cd/{"cd" * 16}.jpg'
+        with pytest.raises(FileNotFoundError):
+            storage.locate(f'{DIGEST}.png')
+
+    def test_object_storage(self, app):
+        """Test the object backend against an in-memory S3 stand-in"""
+        client = FakeS3()
+        storage = ObjectStorage(client, 'bucket', 'avatars/')
+        for name in (f'{DIGEST}.jpg', f'{DIGEST}-32.webp', f'{DIGEST}-64.webp', f'{"cd" * 16}.jpg'):
+            storage.put(name, name.encode())
+
+        assert ('bucket', f'avatars/ab/ab/{DIGEST}.jpg') in client.objects
+        assert len(list(storage.list())) == 4  # Two pages
+        with app.test_request_context():
+            response = storage.serve(f'{DIGEST}-32.webp')
+            assert (response.mimetype, response.data) == ('image/webp', f'{DIGEST}-32.webp'.encode())
+            with pytest.raises(FileNotFoundError):
+                storage.serve(f'{"ef" * 16}.jpg')
+
+        storage.delete(DIGEST)
+
+        assert [name for name, modified in storage.list()] == [f'{"cd" * 16}.jpg']
+        assert ObjectStorage(client, 'bucket', public_url='https://cdn.example.com/').url(f'{DIGEST}.jpg') == \
+            f'https://cdn.example.com/avatars/ab/ab/{DIGEST}.jpg'
+
+    def test_pipeline_on_object_storage(self, app):
+        """Test uploads are stored in and served from the object backend"""
+        app.extensions['avatar_storage'] = ObjectStorage(FakeS3(), 'bucket')
+        user = add_user('user@example.com')
+
+        upload(app, user)
+
+        assert len(list(get_storage(app).list())) == 6
+        response = app.test_client().get(f'/profile/avatar/{user.avatar_variants["64"]}')
+        assert (response.status_code, response.mimetype) == (200, 'image/webp')
+
+
+class TestDeduplication:
+    """Test identical avatars share files and reference counts"""
+
+    def test_shared_until_last_reference(self, app):
+        """Test files of an avatar are kept until no user uses it"""
+        first, second = add_user('first@example.com'), add_user('second@example.com')
+        upload(app, first)
+        upload(app, second)
+        shared = first.avatar_filename
+
+        assert second.avatar_filename == shared
+        assert ref_count(shared) == 2
+        assert len(list(get_storage(app).list())) == 6
+
+        upload(app, first, color=(0, 0, 0))
+        assert ref_count(shared) == 1
+        assert get_storage(app).locate(shared)
+
+        upload(app, second, color=(0, 0, 0))
+        assert ref_count(shared) is None
+        assert ref_count(second.avatar_filename) == 2
+        assert len(list(get_storage(app).list())) == 6
+
+    def test_deleting_user_drops_reference(self, app):
+        """Test deleting a user releases their avatar's reference"""
+        user = add_user('user@example.com')
+        upload(app, user)
+        filename = user.avatar_filename
+
+        db.session.delete(user)
+        db.session.commit()
+
+        assert ref_count(filename) == 0
+
+
+class TestGarbageCollection:
+    """Test reconciling storage with users.avatar_filename"""
+
+    def test_collect_garbage(self, app):
+        """Test orphans, stale uploads, missing files and wrong counts are fixed"""
+        storage = get_storage(app)
+        kept, broken = add_user('kept@example.com'), add_user('broken@example.com')
+        upload(app, kept)
+        upload(app, broken, color=(0, 0, 0))
+        storage.delete(AvatarBlob.digest_of(broken.avatar_filename))
+        # Files whose database update never happened, one old and one recent
+        storage.put(f'{DIGEST}.jpg', b'old orphan')
+        storage.put(f'{"cd" * 16}.jpg', b'recent orphan')
+        old = time.time() - 7200
+        os.utime(os.path.join(storage.root, storage.locate(f'{DIGEST}.jpg')), (old, old))
+        os.makedirs(os.path.join(upload_folder(app), 'incoming'), exist_ok=True)
+        stale_upload = os.path.join(upload_folder(app), 'incoming', 'token')
+        open(stale_upload, 'wb').close()
+        os.utime(stale_upload, (old, old))
+        # A legacy flat file and a drifted count
+        legacy = add_user('legacy@example.com')
+        legacy.avatar_filename = f'{"ef" * 16}.png'
+        db.session.commit()
+        with open(os.path.join(storage.root, legacy.avatar_filename), 'wb') as legacy_file:
+            legacy_file.write(b'png')
+        db.session.get(AvatarBlob, AvatarBlob.digest_of(kept.avatar_filename)).ref_count = 5
+        # Both uploads settled before the grace period: no upload may still hold them
+        AvatarBlob.query.update({'created_at': datetime.utcnow() - timedelta(hours=2)})
+        db.session.commit()
+        for name in kept.avatar_variants.values():
+            os.utime(os.path.join(storage.root, storage.locate(name)), (old, old))
+
+        result = collect_garbage()
+
+        assert result == {'moved': 1, 'deleted': 1, 'stale_uploads': 1, 'counts_fixed': 2, 'users_cleared': 1}
+        db.session.refresh(broken)
+        assert (broken.avatar_filename, broken.avatar_variants) == (None, None)
+        assert ref_count(kept.avatar_filename) == 1
+        assert ref_count(legacy.avatar_filename) == 1
+        names = {name for name, modified in storage.list()}
+        assert f'{DIGEST}.jpg' not in names
+        assert {f'{"cd" * 16}.jpg', legacy.avatar_filename} <= names
+        assert not os.path.exists(stale_upload)
+
+    def test_command(self, app):
+        """Test the gc-avatars CLI command"""
+        result = app.test_cli_runner().invoke(args=['gc-avatars', '--grace', '0'])
+
+        assert result.exit_code == 0
+        assert 'deleted 0 unused avatars' in result.output
+
+
+class TestConcurrentUploads:
+    """Test an upload's files survive releases and collection racing it"""
+
+    def race(self, monkeypatch, between):
+        """Run between() after an upload stored its files, before it switched the user"""
+        original = avatar_service._store_variants
+
+        def store_then_race(*args):
+            filenames = original(*args)
+            between()
+            return filenames
+
+        monkeypatch.setattr(avatar_service, '_store_variants', store_then_race)
+
+    def assert_stored(self, user):
+        """Every file of the user's avatar exists"""
+        db.session.refresh(user)
+        for name in user.avatar_variants.values():
+            assert get_storage().locate(name)
+
+    def test_release_during_identical_upload(self, app, monkeypatch):
+        """Test releasing the last user's reference keeps files an upload is about to use"""
+        first, second = add_user('first@example.com'), add_user('second@example.com')
+        upload(app, first)
+        shared = first.avatar_filename
+
+        def first_replaces_avatar():
+            db.session.get(User, first.id).avatar_filename = None
+            db.session.commit()
+            avatar_service.release_avatar(app, AvatarBlob.digest_of(shared))
+
+        self.race(monkeypatch, first_replaces_avatar)
+        upload(app, second)
+
+        assert second.avatar_filename == shared
+        assert ref_count(shared) == 1
+        self.assert_stored(second)
+
+    def test_garbage_collection_during_identical_upload(self, app, monkeypatch):
+        """Test old unreferenced files reused by an upload in progress are not collected"""
+        first, second = add_user('first@example.com'), add_user('second@example.com')
+        upload(app, first)
+        # Left behind long ago without a reference
+        db.session.execute(User.__table__.update().values(avatar_filename=None, avatar_variants=None))
+        AvatarBlob.query.delete()
+        db.session.commit()
+        old = time.time() - 7200
+        for name, modified in get_storage().list():
+            os.utime(os.path.join(get_storage().root, get_storage().locate(name)), (old, old))
+
+        self.race(monkeypatch, collect_garbage)
+        upload(app, second)
+
+        assert ref_count(second.avatar_filename) == 1
+        self.assert_stored(second)
@@ -0,0 +1,102 @@
+import json
+import re
+import pytest
+from app import db
+from app.models import User, Notification
+from app.services.notification_cache import get_notification_cache
+from app.services.notification_service import (
+    send_admin_notification, mark_notification_read, cached_unread_count, get_read_state
+)
+
+
+@pytest.fixture
+def app_config(app_config):
+    """Small notification buffers that never re-check the database on their own"""
+    class BootstrapTestConfig(app_config):
+        NOTIFICATION_CACHE_SIZE = 5
+        NOTIFICATION_CACHE_SYNC_INTERVAL = 3600
+
+    return BootstrapTestConfig
+
+
+def add_user(email, role='user'):
+    """Add and commit a user"""
+    user = User(email=email, name='Some User', role=role)
+    user.set_password('UserPass123!')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def bootstrap_of(response):
+    """Parse the bootstrap payload embedded in a rendered page"""
+    match = re.search(rb'<script id="bootstrap-data" type="application/json">(.*?)</script>',
+                      response.data, re.S)
+    return json.loads(match.group(1))
+
+
+class TestBootstrapPayload:
+    """Test the initial data rendered into pages"""
+
+    def test_guest(self, app):
+        """Test pages rendered for guests carry no user"""
+        payload = bootstrap_of(app.test_client().get('/'))
+
+        assert payload == {'user': None, 'page': {}}
+
+    def test_user_matches_me(self, app, login):
+        """Test the embedded user is what /auth/me returns"""
+        user = add_user('user@example.com')
+        client = login(user)
+
+        payload = bootstrap_of(client.get('/'))
+
+        assert payload['user'] == client.get('/auth/me').get_json()['user']
+        assert 'notifications' not in payload
+
+    def test_admin_dashboard(self, app, login):
+        """Test the dashboard embeds its lists and the admin's unread count"""
+        admin = add_user('admin@example.com', role='admin')
+        add_user('user@example.com')
+        for i in range(3):
+            send_admin_notification(f'Event {i}')
+
+        payload = bootstrap_of(login(admin).get('/admin/dashboard'))
+
+        assert payload['notifications'] == {'unread_count': 3}
+        assert [user['email'] for user in payload['page']['recent_users']] == \
+            ['user@example.com', 'admin@example.com']
+        assert payload['page']['notifications']['unread_count'] == 3
+        assert len(payload['page']['notifications']['notifications']) == 3
+
+    def test_notifications_page(self, app, login):
+        """Test the notifications page embeds its first page and stats"""
+        admin = add_user('admin@example.com', role='admin')
+        send_admin_notification('Event')
+
+        page = bootstrap_of(login(admin).get('/admin/notifications'))['page']
+
+        assert page['notification_stats']['total_notifications'] == 1
+        assert page['notifications']['total'] == 1
+
+
+class TestCachedUnreadCount:
+    """Test unread counts served from the notification ring buffer"""
+
+    def test_matches_database(self, app):
+        """Test the buffered count agrees with the database count"""
+        admin = add_user('admin@example.com', role='admin')
+        ids = [send_admin_notification(f'Event {i}').id for i in range(4)]
+        mark_notification_read(ids[1], admin)
+
+        assert cached_unread_count(admin) == Notification.get_unread_count_for_user(admin) == 3
+
+    def test_full_buffer_falls_back(self, app):
+        """Test a buffer that may have dropped unread notifications is not trusted"""
+        admin = add_user('admin@example.com', role='admin')
+        for i in range(7):
+            send_admin_notification(f'Event {i}')
+        cache = get_notification_cache()
+
+        assert cache.unread_count('admin', get_read_state(admin.id)) is None
+        assert cached_unread_count(admin) == 7
@@ -0,0 +1,136 @@
+import gzip
+import os
+import pytest
+from app import db
+from app.models import User, Feedback, ExportJob
+from app.services import compression
+
+
+@pytest.fixture
+def app_config(app_config, tmp_path):
+    """Tiny cursor batches and inline export jobs"""
+    class CompressionTestConfig(app_config):
+        EXPORT_BATCH_SIZE = 2
+        EXPORT_JOBS_ASYNC = False
+        EXPORT_DIR = str(tmp_path / 'exports')
+
+    return CompressionTestConfig
+
+
+@pytest.fixture
+def client(client, admin):
+    """Test client authenticated as an admin, with fifty users who left feedback"""
+    for i in range(50):
+        user = User(email=f'user{i}@example.com', name=f'User {i}', password_hash=admin.password_hash)
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Feedback(user_id=user.id, text=f'Feedback number {i}, fairly positive overall',
+                                rating=i % 5 + 1, sentiment_label='positive', sentiment_score=0.8))
+    db.session.commit()
+    return client
+
+
+GZIP = {'Accept-Encoding': 'gzip, deflate'}
+
+
+class TestResponseCompression:
+    """Test gzip/Brotli negotiation of text responses"""
+
+    def test_large_json_compressed(self, client):
+        """Test a large admin list is gzipped when the client accepts it"""
+        plain = client.get('/admin/api/users?per_page=100')
+        compressed = client.get('/admin/api/users?per_page=100', headers=GZIP)
+
+        assert 'Content-Encoding' not in plain.headers
+        assert 'Accept-Encoding' in plain.vary
+        assert compressed.headers['Content-Encoding'] == 'gzip'
+        assert int(compressed.headers['Content-Length']) < len(plain.data) / 3
+        assert gzip.decompress(compressed.data) == plain.data
+
+    def test_small_response_left_alone(self, client):
+        """Test bodies below COMPRESS_MIN_SIZE are not compressed"""
+        response = client.get('/auth/me', headers=GZIP)
+
+        assert len(response.data) < 1024
+        assert 'Content-Encoding' not in response.headers
+
+    def test_identity_only(self, client):
+        """Test nothing is compressed for clients refusing every encoding"""
+        response = client.get('/admin/api/users?per_page=100', headers={'Accept-Encoding': 'gzip;q=0'})
+
+        assert 'Content-Encoding' not in response.headers
+
+    def test_streamed_export(self, client):
+        """Test the streamed CSV export is compressed chunk by chunk"""
+        plain = client.get('/admin/export/feedback.csv')
+        compressed = client.get('/admin/export/feedback.csv', headers=GZIP)
+
+        assert compressed.is_streamed
+        assert compressed.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in compressed.headers
+        assert gzip.decompress(compressed.data) == plain.data
+
+    def test_pre_gzipped_export_untouched(self, client):
+        """Test the ?gzip=1 export is not compressed twice"""
+        response = client.get('/admin/export/feedback.csv?gzip=1', headers=GZIP)
+
+        assert 'Content-Encoding' not in response.headers
+        assert gzip.decompress(response.data).startswith(b'ID,')
+
+    def test_export_download_passes_through(self, client):
+        """Test export artifacts are sent zero-copy, not read and compressed"""
+        job = client.post('/admin/exports', json={'dataset': 'feedback', 'format': 'csv'}).get_json()['job']
+
+        path = db.session.get(ExportJob, job['id']).file_path
+
+        response = client.get(f"/admin/exports/{job['id']}/download", headers=GZIP)
+
+        assert 'Content-Encoding' not in response.headers
+        assert int(response.headers['Content-Length']) == os.path.getsize(path)
+        with open(path, 'rb') as artifact:
+            assert response.get_data() == artifact.read()
+        response.close()
+
+    def test_large_body_left_alone(self, app, client):
+        """Test bodies above COMPRESS_MAX_SIZE are not compressed"""
+        app.config['COMPRESS_MAX_SIZE'] = 2048
+
+        response = client.get('/admin/api/users?per_page=100', headers=GZIP)
+
+        assert 'Content-Encoding' not in response.headers
+
+    def test_cached_variant_reused(self, client, monkeypatch):
+        """Test responses with an ETag are compressed once per version"""
+        calls = []
+        original = compression.compress
+        monkeypatch.setattr(compression, 'compress', lambda *args: calls.append(1) or original(*args))
+
+        first = client.get('/static/css/style.css', headers=GZIP)
+        second = client.get('/static/css/style.css', headers=GZIP)
+
+        assert first.headers['Content-Encoding'] == 'gzip'
+        assert first.headers['ETag'].startswith('W/')
+        assert second.data == first.data
+        assert len(calls) == 1
+        assert client.get('/static/css/style.css', headers={
+            **GZIP, 'If-None-Match': first.headers['ETag']
+        }).status_code == 304
+
+    def test_cache_skips_large_entries(self):
+        """Test one body cannot take over the compressed cache"""
+        cache = compression.CompressedCache(1600)
+
+        cache.set('small', b'x' * 100)
+        cache.set('large', b'x' * 101)
+
+        assert cache.get('small') and cache.get('large') is None
+
+    def test_brotli_preferred(self, client):
+        """Test Brotli is chosen over gzip when available"""
+        brotli = pytest.importorskip('brotli')
+        plain = client.get('/admin/api/users?per_page=100')
+
+        response = client.get('/admin/api/users?per_page=100', headers={'Accept-Encoding': 'gzip, br'})
+
+        assert response.headers['Content-Encoding'] == 'br'
+        assert brotli.decompress(response.data) == plain.data
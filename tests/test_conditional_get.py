@@ -0,0 +1,128 @@
+from sqlalchemy import text
+from app import db
+from app.models import User, Feedback
+from app.services.notification_service import send_admin_notification, mark_notification_read
+
+
+def add_user(email, role='user'):
+    """Add and commit a user"""
+    user = User(email=email, name='Some User', role=role)
+    user.set_password('UserPass123!')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def revalidate(client, url, response):
+    """Repeat a GET with the validators of an earlier response"""
+    return client.get(url, headers={'If-None-Match': response.headers['ETag']})
+
+
+class TestConditionalGet:
+    """Test 304 responses of the polled JSON endpoints"""
+
+    def test_current_user(self, app, login):
+        """Test /auth/me revalidates until the user changes"""
+        user = add_user('user@example.com')
+        client = login(user)
+        first = client.get('/auth/me')
+
+        assert first.status_code == 200
+        assert first.headers['ETag'].startswith('W/')
+        assert first.cache_control.private and first.cache_control.no_cache
+        unchanged = revalidate(client, '/auth/me', first)
+        assert (unchanged.status_code, unchanged.data) == (304, b'')
+        assert unchanged.headers['ETag'] == first.headers['ETag']
+        assert client.get('/auth/me', headers={
+            'If-Modified-Since': first.headers['Last-Modified']
+        }).status_code == 304
+
+        user.name = 'Renamed User'
+        db.session.commit()
+
+        changed = revalidate(client, '/auth/me', first)
+        assert changed.status_code == 200
+        assert changed.get_json()['user']['name'] == 'Renamed User'
+
+    def test_notification_count(self, app, login):
+        """Test the unread count changes version with new notifications and reads"""
+        admin = add_user('admin@example.com', role='admin')
+        client = login(admin)
+        notification = send_admin_notification('First')
+        first = client.get('/api/notifications/count')
+
+        assert revalidate(client, '/api/notifications/count', first).status_code == 304
+
+        send_admin_notification('Second')
+        second = revalidate(client, '/api/notifications/count', first)
+        assert (second.status_code, second.get_json()['unread_count']) == (200, 2)
+
+        mark_notification_read(notification.id, admin)
+        third = revalidate(client, '/api/notifications/count', second)
+        assert (third.status_code, third.get_json()['unread_count']) == (200, 1)
+
+    def test_notification_list(self, app, login):
+        """Test the recent list revalidates until a notification arrives"""
+        admin = add_user('admin@example.com', role='admin')
+        client = login(admin)
+        send_admin_notification('First')
+        first = client.get('/api/notifications?limit=10')
+
+        assert revalidate(client, '/api/notifications?limit=10', first).status_code == 304
+        assert revalidate(client, '/api/notifications?limit=5', first).status_code == 200
+
+        send_admin_notification('Second')
+        changed = revalidate(client, '/api/notifications?limit=10', first)
+        assert (changed.status_code, changed.get_json()['total']) == (200, 2)
+
+    def test_feedback_stats(self, app, login):
+        """Test feedback statistics change version with new feedback and corrections"""
+        user = add_user('user@example.com')
+        client = login(user)
+        feedback = Feedback(user_id=user.id, text='Great service overall', rating=5,
+                            sentiment_label='positive', sentiment_score=0.9)
+        db.session.add(feedback)
+        db.session.commit()
+        first = client.get('/api/feedback/stats')
+
+        assert revalidate(client, '/api/feedback/stats', first).status_code == 304
+
+        feedback.admin_corrected_label = 'neutral'
+        feedback.is_corrected = True
+        db.session.commit()
+
+        changed = revalidate(client, '/api/feedback/stats', first)
+        assert changed.status_code == 200
+        assert changed.get_json()['sentiment_distribution'] == {'neutral': 1}
+
+    def test_not_modified_skips_full_query(self, app, queries, login):
+        """Test a 304 for the notification stats runs only the version query"""
+        admin = add_user('admin@example.com', role='admin')
+        client = login(admin)
+        send_admin_notification('First', type='info')
+        first = client.get('/admin/api/notifications/stats')
+
+        queries.clear()
+        assert revalidate(client, '/admin/api/notifications/stats', first).status_code == 304
+        assert not any('GROUP BY' in statement for statement in queries)
+
+        send_admin_notification('Second', type='warning')
+        changed = revalidate(client, '/admin/api/notifications/stats', first)
+        assert changed.get_json()['event_distribution'] == {'info': 1, 'warning': 1}
+
+    def test_stats_version_uses_indexes(self, app, queries, login):
+        """Test the notification stats stamp is answered from indexes, not a table scan"""
+        admin = add_user('admin@example.com', role='admin')
+        client = login(admin)
+        send_admin_notification('First', type='info')
+        first = client.get('/admin/api/notifications/stats')
+
+        queries.clear()
+        revalidate(client, '/admin/api/notifications/stats', first)
+        [stamp] = [statement for statement in queries if 'max(notifications.id)' in statement]
+        plan = ' '.join(row[-1] for row in db.session.execute(
+            text('EXPLAIN QUERY PLAN ' + stamp.replace('?', "'2000-01-01'"))
+        ))
+
+        assert 'SCAN notifications' not in plan
+        assert 'ix_notifications_timestamp (timestamp>?)' in plan
@@ -0,0 +1,167 @@
+import csv
+import io
+import json
+import os
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models import Feedback, ExportJob
+from app.services.export_jobs import expire_export_jobs, PARQUET_SCHEMAS, _dataset
+
+
+@pytest.fixture
+def app_config(app_config, tmp_path):
+    """Run export jobs inline, in tiny batches"""
+    class ExportJobTestConfig(app_config):
+        EXPORT_JOBS_ASYNC = False
+        EXPORT_BATCH_SIZE = 2
+        EXPORT_DIR = str(tmp_path / 'exports')
+
+    return ExportJobTestConfig
+
+
+def add_feedback(user, count, updated_at=None):
+    """Add count feedback rows for user"""
+    for i in range(count):
+        db.session.add(Feedback(
+            user_id=user.id,
+            text=f'Feedback text number {i}',
+            rating=3,
+            sentiment_label='neutral',
+            sentiment_score=0.5,
+            updated_at=updated_at or datetime.utcnow()
+        ))
+    db.session.commit()
+
+
+def start(client, **data):
+    """Start an export and return the job JSON"""
+    response = client.post('/admin/exports', json=data)
+    assert response.status_code == 202, response.get_json()
+    return response.get_json()['job']
+
+
+class TestExportJobs:
+    """Test background export jobs"""
+
+    def test_csv_export_job(self, app, client, admin):
+        """Test a job writes every row in batches and can be downloaded"""
+        add_feedback(admin, 5)
+
+        job = start(client, dataset='feedback', format='csv')
+
+        assert job['status'] == 'completed'
+        assert (job['rows_total'], job['rows_written'], job['progress']) == (5, 5, 1.0)
+
+        response = client.get(f"/admin/exports/{job['id']}/download")
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        assert 'filename=feedback_export_' in response.headers['Content-Disposition']
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        response.close()
+        assert rows[0][:3] == ['id', 'user_email', 'user_name']
+        assert [row[0] for row in rows[1:]] == ['1', '2', '3', '4', '5']
+
+    def test_ndjson_export_job(self, app, client, admin):
+        """Test users export as one JSON object per line without secrets"""
+        job = start(client, dataset='users', format='ndjson')
+
+        response = client.get(f"/admin/exports/{job['id']}/download")
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        response.close()
+
+        assert [record['email'] for record in records] == ['admin@example.com']
+        assert 'password_hash' not in records[0]
+
+    def test_parquet_export_job(self, app, client, admin):
+        """Test a column that is NULL in the first batch keeps its declared type"""
+        parquet = pytest.importorskip('pyarrow.parquet')
+        add_feedback(admin, 3)
+        Feedback.query.filter_by(id=3).update({'admin_corrected_label': 'positive', 'admin_corrected_score': 0.9})
+        db.session.commit()
+
+        job = start(client, dataset='feedback', format='parquet')
+
+        assert job['status'] == 'completed', job['error']
+        table = parquet.read_table(ExportJob.query.get(job['id']).file_path)
+        assert table.num_rows == 3
+        assert str(table.schema.field('admin_corrected_score').type) == 'double'
+        assert str(table.schema.field('created_at').type) == 'timestamp[us]'
+        assert table.column('admin_corrected_label').to_pylist() == [None, None, 'positive']
+
+    def test_parquet_schemas_match_datasets(self):
+        """Test every dataset declares a Parquet type for each of its columns"""
+        for dataset in ExportJob.DATASETS:
+            stmt = _dataset(dataset)[0]
+            assert [name for name, _ in PARQUET_SCHEMAS[dataset]] == list(stmt.selected_columns.keys())
+
+    def test_incremental_export(self, app, client, admin):
+        """Test incremental exports only include rows changed since the last export"""
+        add_feedback(admin, 3, updated_at=datetime.utcnow() - timedelta(hours=1))
+        first = start(client, dataset='feedback')
+
+        add_feedback(admin, 2)
+        second = start(client, dataset='feedback', incremental=True)
+
+        assert first['rows_written'] == 3
+        assert second['incremental'] is True
+        assert second['rows_written'] == 2
+
+    def test_status_endpoint(self, app, client):
+        """Test progress can be polled"""
+        job = start(client, dataset='notifications')
+
+        response = client.get(f"/admin/exports/{job['id']}")
+
+        assert response.get_json()['job']['status'] == 'completed'
+        assert client.get('/admin/exports').get_json()['jobs'][0]['id'] == job['id']
+
+    def test_invalid_requests(self, app, client):
+        """Test unknown datasets and formats are rejected"""
+        assert client.post('/admin/exports', json={'dataset': 'passwords'}).status_code == 400
+        assert client.post('/admin/exports', json={'format': 'xlsx'}).status_code == 400
+
+    def test_artifacts_expire(self, app, client, admin):
+        """Test expired artifacts are deleted and no longer downloadable"""
+        job = start(client, dataset='feedback')
+        path = db.session.get(ExportJob, job['id']).file_path
+        assert os.path.exists(path)
+
+        assert expire_export_jobs(now=datetime.utcnow() + timedelta(days=2)) == 1
+
+        assert not os.path.exists(path)
+        assert client.get(f"/admin/exports/{job['id']}/download").status_code == 410
+
+    def test_stale_jobs_fail(self, app, client, admin):
+        """Test jobs abandoned by a dead worker are failed instead of polled forever"""
+        now = datetime.utcnow()
+        running = ExportJob(user_id=admin.id, dataset='feedback', format='csv', status='running',
+                            started_at=now - timedelta(hours=1))
+        pending = ExportJob(user_id=admin.id, dataset='users', format='csv', status='pending')
+        recent = ExportJob(user_id=admin.id, dataset='users', format='csv', status='running')
+        db.session.add_all([running, pending, recent])
+        db.session.commit()
+        ExportJob.query.filter(ExportJob.id.in_([running.id, pending.id]))\
+            .update({'updated_at': now - timedelta(minutes=30)})
+        db.session.commit()
+        export_dir = app.config['EXPORT_DIR']
+        os.makedirs(export_dir, exist_ok=True)
+        partial_path = os.path.join(export_dir, f'{running.id}-abc.csv.part')
+        open(partial_path, 'w').close()
+
+        job = client.get(f'/admin/exports/{running.id}').get_json()['job']
+
+        assert job['status'] == 'failed'
+        assert 'progress' in job['error']
+        assert not os.path.exists(partial_path)
+        assert db.session.get(ExportJob, pending.id).status == 'failed'
+        assert db.session.get(ExportJob, recent.id).status == 'running'
+
+    def test_finished_jobs_not_stale(self, app, client, admin):
+        """Test completed jobs keep their artifact however old their heartbeat"""
+        add_feedback(admin, 3)
+
+        job = start(client, dataset='feedback')
+
+        assert job['updated_at'] >= job['created_at']
+        assert expire_export_jobs(now=datetime.utcnow() + timedelta(minutes=30)) == 0
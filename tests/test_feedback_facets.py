@@ -0,0 +1,109 @@
+import pytest
+from datetime import datetime, date
+from werkzeug.datastructures import MultiDict
+from app import db
+from app.models import Feedback
+from app.services import feedback_search
+from app.services.admin_lists import feedback_page, FeedbackFilters
+
+
+def add_feedback(user, rating, label, day=10, corrected_label=None, text='Feedback text here'):
+    """Add and commit one feedback row, optionally corrected"""
+    feedback = Feedback(user_id=user.id, text=text, rating=rating, sentiment_label=label,
+                        sentiment_score=0.5, created_at=datetime(2024, 3, day, 12, 0))
+    if corrected_label:
+        feedback.admin_corrected_label = corrected_label
+        feedback.is_corrected = True
+    db.session.add(feedback)
+    db.session.commit()
+    return feedback
+
+
+@pytest.fixture
+def sample(admin):
+    """Five feedback rows across sentiments, ratings, days and corrections"""
+    add_feedback(admin, 5, 'positive', day=1)
+    add_feedback(admin, 4, 'positive', day=10)
+    add_feedback(admin, 4, 'neutral', day=10, corrected_label='negative')
+    add_feedback(admin, 2, 'negative', day=20)
+    add_feedback(admin, 1, 'negative', day=20, text='Checkout keeps failing')
+
+
+class TestFeedbackFacets:
+    """Test faceted filtering of the admin feedback list"""
+
+    def test_unfiltered_counts(self, app, sample):
+        """Test every facet counts all rows without filters"""
+        result = feedback_page(1, 10)
+
+        assert result.total == 5
+        assert result.facets == {
+            'sentiment': {'positive': 2, 'neutral': 0, 'negative': 3},
+            'rating': {'1': 1, '2': 1, '3': 0, '4': 2, '5': 1},
+            'corrected': {'corrected': 1, 'uncorrected': 4}
+        }
+
+    def test_facet_ignores_own_filter(self, app, sample):
+        """Test a facet's counts apply the other filters but not its own"""
+        result = feedback_page(1, 10, FeedbackFilters(sentiments={'negative'}, ratings={4, 5}))
+
+        assert [item['rating'] for item in result.items] == [4]
+        assert result.total == 1
+        assert result.facets['sentiment'] == {'positive': 2, 'neutral': 0, 'negative': 1}
+        assert result.facets['rating'] == {'1': 1, '2': 1, '3': 0, '4': 1, '5': 0}
+        assert result.facets['corrected'] == {'corrected': 1, 'uncorrected': 0}
+
+    def test_date_range_and_corrected(self, app, sample):
+        """Test the date range narrows every facet and corrected filters rows"""
+        filters = FeedbackFilters(date_from=date(2024, 3, 10), date_to=date(2024, 3, 20),
+                                  corrected={'uncorrected'})
+
+        result = feedback_page(1, 10, filters)
+
+        assert result.total == 3
+        assert result.facets['corrected'] == {'corrected': 1, 'uncorrected': 3}
+        assert result.facets['sentiment'] == {'positive': 1, 'neutral': 0, 'negative': 2}
+
+    def test_two_queries(self, app, sample, queries):
+        """Test a page with facets is one grouped query plus the page query"""
+        feedback_page(1, 2, FeedbackFilters(sentiments={'positive'}, ratings={4}))
+
+        assert len(queries) == 2
+        assert 'GROUP BY' in queries[0]
+
+    def test_search_narrows_facets(self, app, sample, monkeypatch):
+        """Test facets follow the search, with and without the full-text index"""
+        assert feedback_page(1, 10, FeedbackFilters(search='checkout')).facets['rating']['1'] == 1
+
+        monkeypatch.setattr(feedback_search, 'search_backend', lambda connection=None: '')
+        result = feedback_page(1, 10, FeedbackFilters(search='checkout'))
+
+        assert result.total == 1
+        assert result.facets['sentiment'] == {'positive': 0, 'neutral': 0, 'negative': 1}
+
+    def test_from_args(self, app):
+        """Test query string parsing and validation"""
+        filters = FeedbackFilters.from_args(MultiDict({
+            'sentiment': 'positive,negative', 'rating': '4, 5', 'corrected': 'corrected',
+            'date_from': '2024-03-01', 'search': ' slow '
+        }))
+
+        assert filters.sentiments == {'positive', 'negative'}
+        assert filters.ratings == {4, 5}
+        assert filters.corrected == {'corrected'}
+        assert (filters.date_from, filters.date_to, filters.search) == (date(2024, 3, 1), None, 'slow')
+
+        for args in ({'sentiment': 'angry'}, {'rating': '6'}, {'rating': 'x'}, {'date_to': '03/01/2024'},
+                     {'date_from': '2024-03-02', 'date_to': '2024-03-01'}):
+            with pytest.raises(ValueError):
+                FeedbackFilters.from_args(MultiDict(args))
+
+    def test_api(self, app, admin, sample, login):
+        """Test the admin feedback API returns facets and rejects bad filters"""
+        client = login(admin)
+
+        data = client.get('/admin/api/feedback?rating=4&corrected=corrected').get_json()
+
+        assert data['total'] == 1
+        assert data['facets']['rating']['4'] == 1
+        assert client.get('/admin/api/feedback?rating=9').status_code == 400
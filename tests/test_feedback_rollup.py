@@ -0,0 +1,98 @@
+from datetime import datetime, date, timedelta
+from app import db
+from app.models import Feedback, FeedbackDailyStats
+from app.services.feedback_rollup import backfill_daily_stats, daily_series
+
+
+DAY = datetime(2024, 3, 10, 12, 0)
+
+
+def add_feedback(user, rating, label, created_at=DAY):
+    """Add and commit one feedback row"""
+    feedback = Feedback(user_id=user.id, text='Feedback text here', rating=rating,
+                        sentiment_label=label, sentiment_score=0.5, created_at=created_at)
+    db.session.add(feedback)
+    db.session.commit()
+    return feedback
+
+
+def rollup_rows():
+    """All rollup rows as comparable tuples"""
+    return [
+        (row.day, row.feedback_count, row.rating_sum,
+         tuple(getattr(row, f'rating_{r}_count') for r in (1, 2, 3, 4, 5)),
+         (row.positive_count, row.neutral_count, row.negative_count), row.corrected_count)
+        for row in FeedbackDailyStats.query.order_by(FeedbackDailyStats.day)
+    ]
+
+
+class TestFeedbackRollup:
+    """Test the incrementally maintained daily feedback rollup"""
+
+    def test_inserts_accumulate_per_day(self, app, admin):
+        """Test each submission adds to its day's row"""
+        add_feedback(admin, 5, 'positive')
+        add_feedback(admin, 3, 'neutral')
+        add_feedback(admin, 1, 'negative', created_at=DAY + timedelta(days=1))
+
+        assert rollup_rows() == [
+            (date(2024, 3, 10), 2, 8, (0, 0, 1, 0, 1), (1, 1, 0), 0),
+            (date(2024, 3, 11), 1, 1, (1, 0, 0, 0, 0), (0, 0, 1), 0),
+        ]
+
+    def test_correction_moves_sentiment(self, app, admin, login):
+        """Test an admin correction moves the count to the corrected label"""
+        feedback = add_feedback(admin, 4, 'positive')
+        client = login(admin)
+
+        response = client.post(f'/admin/feedback/{feedback.id}/correct',
+                               json={'sentiment_label': 'negative', 'sentiment_score': 0.9})
+
+        assert response.status_code == 200
+        assert rollup_rows() == [(date(2024, 3, 10), 1, 4, (0, 0, 0, 1, 0), (0, 0, 1), 1)]
+
+    def test_delete_subtracts(self, app, admin):
+        """Test deleting feedback removes its contribution"""
+        add_feedback(admin, 5, 'positive')
+        feedback = add_feedback(admin, 2, 'negative')
+
+        db.session.delete(feedback)
+        db.session.commit()
+
+        assert rollup_rows() == [(date(2024, 3, 10), 1, 5, (0, 0, 0, 0, 1), (1, 0, 0), 0)]
+
+    def test_backfill_matches_incremental(self, app, admin):
+        """Test the backfill rebuilds exactly what the incremental updates produced"""
+        add_feedback(admin, 5, 'positive')
+        corrected = add_feedback(admin, 2, 'negative', created_at=DAY - timedelta(days=3))
+        corrected.admin_corrected_label = 'neutral'
+        corrected.is_corrected = True
+        db.session.commit()
+        incremental = rollup_rows()
+
+        assert backfill_daily_stats() == 2
+        db.session.expire_all()
+
+        assert rollup_rows() == incremental
+
+    def test_daily_series_fills_gaps(self, app, admin):
+        """Test the series has a row per day, zeros included"""
+        add_feedback(admin, 4, 'positive')
+        add_feedback(admin, 2, 'positive')
+
+        series = daily_series(date(2024, 3, 9), date(2024, 3, 11))
+
+        assert [day['feedback_count'] for day in series] == [0, 2, 0]
+        assert series[1]['average_rating'] == 3
+        assert series[1]['sentiment']['positive'] == 2
+
+    def test_daily_stats_api(self, app, admin, login):
+        """Test the admin daily stats endpoint reads the rollup"""
+        add_feedback(admin, 4, 'positive')
+        client = login(admin)
+
+        response = client.get('/api/admin/stats/daily?start=2024-03-01&end=2024-03-31')
+
+        assert response.status_code == 200
+        assert len(response.get_json()['days']) == 31
+        assert client.get('/api/admin/stats/daily?start=2024-03-31&end=2024-03-01').status_code == 400
@@ -0,0 +1,126 @@
+from sqlalchemy import text, select, func
+from sqlalchemy.dialects import postgresql
+from app import db
+from app.models import User, Feedback
+from app.services.admin_lists import feedback_page, FeedbackFilters
+from app.services import feedback_search
+from app.services.feedback_search import rebuild_search_index, search_terms, highlight, search_backend
+
+
+def add_feedback(email, name, text):
+    """Add a user with one feedback"""
+    user = User(email=email, name=name)
+    user.set_password('UserPass123!')
+    db.session.add(user)
+    db.session.flush()
+    feedback = Feedback(user_id=user.id, text=text, rating=4,
+                        sentiment_label='positive', sentiment_score=0.8)
+    db.session.add(feedback)
+    db.session.commit()
+    return feedback
+
+
+def indexed_rows():
+    """(rowid, text, user_name) of every row in the SQLite shadow table"""
+    return db.session.execute(text(
+        "SELECT rowid, text, user_name FROM feedback_fts ORDER BY rowid"
+    )).all()
+
+
+class TestFeedbackSearch:
+    """Test the full-text feedback search index"""
+
+    def test_index_created_with_tables(self, app):
+        """Test create_all sets up the FTS5 shadow table"""
+        assert search_backend() == 'sqlite'
+
+    def test_index_follows_writes(self, app):
+        """Test inserts, edits, author renames and deletes keep the index in sync"""
+        feedback = add_feedback('ann@example.com', 'Ann Lee', 'The checkout page is slow')
+        assert indexed_rows() == [(feedback.id, 'The checkout page is slow', 'Ann Lee')]
+
+        feedback.text = 'Checkout is fast now'
+        feedback.user.name = 'Ann Smith'
+        db.session.commit()
+        assert indexed_rows() == [(feedback.id, 'Checkout is fast now', 'Ann Smith')]
+
+        db.session.delete(feedback)
+        db.session.commit()
+        assert indexed_rows() == []
+
+    def test_ranked_with_snippets(self, app):
+        """Test matches are ranked and highlighted, and terms match as prefixes"""
+        add_feedback('a@example.com', 'Alice', 'Delivery took a while but the support team was great')
+        add_feedback('b@example.com', 'Bob', 'Support support support, the support was amazing')
+        add_feedback('c@example.com', 'Carol', 'Nothing relevant here')
+
+        result = feedback_page(1, 10, FeedbackFilters(search='suppor'))
+
+        assert result.total == 2
+        assert [item['user_name'] for item in result.items] == ['Bob', 'Alice']
+        assert '<mark>support</mark>' in result.items[1]['snippet']
+
+    def test_matches_author_and_escapes(self, app):
+        """Test author emails are searchable and snippets are HTML-escaped"""
+        add_feedback('zed@example.com', 'Zed', 'Use <b>bold</b> more')
+
+        result = feedback_page(1, 10, FeedbackFilters(search='zed@example'))
+
+        assert result.total == 1
+        assert '&lt;b&gt;' in result.items[0]['snippet']
+
+    def test_rebuild(self, app):
+        """Test the index can be rebuilt from the feedback table"""
+        add_feedback('a@example.com', 'Alice', 'First')
+        add_feedback('b@example.com', 'Bob', 'Second')
+        db.session.execute(text("DELETE FROM feedback_fts"))
+        db.session.commit()
+
+        assert rebuild_search_index() == 2
+        assert len(indexed_rows()) == 2
+
+    def test_terms_and_highlight(self):
+        """Test search parsing drops punctuation and caps the term count"""
+        assert search_terms('  "Slow"  checkout!! ') == ['slow', 'checkout']
+        assert search_terms('&|!()') == []
+        assert len(search_terms(' '.join(['word'] * 20))) == 8
+        assert highlight('a \x02b\x03 <c>') == 'a <mark>b</mark> &lt;c&gt;'
+
+    def test_admin_api_search(self, app, client):
+        """Test the admin feedback API returns ranked snippets"""
+        add_feedback('a@example.com', 'Alice', 'The mobile app crashes on login')
+
+        data = client.get('/admin/api/feedback?search=crash').get_json()
+
+        assert len(data['feedback']) == 1
+        assert '<mark>crashes</mark>' in data['feedback'][0]['snippet']
+
+    def test_stopword_search_falls_back(self, app, monkeypatch):
+        """Test a PostgreSQL search left with no lexemes falls back to ILIKE"""
+        seen = []
+        monkeypatch.setattr(feedback_search, 'lexeme_count', lambda terms: seen.append(terms) or 0)
+        stmt = select(Feedback.id)
+
+        assert feedback_search.filter_matches(stmt, 'the', backend='postgresql') is None
+        assert feedback_search.apply_search(stmt, 'not the', backend='postgresql') is None
+        assert seen == [['the'], ['not', 'the']]
+
+        monkeypatch.setattr(feedback_search, 'lexeme_count', lambda terms: 1)
+        matched = feedback_search.filter_matches(stmt, 'crash', backend='postgresql')
+        assert '@@ to_tsquery' in str(matched.compile(dialect=postgresql.dialect()))
+
+    def test_lexeme_count_query(self):
+        """Test the lexeme check asks PostgreSQL for the tsquery's node count"""
+        query = select(func.numnode(feedback_search._tsquery(['the', 'app'])))
+
+        assert 'numnode(to_tsquery(' in str(query.compile(dialect=postgresql.dialect()))
+
+    def test_stopword_search_matches(self, app):
+        """Test a search made of stopwords still finds feedback containing them"""
+        add_feedback('a@example.com', 'Alice', 'The app is not working')
+        add_feedback('b@example.com', 'Bob', 'Great service')
+
+        result = feedback_page(1, 10, FeedbackFilters(search='the'))
+
+        assert result.total == 1
+        assert [item['user_name'] for item in result.items] == ['Alice']
@@ -0,0 +1,107 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import text, inspect
+from app import db
+from app.models import User, Feedback
+from app.services.schema_service import add_missing_columns
+
+
+@pytest.fixture
+def user(app):
+    """A regular user without feedback"""
+    user = User(email='user@example.com', name='Test User')
+    user.set_password('UserPass123!')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def add_feedback(user, rating, created_at=None):
+    """Add and commit one feedback for user"""
+    feedback = Feedback(
+        user_id=user.id,
+        text='Some feedback text here',
+        rating=rating,
+        sentiment_label='positive',
+        sentiment_score=0.5,
+        created_at=created_at or datetime.utcnow()
+    )
+    db.session.add(feedback)
+    db.session.commit()
+    return feedback
+
+
+class TestFeedbackCounters:
+    """Test per-user feedback aggregates are maintained on write"""
+
+    def test_insert_updates_counters(self, app, user):
+        """Test count, rating total, average and latest date follow inserts"""
+        newest = datetime.utcnow()
+        add_feedback(user, 5, newest)
+        add_feedback(user, 2, newest - timedelta(days=1))
+
+        assert user.feedback_count == 2
+        assert user.feedback_rating_total == 7
+        assert user.average_rating == 3.5
+        assert user.last_feedback_at == newest
+
+    def test_delete_updates_counters(self, app, user):
+        """Test deleting feedback subtracts it and recomputes the latest date"""
+        older = datetime.utcnow() - timedelta(days=2)
+        add_feedback(user, 4, older)
+        newest = add_feedback(user, 1)
+
+        db.session.delete(newest)
+        db.session.commit()
+
+        assert user.feedback_count == 1
+        assert user.average_rating == 4
+        assert user.last_feedback_at == older
+
+    def test_average_rating_expression(self, app, user):
+        """Test users can be filtered and sorted by average rating in SQL"""
+        add_feedback(user, 4)
+
+        assert User.query.filter(User.average_rating > 3).all() == [user]
+        assert User.query.filter(User.average_rating.is_(None)).count() == 0
+
+    def test_welcome_submission_updates_counters(self, app, user, login):
+        """Test the feedback form path maintains the counters"""
+        client = login(user)
+
+        response = client.post('/feedback/welcome', json={'text': 'Really enjoying the app so far', 'rating': 4})
+
+        assert response.status_code == 201
+        db.session.refresh(user)
+        assert (user.feedback_count, user.average_rating) == (1, 4)
+
+    def test_repair_after_bulk_delete(self, app, user):
+        """Test the repair recomputes counters that bulk writes left stale"""
+        add_feedback(user, 3)
+        add_feedback(user, 5)
+        Feedback.query.filter(Feedback.rating == 5).delete()
+        db.session.commit()
+        assert user.feedback_count == 2
+
+        assert User.repair_feedback_stats() == 1
+
+        db.session.refresh(user)
+        assert (user.feedback_count, user.feedback_rating_total) == (1, 3)
+
+    def test_add_missing_columns(self, app):
+        """Test the counter columns are added to an existing users table"""
+        db.drop_all()
+        db.session.execute(text(
+            'CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR(120), password_hash VARCHAR(255), '
+            'name VARCHAR(50), role VARCHAR(20), avatar_filename VARCHAR(255), is_active BOOLEAN, '
+            'has_submitted_feedback BOOLEAN, created_at DATETIME, updated_at DATETIME, avatar_variants JSON, avatar_pending VARCHAR(64))'
+        ))
+        db.session.execute(text("INSERT INTO users (id, email, password_hash, name) VALUES (1, 'a@b.com', 'x', 'A')"))
+        db.session.commit()
+
+        added = add_missing_columns(User)
+
+        assert added == ['feedback_count', 'feedback_rating_total', 'last_feedback_at']
+        columns = {column['name'] for column in inspect(db.engine).get_columns('users')}
+        assert set(added) <= columns
+        assert db.session.execute(text('SELECT feedback_count FROM users')).scalar() == 0
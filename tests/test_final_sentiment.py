@@ -0,0 +1,89 @@
+from sqlalchemy import event, inspect, text
+from app import db
+from app.models import Feedback
+from app.services.admin_lists import feedback_page, FeedbackFilters
+from app.services.schema_service import add_missing_indexes
+
+
+def add_feedback(user, label, score=0.7):
+    """Add and commit one feedback row"""
+    feedback = Feedback(user_id=user.id, text='Feedback text here', rating=3,
+                        sentiment_label=label, sentiment_score=score)
+    db.session.add(feedback)
+    db.session.commit()
+    return feedback
+
+
+class TestFinalSentiment:
+    """Test the stored effective sentiment"""
+
+    def test_stored_on_submit(self, app, admin):
+        """Test new feedback stores its analysed sentiment"""
+        feedback = add_feedback(admin, 'positive', 0.9)
+
+        assert (feedback.final_sentiment_label, feedback.final_sentiment_score) == ('positive', 0.9)
+
+    def test_correction_updates(self, app, admin, login):
+        """Test an admin correction replaces the stored sentiment"""
+        feedback = add_feedback(admin, 'positive')
+        client = login(admin)
+
+        response = client.post(f'/admin/feedback/{feedback.id}/correct',
+                               json={'sentiment_label': 'negative', 'sentiment_score': 0.8})
+
+        assert response.status_code == 200
+        db.session.refresh(feedback)
+        assert (feedback.final_sentiment_label, feedback.final_sentiment_score) == ('negative', 0.8)
+
+    def test_filter_uses_corrected_label(self, app, admin):
+        """Test corrected feedback is listed under its corrected label only"""
+        corrected = add_feedback(admin, 'positive')
+        corrected.admin_corrected_label = 'negative'
+        corrected.admin_corrected_score = 0.8
+        corrected.is_corrected = True
+        db.session.commit()
+        add_feedback(admin, 'positive')
+
+        assert feedback_page(1, 10, FeedbackFilters(sentiments={'positive'})).total == 1
+        negative = feedback_page(1, 10, FeedbackFilters(sentiments={'negative'}))
+        assert [item['id'] for item in negative.items] == [corrected.id]
+        assert negative.items[0]['confidence'] == 0.8
+
+    def test_filter_is_one_indexed_column(self, app, admin):
+        """Test the sentiment filter compares a single column"""
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        feedback_page(1, 10, FeedbackFilters(sentiments={'neutral'}))
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+        assert any('feedback.final_sentiment_label IN ' in statement for statement in statements)
+        assert not any('admin_corrected_label = ' in statement for statement in statements)
+        indexes = {index['name'] for index in inspect(db.engine).get_indexes('feedback')}
+        assert 'ix_feedback_final_sentiment_created_at' in indexes
+
+    def test_backfill(self, app, admin):
+        """Test the backfill fills rows written before the columns existed"""
+        add_feedback(admin, 'neutral')
+        corrected = add_feedback(admin, 'positive')
+        corrected.admin_corrected_label = 'negative'
+        corrected.is_corrected = True
+        db.session.commit()
+        db.session.execute(text('UPDATE feedback SET final_sentiment_label = NULL, final_sentiment_score = NULL'))
+        db.session.commit()
+
+        assert Feedback.backfill_final_sentiment() == 2
+
+        labels = db.session.execute(text('SELECT final_sentiment_label FROM feedback ORDER BY id')).scalars().all()
+        assert labels == ['neutral', 'negative']
+
+    def test_add_missing_indexes(self, app):
+        """Test missing indexes are created on an existing table"""
+        db.session.execute(text('DROP INDEX ix_feedback_final_sentiment_created_at'))
+        db.session.commit()
+
+        assert add_missing_indexes(Feedback) == ['ix_feedback_final_sentiment_created_at']
+        assert add_missing_indexes(Feedback) == []
@@ -0,0 +1,112 @@
+import re
+import uuid
+import pytest
+from datetime import datetime, date
+from decimal import Decimal
+from app import create_app, db, socketio
+from app.services import json_provider
+from app.services.json_provider import OrjsonProvider, StdlibJSONProvider, socketio_json
+from app.services.notification_service import send_admin_notification
+from config import TestingConfig
+
+PAYLOAD = {
+    'at': datetime(2024, 5, 1, 12, 30, 15, 250000),
+    'day': date(2024, 5, 1),
+    'average': Decimal('4.25'),
+    'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    None: 'no label',
+    'zeta': [1, 2.5, True, None],
+    'alpha': {'nested': 'é'}
+}
+EXPECTED = ('{"at":"2024-05-01T12:30:15.250000","day":"2024-05-01","average":"4.25",'
+            '"id":"12345678-1234-5678-1234-567812345678","null":"no label",'
+            '"zeta":[1,2.5,true,null],"alpha":{"nested":"é"}}')
+
+
+def create(provider='auto'):
+    """Create an application using the given JSON_PROVIDER"""
+    class JSONTestConfig(TestingConfig):
+        JSON_PROVIDER = provider
+
+    return create_app(JSONTestConfig)
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def app_config(app_config, request):
+    """Run each test with each JSON provider"""
+    class JSONTestConfig(app_config):
+        JSON_PROVIDER = request.param
+
+    return JSONTestConfig
+
+
+@pytest.fixture
+def admin(admin):
+    """Admin user whose name needs escaping in scripts"""
+    admin.name = 'Admin </script> User'
+    db.session.commit()
+    return admin
+
+
+class TestJSONProvider:
+    """Test JSON serialization of responses, templates and Socket.IO packets"""
+
+    def test_provider_selection(self):
+        """Test 'auto' uses orjson and 'stdlib' forces the fallback"""
+        assert isinstance(create().json, OrjsonProvider)
+        assert isinstance(create('stdlib').json, StdlibJSONProvider)
+
+    def test_missing_orjson_falls_back(self, monkeypatch, caplog):
+        """Test 'auto' still works without orjson, with a warning"""
+        monkeypatch.setattr(json_provider, 'orjson', None)
+
+        assert isinstance(create().json, StdlibJSONProvider)
+        assert 'orjson is not installed' in caplog.text
+        with pytest.raises(RuntimeError):
+            create('orjson')
+
+    def test_same_output(self, app):
+        """Test both providers serialize datetimes, Decimals and keys alike"""
+        assert app.json.dumps(PAYLOAD) == EXPECTED
+        assert socketio_json(app.config).dumps(PAYLOAD) == EXPECTED
+        with app.test_request_context():
+            assert app.json.response(PAYLOAD).get_data(as_text=True) == EXPECTED + '\n'
+        assert app.json.loads(EXPECTED.encode())['alpha'] == {'nested': 'é'}
+
+    def test_api_timestamps(self, app, admin, login):
+        """Test raw notification timestamps reach clients as ISO 8601"""
+        notification = send_admin_notification('Event')
+        client = login(admin)
+
+        data = client.get('/api/notifications').get_json()
+
+        assert data['notifications'][0]['timestamp'] == notification.timestamp.isoformat()
+
+    def test_socketio_emit(self, app, admin, login):
+        """Test emitted payloads go through the provider's serialization"""
+        client = login(admin)
+        socket_client = socketio.test_client(app, flask_test_client=client)
+        socket_client.get_received()
+
+        notification = send_admin_notification('Event')
+
+        [event] = [event for event in socket_client.get_received() if event['name'] == 'new_notification']
+        socket_client.disconnect()
+        assert event['args'][0]['timestamp'] == notification.timestamp.isoformat()
+
+    def test_template_embedding_escaped(self, app, admin, login):
+        """Test tojson output stays safe inside a script element"""
+        client = login(admin)
+
+        html = client.get('/').get_data(as_text=True)
+
+        script = re.search(r'<script id="bootstrap-data" type="application/json">(.*?)</script>', html, re.S)
+        assert app.json.loads(script.group(1))['user']['name'] == 'Admin </script> User'
+
+    def test_invalid_request_json(self, app):
+        """Test malformed request bodies are still a client error"""
+        response = app.test_client().post('/api/feedback/preview', data='{not json',
+                                          content_type='application/json')
+
+        assert response.status_code in (400, 500)
+        assert 'error' in response.get_json()
@@ -0,0 +1,88 @@
+import pytest
+from app import db
+from app.models import Notification
+from app.services.notification_cache import get_notification_cache
+from app.services.notification_service import send_admin_notification, get_notifications_for_role
+
+
+@pytest.fixture
+def app_config(app_config):
+    """Small buffers that never re-check the database on their own"""
+    class CacheTestConfig(app_config):
+        NOTIFICATION_CACHE_SIZE = 5
+        NOTIFICATION_CACHE_SYNC_INTERVAL = 3600
+
+    return CacheTestConfig
+
+
+def insert_directly(message, role='admin'):
+    """Insert a notification the way another worker would (bypassing this cache)"""
+    notification = Notification.create_notification(message, 'info', recipient_role=role)
+    db.session.commit()
+    return notification
+
+
+class TestNotificationCache:
+    """Test the per-role ring buffer of recent notifications"""
+
+    def test_recent_served_from_memory(self, app, queries):
+        """Test the recent list needs no query once the buffer is warm"""
+        for i in range(3):
+            send_admin_notification(f'Event {i}')
+        get_notification_cache().warm()
+
+        queries.clear()
+        notifications = get_notifications_for_role('admin', 5)
+
+        assert queries == []
+        assert [n.message for n in notifications] == ['Event 2', 'Event 1', 'Event 0']
+
+    def test_send_notification_appends(self, app, queries):
+        """Test new notifications are appended without reloading"""
+        get_notification_cache().warm()
+        send_admin_notification('Fresh event')
+
+        queries.clear()
+        notifications = get_notifications_for_role('admin', 5)
+
+        assert queries == []
+        assert notifications[0].message == 'Fresh event'
+        assert notifications[0].to_dict()['timestamp']
+
+    def test_buffer_is_bounded(self, app):
+        """Test only the newest NOTIFICATION_CACHE_SIZE records are kept"""
+        get_notification_cache().warm()
+        for i in range(8):
+            send_admin_notification(f'Event {i}')
+
+        buffer = get_notification_cache().buffer('admin')
+        assert len(buffer.records) == 5
+        assert [n.message for n in get_notifications_for_role('admin', 5)][0] == 'Event 7'
+
+    def test_roles_are_separate(self, app):
+        """Test each role has its own buffer"""
+        get_notification_cache().warm()
+        send_admin_notification('For admins')
+
+        assert get_notifications_for_role('user', 5) == []
+        assert len(get_notifications_for_role('admin', 5)) == 1
+
+    def test_limit_above_capacity_falls_back_to_db(self, app):
+        """Test requests larger than the buffer are read from the database"""
+        for i in range(8):
+            insert_directly(f'Event {i}')
+
+        assert len(get_notifications_for_role('admin', 8)) == 8
+
+    def test_missed_rows_trigger_reload(self, app):
+        """Test rows written by other workers are picked up on the next sync"""
+        cache = get_notification_cache()
+        cache.warm()
+        send_admin_notification('Local event')
+        insert_directly('Remote event')
+        send_admin_notification('Later local event')
+
+        cache.sync_interval = 0
+        messages = [n.message for n in get_notifications_for_role('admin', 5)]
+
+        assert messages == ['Later local event', 'Remote event', 'Local event']
@@ -0,0 +1,71 @@
+import pytest
+from app import socketio
+from app.services.notification_service import send_admin_notification
+
+
+@pytest.fixture
+def socket_client(app, client):
+    """Socket.IO test client sharing the admin's cookies"""
+    socket_client = socketio.test_client(app, flask_test_client=client)
+    yield socket_client
+    socket_client.disconnect()
+
+
+def events(socket_client, name):
+    """Payloads of received events with the given name"""
+    return [event['args'][0] for event in socket_client.get_received() if event['name'] == name]
+
+
+class TestNotificationPush:
+    """Test unread counts and new notifications are pushed over Socket.IO"""
+
+    def test_count_pushed_on_connect(self, app, socket_client):
+        """Test the initial unread count arrives without an HTTP request"""
+        send_admin_notification('Before connect')
+        socket_client.get_received()
+        socket_client.disconnect()
+        socket_client.connect()
+
+        assert events(socket_client, 'notification_count') == [{'count': 1, 'role': 'admin'}]
+
+    def test_new_notification_is_compact_delta(self, app, socket_client):
+        """Test new notifications carry an unread delta and no event_data"""
+        socket_client.get_received()
+
+        send_admin_notification('New user', event_data={'email': 'x@example.com'})
+
+        [payload] = events(socket_client, 'new_notification')
+        assert payload['message'] == 'New user'
+        assert payload['unread_delta'] == 1
+        assert 'event_data' not in payload
+
+    def test_mark_read_pushes_count(self, app, client, socket_client):
+        """Test marking read pushes the new count to the user's sockets"""
+        first = send_admin_notification('First')
+        send_admin_notification('Second')
+        socket_client.get_received()
+
+        response = client.post(f'/api/notifications/{first.id}/read')
+
+        assert response.get_json()['unread_count'] == 1
+        assert events(socket_client, 'notification_count') == [{'count': 1, 'role': 'admin'}]
+
+    def test_mark_all_read_pushes_zero(self, app, client, socket_client):
+        """Test mark all read pushes a zero count"""
+        send_admin_notification('First')
+        socket_client.get_received()
+
+        client.post('/api/notifications/read-all')
+
+        assert events(socket_client, 'notification_count') == [{'count': 0, 'role': 'admin'}]
+
+    def test_recent_list_over_socket(self, app, socket_client):
+        """Test the dropdown list can be fetched over the open socket"""
+        send_admin_notification('Listed')
+        socket_client.get_received()
+
+        socket_client.emit('get_notifications', {'limit': 10})
+
+        [payload] = events(socket_client, 'notifications')
+        assert [n['message'] for n in payload['notifications']] == ['Listed']
+        assert payload['notifications'][0]['read'] is False
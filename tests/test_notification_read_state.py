@@ -0,0 +1,133 @@
+import pytest
+from app import db
+from app.models import User, Notification, NotificationReadState
+
+
+@pytest.fixture
+def admins(app):
+    """Two admin users"""
+    users = []
+    for i in range(2):
+        user = User(email=f'admin{i}@example.com', name=f'Admin {i}', role='admin')
+        user.set_password('AdminPass123!')
+        db.session.add(user)
+        users.append(user)
+    db.session.commit()
+    return users
+
+
+def add_notifications(count, role='admin'):
+    """Create count notifications for a role"""
+    notifications = [
+        Notification.create_notification(f'Event {i}', 'info', recipient_role=role)
+        for i in range(count)
+    ]
+    db.session.commit()
+    return notifications
+
+
+class TestNotificationReadState:
+    """Test per-user notification read cursors"""
+
+    def test_read_state_is_per_user(self, app, admins):
+        """Test one admin reading a notification does not affect another"""
+        notifications = add_notifications(3)
+
+        assert Notification.mark_as_read(notifications[1].id, admins[0])
+
+        assert Notification.get_unread_count_for_user(admins[0]) == 2
+        assert Notification.get_unread_count_for_user(admins[1]) == 3
+
+    def test_mark_all_moves_cursor(self, app, admins):
+        """Test mark all read advances the cursor and clears exceptions"""
+        notifications = add_notifications(4)
+        Notification.mark_as_read(notifications[2].id, admins[0])
+
+        state = Notification.mark_all_as_read(admins[0])
+
+        assert state.last_read_id == notifications[-1].id
+        assert state.read_ids == []
+        assert Notification.get_unread_count_for_user(admins[0]) == 0
+
+        add_notifications(2)
+        assert Notification.get_unread_count_for_user(admins[0]) == 2
+        assert Notification.get_unread_count_for_user(admins[1]) == 6
+
+    def test_cursor_never_moves_backwards(self, app, admins):
+        """Test the cursor is monotonic"""
+        notifications = add_notifications(3)
+        state = Notification.mark_all_as_read(admins[0])
+
+        state.advance(notifications[0].id)
+
+        assert state.last_read_id == notifications[-1].id
+
+    def test_other_role_notifications_are_ignored(self, app, admins):
+        """Test counts and exceptions only cover the user's role"""
+        user_notifications = add_notifications(2, role='user')
+        add_notifications(1)
+
+        Notification.mark_as_read(user_notifications[0].id, admins[0])
+
+        assert NotificationReadState.for_user(admins[0].id).read_ids == []
+        assert Notification.get_unread_count_for_user(admins[0]) == 1
+
+    def test_reading_in_order_compacts(self, app, admins):
+        """Test ids read one by one right above the cursor move the cursor instead of piling up"""
+        notifications = add_notifications(3)
+        add_notifications(1, role='user')  # another role's id between them is skipped over
+        notifications += add_notifications(2)
+
+        for notification in (notifications[0], notifications[1], notifications[4]):
+            Notification.mark_as_read(notification.id, admins[0])
+        state = NotificationReadState.for_user(admins[0].id)
+        assert (state.last_read_id, state.read_ids) == (notifications[1].id, [notifications[4].id])
+
+        for notification in (notifications[2], notifications[3]):
+            Notification.mark_as_read(notification.id, admins[0])
+        assert (state.last_read_id, state.read_ids) == (notifications[4].id, [])
+        assert Notification.get_unread_count_for_user(admins[0]) == 0
+
+    def test_ids_read_under_previous_role_ignored(self, app, admins):
+        """Test a role change does not let old read ids hide the new role's notifications"""
+        admin_notifications = add_notifications(2)
+        Notification.mark_as_read(admin_notifications[1].id, admins[0])
+
+        admins[0].role = 'user'
+        db.session.commit()
+        add_notifications(3, role='user')
+
+        assert NotificationReadState.for_user(admins[0].id).read_ids == [admin_notifications[1].id]
+        assert Notification.get_unread_count_for_user(admins[0]) == 3
+
+
+class TestNotificationReadAPI:
+    """Test notification endpoints use the caller's read state"""
+
+    def test_api_read_flags_are_per_user(self, app, admins, login):
+        """Test /api/notifications reports read flags for the caller only"""
+        notifications = add_notifications(2)
+        first = login(admins[0])
+        second = login(admins[1])
+
+        response = first.post(f'/api/notifications/{notifications[0].id}/read')
+        assert response.status_code == 200
+
+        first_flags = {n['id']: n['read'] for n in first.get('/api/notifications').get_json()['notifications']}
+        second_flags = {n['id']: n['read'] for n in second.get('/api/notifications').get_json()['notifications']}
+
+        assert first_flags == {notifications[0].id: True, notifications[1].id: False}
+        assert second_flags == {notifications[0].id: False, notifications[1].id: False}
+
+    def test_admin_mark_all_read(self, app, admins, login):
+        """Test the admin mark-all endpoint only affects the calling admin"""
+        add_notifications(5)
+        first = login(admins[0])
+        second = login(admins[1])
+
+        response = first.post('/admin/api/notifications/mark-all-read')
+        assert response.status_code == 200
+
+        assert first.get('/admin/api/notifications?unread_only=true').get_json()['total'] == 0
+        assert second.get('/admin/api/notifications?unread_only=true').get_json()['total'] == 5
+        assert second.get('/admin/api/notifications').get_json()['unread_count'] == 5
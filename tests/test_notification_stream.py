@@ -0,0 +1,97 @@
+import json
+import pytest
+from app.services.notification_service import send_admin_notification, send_user_notification
+from concurrency import stream_max_duration, SYNC_WORKER_TIMEOUT
+
+
+@pytest.fixture
+def app_config(app_config):
+    """Streams that replay once and end instead of waiting for new rows"""
+    class StreamTestConfig(app_config):
+        NOTIFICATION_STREAM_ENABLED = True
+        NOTIFICATION_STREAM_POLL_INTERVAL = 0
+        NOTIFICATION_STREAM_MAX_DURATION = 0
+        NOTIFICATION_STREAM_REPLAY_LIMIT = 2
+
+    return StreamTestConfig
+
+
+def parse_events(body):
+    """Parse an SSE body into (id, event, data) tuples, skipping comments"""
+    events = []
+    for block in body.strip().split('\n\n'):
+        fields = {}
+        for line in block.split('\n'):
+            if line and not line.startswith(':'):
+                name, _, value = line.partition(': ')
+                fields[name] = value
+        if 'event' in fields:
+            events.append((fields.get('id'), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class TestNotificationStream:
+    """Test the Server-Sent Events notification stream"""
+
+    def test_stream_headers(self, app, client):
+        """Test the stream is an uncached event stream"""
+        response = client.get('/api/notifications/stream')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        assert response.headers['Cache-Control'] == 'no-cache'
+        assert response.get_data(as_text=True).startswith('retry: ')
+
+    def test_fresh_stream_starts_at_newest(self, app, client):
+        """Test a stream without Last-Event-ID does not replay history"""
+        newest = send_admin_notification('Old news').id
+
+        events = parse_events(client.get('/api/notifications/stream').get_data(as_text=True))
+
+        assert events == [(str(newest), 'ready', {'last_event_id': newest})]
+
+    def test_replays_missed_notifications(self, app, client):
+        """Test Last-Event-ID replays only what the client missed, oldest first"""
+        ids = [send_admin_notification(f'Event {i}', event_data={'i': i}).id for i in range(5)]
+        send_user_notification('Not for admins')
+
+        response = client.get('/api/notifications/stream', headers={'Last-Event-ID': str(ids[0])})
+        events = parse_events(response.get_data(as_text=True))
+
+        notifications = [event for event in events if event[1] == 'notification']
+        assert [event_id for event_id, _, _ in notifications] == [str(i) for i in ids[1:]]
+        assert [data['message'] for _, _, data in notifications] == ['Event 1', 'Event 2', 'Event 3', 'Event 4']
+        assert notifications[0][2]['unread_delta'] == 1
+        assert 'event_data' not in notifications[0][2]
+
+    def test_query_parameter_resumes(self, app, client):
+        """Test last_event_id in the query string works like the header"""
+        first = send_admin_notification('First').id
+        second = send_admin_notification('Second').id
+
+        response = client.get(f'/api/notifications/stream?last_event_id={first}')
+        events = parse_events(response.get_data(as_text=True))
+
+        assert [event_id for event_id, name, _ in events if name == 'notification'] == [str(second)]
+
+    def test_requires_login(self, app):
+        """Test anonymous clients cannot open the stream"""
+        response = app.test_client().get('/api/notifications/stream')
+
+        assert response.status_code == 401
+
+    def test_disabled_stream_refused(self, app, client):
+        """Test a disabled stream answers 503 so EventSource stops and the page polls"""
+        app.config['NOTIFICATION_STREAM_ENABLED'] = False
+
+        response = client.get('/api/notifications/stream')
+
+        assert response.status_code == 503
+        assert 'error' in response.get_json()
+
+    def test_max_duration_by_worker_mode(self):
+        """Test sync workers never hold a stream up to the gunicorn timeout"""
+        assert stream_max_duration(None, 'gevent') == 300
+        assert stream_max_duration('600', 'eventlet') == 600
+        assert stream_max_duration(None, 'sync') < SYNC_WORKER_TIMEOUT
+        assert stream_max_duration('300', 'sync') < SYNC_WORKER_TIMEOUT
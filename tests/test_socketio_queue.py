@@ -0,0 +1,127 @@
+import time
+import pytest
+import socketio
+from socketio import packet
+from app.services.socketio_queue import (
+    LocalBroker, LocalBrokerManager, PostgresNotifyManager, create_client_manager
+)
+
+
+def wait_for(predicate, timeout=2.0):
+    """Poll until predicate() is true or the timeout expires"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class FakeWorker:
+    """A Socket.IO server as run by one gunicorn worker, with captured output"""
+
+    def __init__(self, broker):
+        self.manager = LocalBrokerManager(channel='test-channel', broker=broker)
+        self.server = socketio.Server(client_manager=self.manager, async_mode='threading')
+        self.received = []
+        self.sockets = 0
+        self.server._send_eio_packet = self._capture
+        self.manager.initialize()
+
+    def _capture(self, eio_sid, eio_pkt):
+        pkt = packet.Packet(encoded_packet=eio_pkt.data)
+        self.received.append((eio_sid, pkt.data[0], pkt.data[1]))
+
+    def connect_socket(self, *rooms):
+        """Attach a fake client socket and join it to rooms"""
+        self.sockets += 1
+        eio_sid = f'eio-{self.sockets}'
+        sid = self.manager.connect(eio_sid, '/')
+        for room in rooms:
+            self.manager.enter_room(sid, '/', room)
+        return eio_sid
+
+
+@pytest.fixture
+def broker():
+    """Local stand-in broker, shut down after each test"""
+    broker = LocalBroker()
+    yield broker
+    broker.shutdown()
+
+
+class TestSocketIOFanOut:
+    """Test cross-worker Socket.IO delivery through a message queue"""
+
+    def test_emit_reaches_room_on_other_worker(self, broker):
+        """Test an emit on one worker reaches sockets held by another"""
+        worker_a = FakeWorker(broker)
+        worker_b = FakeWorker(broker)
+        admin_socket = worker_b.connect_socket('role_admin')
+
+        worker_a.server.emit('new_notification', {'id': 1, 'message': 'hello'}, room='role_admin')
+
+        assert wait_for(lambda: worker_b.received)
+        assert worker_b.received == [(admin_socket, 'new_notification', {'id': 1, 'message': 'hello'})]
+
+    def test_emit_is_not_delivered_twice_locally(self, broker):
+        """Test the sending worker does not re-deliver its own published emit"""
+        worker_a = FakeWorker(broker)
+        worker_b = FakeWorker(broker)
+        local_socket = worker_a.connect_socket('user_7')
+        worker_b.connect_socket('user_7')
+
+        worker_a.server.emit('notification_count', {'count': 3}, room='user_7')
+
+        assert wait_for(lambda: worker_b.received)
+        time.sleep(0.05)
+        assert worker_a.received == [(local_socket, 'notification_count', {'count': 3})]
+
+    def test_room_scoping_is_preserved(self, broker):
+        """Test only sockets in the addressed room receive the emit"""
+        worker_a = FakeWorker(broker)
+        worker_b = FakeWorker(broker)
+        worker_b.connect_socket('role_user')
+        admin_socket = worker_b.connect_socket('role_admin')
+
+        worker_a.server.emit('new_notification', {'id': 2}, room='role_admin')
+
+        assert wait_for(lambda: worker_b.received)
+        assert [eio_sid for eio_sid, _, _ in worker_b.received] == [admin_socket]
+
+    def test_write_only_publisher(self, broker):
+        """Test a process without sockets can publish to connected workers"""
+        publisher = LocalBrokerManager(channel='test-channel', broker=broker, write_only=True)
+        worker = FakeWorker(broker)
+        admin_socket = worker.connect_socket('role_admin')
+
+        publisher.emit('new_notification', {'id': 3}, namespace='/', room='role_admin')
+
+        assert wait_for(lambda: worker.received)
+        assert worker.received[0][0] == admin_socket
+
+
+class TestClientManagerFactory:
+    """Test message queue URL handling"""
+
+    def test_no_queue_configured(self):
+        """Test the in-process manager is kept without a queue URL"""
+        assert create_client_manager({'SOCKETIO_MESSAGE_QUEUE': None}) is None
+
+    def test_local_queue(self):
+        """Test local:// selects the stand-in broker"""
+        manager = create_client_manager({
+            'SOCKETIO_MESSAGE_QUEUE': 'local://factory-test',
+            'SOCKETIO_CHANNEL': 'events'
+        })
+        assert isinstance(manager, LocalBrokerManager)
+        assert manager.channel == 'events'
+
+    def test_postgres_queue(self):
+        """Test Postgres URLs select LISTEN/NOTIFY without connecting eagerly"""
+        manager = create_client_manager({
+            'SOCKETIO_MESSAGE_QUEUE': 'postgresql+psycopg2://postgres:password@db:5432/feedback_app'
+        })
+        assert isinstance(manager, PostgresNotifyManager)
+        assert manager.url == 'postgresql://postgres:password@db:5432/feedback_app'
+        assert manager.channel == 'flask-socketio'
@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+import time
+import pytest
+from app import db
+from app.services.notification_cache import get_notification_cache
+from app.services.sentiment_service import get_sentiment_service
+from app.services.startup import warm_up, after_fork, mark_ready, compile_templates
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def app_config(app_config, tmp_path):
+    """Jinja bytecode cache in a temporary directory"""
+    class StartupTestConfig(app_config):
+        JINJA_BYTECODE_CACHE_DIR = str(tmp_path / 'jinja')
+
+    return StartupTestConfig
+
+
+class TestStartup:
+    """Test lazy imports, warm-up and preloaded workers"""
+
+    def test_heavy_modules_not_imported(self):
+        """Test creating the app imports neither Pillow nor vaderSentiment"""
+        code = ('import sys; from app import create_app; from config import TestingConfig; '
+                'create_app(TestingConfig); print(sorted({"PIL", "vaderSentiment"} & set(sys.modules)))')
+
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+        assert output.stdout.strip().splitlines()[-1] == '[]'
+
+    def test_warm_up(self, app, tmp_path):
+        """Test warm-up compiles templates and fills the caches before any request"""
+        steps = warm_up(app)
+
+        assert set(steps) == {'templates', 'sentiment', 'db_pool', 'notification_cache', 'stats', 'typeahead'}
+        assert get_notification_cache(app).buffer('admin').loaded
+        assert get_sentiment_service() is get_sentiment_service()
+        assert 'stats_cache' in app.extensions
+        assert len(app.jinja_env.cache) >= compile_templates(app)
+        assert any(name.endswith('.cache') for name in os.listdir(tmp_path / 'jinja'))
+
+    def test_after_fork(self, app):
+        """Test a forked worker replaces the connection pool it inherited"""
+        inherited = db.engine.pool
+        warm_up(app)
+
+        after_fork(app)
+
+        assert db.engine.pool is not inherited
+        assert app.extensions['startup']['pid'] == os.getpid()
+        assert 'after_fork_seconds' in app.extensions['startup']
+
+    def test_startup_reported(self, app):
+        """Test the health check reports startup and time to first request"""
+        warm_up(app)
+        mark_ready(app, time.perf_counter() - 1)
+
+        startup = app.test_client().get('/api/health').get_json()['startup']
+
+        assert startup['ready_seconds'] >= 1
+        assert startup['first_request_seconds'] >= 0
+        assert 'ready_at' not in startup
@@ -0,0 +1,95 @@
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models import User, Feedback
+from app.services.stats_service import compute_stats_snapshot, get_stats_snapshot
+
+
+@pytest.fixture
+def app_config(app_config):
+    """A long-lived stats snapshot"""
+    class StatsTestConfig(app_config):
+        STATS_CACHE_TTL = 3600
+
+    return StatsTestConfig
+
+
+def add_user(email, role='user', is_active=True, created_at=None):
+    """Add and commit a user"""
+    user = User(email=email, name='Some User', role=role, is_active=is_active,
+                created_at=created_at or datetime.utcnow())
+    user.set_password('UserPass123!')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def add_feedback(user, rating, label, created_at=None):
+    """Add and commit feedback, marking the user as having submitted"""
+    db.session.add(Feedback(user_id=user.id, text='Feedback text here', rating=rating,
+                            sentiment_label=label, sentiment_score=0.5,
+                            created_at=created_at or datetime.utcnow()))
+    user.has_submitted_feedback = True
+    db.session.commit()
+
+
+class TestStatsSnapshot:
+    """Test the single-pass statistics snapshot"""
+
+    def test_snapshot_figures(self, app):
+        """Test every figure matches the data"""
+        old = datetime.utcnow() - timedelta(days=30)
+        first = add_user('a@example.com', created_at=old)
+        second = add_user('b@example.com', is_active=False)
+        add_user('c@example.com')
+        add_feedback(first, 5, 'positive', created_at=old)
+        add_feedback(second, 2, 'negative')
+
+        stats = compute_stats_snapshot()
+
+        assert (stats['total_users'], stats['active_users'], stats['recent_users']) == (3, 2, 2)
+        assert (stats['feedback_submitted'], stats['pending_feedback']) == (2, 1)
+        assert round(stats['feedback_rate'], 1) == 66.7
+        assert (stats['total_feedback'], stats['recent_feedback']) == (2, 1)
+        assert stats['average_rating'] == 3.5
+        assert stats['sentiment_distribution'] == {'positive': 1, 'negative': 1}
+        assert stats['rating_distribution'] == {'5': 1, '2': 1}
+
+    def test_snapshot_is_two_queries(self, app, queries):
+        """Test the snapshot uses one aggregate query per table"""
+        add_user('a@example.com')
+        queries.clear()
+
+        compute_stats_snapshot()
+
+        assert len(queries) == 2
+
+    def test_snapshot_is_cached(self, app, queries):
+        """Test repeated reads are served from memory"""
+        get_stats_snapshot()
+        queries.clear()
+
+        for _ in range(5):
+            get_stats_snapshot()
+
+        assert queries == []
+
+    def test_writes_invalidate(self, app):
+        """Test committing a user or feedback change drops the snapshot"""
+        assert get_stats_snapshot()['total_users'] == 0
+
+        user = add_user('a@example.com')
+        assert get_stats_snapshot()['total_users'] == 1
+
+        add_feedback(user, 4, 'positive')
+        assert get_stats_snapshot()['total_feedback'] == 1
+
+    def test_admin_stats_api(self, app, login):
+        """Test /api/admin/stats serves the snapshot"""
+        admin = add_user('admin@example.com', role='admin')
+        client = login(admin)
+
+        data = client.get('/api/admin/stats').get_json()
+
+        assert (data['total_users'], data['total_feedback'], data['average_rating']) == (1, 0, 0)
+        assert client.get('/admin/dashboard').status_code == 200
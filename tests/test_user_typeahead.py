@@ -0,0 +1,163 @@
+import pytest
+from sqlalchemy import delete, event
+from sqlalchemy.dialects import postgresql
+from flask_jwt_extended import create_access_token
+from app import db, socketio
+from app.models import User
+from app.services.user_typeahead import suggest_users, get_prefix_index, similarity, trigrams, warm_index
+from app.services.user_typeahead import _trigram_statement
+
+
+@pytest.fixture
+def app_config(app_config):
+    """Refresh the typeahead index on every query"""
+    class TypeaheadTestConfig(app_config):
+        TYPEAHEAD_REFRESH_INTERVAL = 0
+
+    return TypeaheadTestConfig
+
+
+def add_user(email, name, role='user'):
+    """Add and commit a user"""
+    user = User(email=email, name=name, role=role)
+    user.set_password('UserPass123!')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def names(suggestions):
+    """Names of typeahead suggestions, in order"""
+    return [suggestion['name'] for suggestion in suggestions]
+
+
+class TestUserTypeahead:
+    """Test the admin user typeahead"""
+
+    def test_prefix_matches_ranked(self, app):
+        """Test name and email words match by prefix, closest first"""
+        add_user('jonathan@example.com', 'Jonathan Price')
+        add_user('jo@example.com', 'Jo March')
+        add_user('mary@jones.org', 'Mary Smith')
+        add_user('alice@example.com', 'Alice Brown')
+
+        assert names(suggest_users('jo')) == ['Jo March', 'Jonathan Price', 'Mary Smith']
+        assert names(suggest_users('SMI')) == ['Mary Smith']
+        assert names(suggest_users('alice@ex')) == ['Alice Brown']
+        assert suggest_users('  ') == []
+
+    def test_limit(self, app):
+        """Test only the top matches are returned"""
+        for i in range(5):
+            add_user(f'user{i}@example.com', f'User {i}')
+
+        assert len(suggest_users('user', limit=3)) == 3
+
+    def test_incremental_refresh(self, app):
+        """Test renamed and new users are picked up from updated_at"""
+        user = add_user('a@example.com', 'Alice')
+        assert names(suggest_users('ali')) == ['Alice']
+
+        user.name = 'Beatrice'
+        db.session.commit()
+        add_user('c@example.com', 'Alicia')
+
+        assert names(suggest_users('ali')) == ['Alicia']
+        assert names(suggest_users('bea')) == ['Beatrice']
+
+    def test_deleted_users_dropped(self, app):
+        """Test deleting a user removes it from this worker's index"""
+        user = add_user('a@example.com', 'Alice')
+        suggest_users('ali')
+
+        db.session.delete(user)
+        db.session.commit()
+
+        assert suggest_users('ali') == []
+
+    def test_refresh_is_one_query(self, app, queries):
+        """Test a refresh reads only changed users in one query"""
+        for i in range(20):
+            add_user(f'user{i}@example.com', f'User {i}')
+        get_prefix_index().rebuild()
+        queries.clear()
+
+        suggest_users('user')
+
+        assert len(queries) == 1
+        assert 'updated_at >=' in queries[0]
+
+    def test_refresh_query_runs_unlocked(self, app):
+        """Test searches can use the index while a refresh waits on the database"""
+        add_user('a@example.com', 'Alice')
+        index = get_prefix_index()
+        index.rebuild()
+        locked = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            locked.append(index.lock.locked())
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            assert names(suggest_users('ali')) == ['Alice']
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        assert locked == [False]
+
+    def test_similarity(self):
+        """Test trigram similarity matches pg_trgm's definition"""
+        assert similarity(trigrams('word'), 'word') == 1.0
+        assert similarity(trigrams('word'), 'words') == pytest.approx(4 / 7)
+        assert similarity(trigrams('abc'), 'xyz') == 0.0
+
+    def test_typeahead_api(self, app):
+        """Test the endpoint returns suggestions for admins only"""
+        admin = add_user('admin@example.com', 'Admin User', role='admin')
+        user = add_user('zoe@example.com', 'Zoe Quinn')
+        client = app.test_client()
+
+        client.set_cookie('access_token_cookie', create_access_token(identity=str(user.id)))
+        assert client.get('/admin/api/users/typeahead?q=zo').status_code == 403
+
+        client.set_cookie('access_token_cookie', create_access_token(identity=str(admin.id)))
+        data = client.get('/admin/api/users/typeahead?q=zo').get_json()
+        assert data['users'][0]['email'] == 'zoe@example.com'
+
+    def test_built_at_startup(self, app, queries):
+        """Test the warm-up builds the index so searches only refresh it"""
+        add_user('a@example.com', 'Alice')
+        warm_index(app)
+        queries.clear()
+
+        assert names(suggest_users('ali')) == ['Alice']
+        assert len(queries) == 1
+
+    def test_rebuild_in_background(self, app, monkeypatch):
+        """Test a due rebuild runs off-request while the current index keeps serving"""
+        tasks = []
+        monkeypatch.setattr(socketio, 'start_background_task', lambda *args: tasks.append(args))
+        user = add_user('a@example.com', 'Alice')
+        index = get_prefix_index()
+        index.rebuild()
+        # Deleted by another worker: no ORM event reaches this index
+        db.session.execute(delete(User).where(User.id == user.id))
+        db.session.commit()
+        index.rebuild_interval = 0
+
+        assert names(suggest_users('ali')) == ['Alice']
+        assert names(suggest_users('ali')) == ['Alice']
+        assert len(tasks) == 1 and index.rebuilding
+
+        function, *args = tasks[0]
+        function(*args)
+
+        assert not index.rebuilding
+        assert suggest_users('ali') == []
+
+    def test_short_trigram_queries_match_prefixes(self):
+        """Test one or two letters use prefix ILIKE on PostgreSQL, longer queries word_similarity"""
+        short = str(_trigram_statement('jo', 10).compile(dialect=postgresql.dialect()))
+        long = str(_trigram_statement('jon', 10).compile(dialect=postgresql.dialect()))
+
+        assert 'ILIKE' in short.upper() and '<%' in short
+        assert 'ILIKE' not in long.upper()
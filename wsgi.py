@@ -3,18 +3,31 @@
 WSGI entry point for the Flask application
 """
 import os
+import time
 from dotenv import load_dotenv
 
+_started = time.perf_counter()
+
 # Load environment variables
 load_dotenv()
 
 # Set Flask environment
 os.environ.setdefault('FLASK_ENV', 'production')
 
+# Cooperative worker modes must patch the stdlib before the app is imported
+from concurrency import apply_worker_mode
+apply_worker_mode()
+
 from app import create_app
+from app.services.startup import warm_up, mark_ready
 
 # Create application instance
 app = create_app()
 
+# Compile templates, fill per-worker caches and open database connections
+# before serving requests (in the gunicorn master with GUNICORN_PRELOAD=true)
+warm_up(app)
+mark_ready(app, _started)
+
 if __name__ == '__main__':
     app.run()